@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Zen Coordinator Tests
+"""
+import json
+import urllib.parse
+import pytest
+
+# Import the coordinator
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import zen_coordinator
+from datetime import date, datetime
+from zen_coordinator import (
+    _memory_filter_args, adapt_to_native_api, create_partitioned_logs, maintain_log_partitions, start_log_migration
+)
+
+class RecordingCursor:
+    """Records executed statements and replays queued fetch results"""
+
+    def __init__(self, results=None):
+        self.executed = []
+        self.results = list(results or [])
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+
+    def fetchall(self):
+        return self.results.pop(0) if self.results else []
+
+    def fetchone(self):
+        rows = self.fetchall()
+        return rows[0] if rows else None
+
+    def close(self):
+        pass
+
+    def statements(self, prefix):
+        return [(sql, params) for sql, params in self.executed if sql.startswith(prefix)]
+
+def fixed_today(monkeypatch, today):
+    """Pin date.today() as seen by the coordinator"""
+    class FixedDate(date):
+        @classmethod
+        def today(cls):
+            return today
+    monkeypatch.setattr(zen_coordinator, "date", FixedDate)
+
+class TestMemoryFilterArgs:
+    """Test translation of memory tool filters into query parameters"""
+
+    def test_no_filters(self):
+        """Test that no arguments give no parameters"""
+        assert _memory_filter_args({}) == {}
+
+    def test_none_values_are_dropped(self):
+        """Test that explicit nulls are not forwarded"""
+        assert _memory_filter_args({"agent": None, "type": None, "metadata_filter": None}) == {}
+
+    def test_scalar_filters(self):
+        """Test agent, type and importance bounds pass through, including 0 bounds"""
+        args = _memory_filter_args({"agent": "claude-code", "type": "project",
+                                    "min_importance": 0, "max_importance": 0.8, "query": "x"})
+        assert args == {"agent": "claude-code", "type": "project", "min_importance": 0, "max_importance": 0.8}
+
+    def test_include_archive(self):
+        """Test that include_archive is only sent when true"""
+        assert _memory_filter_args({"include_archive": True}) == {"include_archive": "true"}
+        assert _memory_filter_args({"include_archive": False}) == {}
+
+    def test_metadata_filter_is_json_encoded(self):
+        """Test that the metadata filter is sent as a JSON object string"""
+        args = _memory_filter_args({"metadata_filter": {"repo": "zen", "tags": ["a"]}})
+        assert json.loads(args["metadata_filter"]) == {"repo": "zen", "tags": ["a"]}
+
+class TestMemoryAdaptation:
+    """Test the memory tools build the expected native URLs"""
+
+    @pytest.fixture
+    def requests_made(self, monkeypatch):
+        made = []
+        monkeypatch.setattr(zen_coordinator, "_execute_http_request",
+                            lambda url, method="GET", data=None: made.append((url, method, data)) or {})
+        return made
+
+    def query(self, url):
+        return dict(urllib.parse.parse_qsl(urllib.parse.urlparse(url).query))
+
+    def test_search_memories(self, requests_made):
+        """Test that search_memories forwards query and filters"""
+        adapt_to_native_api(8005, "tools/call", {"name": "search_memories", "arguments": {
+            "query": "deploy", "agent": "ops", "metadata_filter": {"env": "prod"}
+        }})
+        url, method, _ = requests_made[0]
+        assert url.startswith("http://localhost:8005/memory/search?") and method == "GET"
+        params = self.query(url)
+        assert params["query"] == "deploy" and params["agent"] == "ops"
+        assert json.loads(params["metadata_filter"]) == {"env": "prod"}
+
+    def test_list_memories(self, requests_made):
+        """Test that list_memories forwards paging and filters to the container port"""
+        adapt_to_native_api(8005, "tools/call", {"name": "list_memories", "arguments": {
+            "limit": 5, "type": "user", "include_archive": True
+        }}, container_name="memory-mcp")
+        url, _, _ = requests_made[0]
+        assert url.startswith("http://memory-mcp:8000/memory/list?")
+        assert self.query(url) == {"limit": "5", "offset": "0", "type": "user", "include_archive": "true"}
+
+class TestLogPartitions:
+    """Test request log partition maintenance and the legacy table migration"""
+
+    @pytest.fixture(autouse=True)
+    def policy(self, monkeypatch):
+        monkeypatch.setattr(zen_coordinator, "LOG_PARTITIONS_AHEAD", 2)
+        monkeypatch.setattr(zen_coordinator, "LOG_RETENTION_MONTHS", 3)
+        monkeypatch.setattr(zen_coordinator, "LOG_RETENTION_ACTION", "drop")
+
+    def created(self, cursor):
+        return [(sql.split()[5], params) for sql, params in cursor.statements("CREATE TABLE IF NOT EXISTS")]
+
+    def test_partitions_ahead_roll_over_the_year(self, monkeypatch):
+        """Test the current month plus LOG_PARTITIONS_AHEAD months, across December to January"""
+        fixed_today(monkeypatch, date(2024, 11, 17))
+        monkeypatch.setattr(zen_coordinator, "LOG_RETENTION_MONTHS", 0)
+        cursor = RecordingCursor()
+        maintain_log_partitions(cursor)
+        assert self.created(cursor) == [
+            ("mcp_request_logs_2024_11", ("2024-11-01", "2024-12-01")),
+            ("mcp_request_logs_2024_12", ("2024-12-01", "2025-01-01")),
+            ("mcp_request_logs_2025_01", ("2025-01-01", "2025-02-01")),
+        ]
+        assert "PARTITION OF mcp_request_logs FOR VALUES FROM (%s) TO (%s)" in cursor.executed[0][0]
+        assert not cursor.statements("SELECT c.relname")
+
+    @pytest.mark.parametrize("action, dropped", [("drop", True), ("detach", False)])
+    def test_retention_retires_only_old_partitions(self, monkeypatch, action, dropped):
+        """Test that partitions before the retention cutoff are detached, and dropped unless detach is configured"""
+        fixed_today(monkeypatch, date(2024, 2, 10))
+        monkeypatch.setattr(zen_coordinator, "LOG_RETENTION_ACTION", action)
+        cursor = RecordingCursor(results=[[
+            ("mcp_request_logs_2023_10",), ("mcp_request_logs_2023_11",),
+            ("mcp_request_logs_2024_02",), ("other_table_2020_01",),
+        ]])
+        maintain_log_partitions(cursor)
+
+        # Three months back from February 2024 keeps November 2023 onwards
+        assert cursor.statements("ALTER TABLE") == [
+            ("ALTER TABLE mcp_request_logs DETACH PARTITION mcp_request_logs_2023_10", None)
+        ]
+        drops = [sql for sql, _ in cursor.statements("DROP TABLE")]
+        assert drops == (["DROP TABLE mcp_request_logs_2023_10"] if dropped else [])
+
+    def test_create_partitioned_logs(self):
+        """Test that the log table is range partitioned on timestamp"""
+        cursor = RecordingCursor()
+        create_partitioned_logs(cursor)
+        [(sql, _)] = cursor.executed
+        assert sql.startswith("CREATE TABLE mcp_request_logs (")
+        assert "PRIMARY KEY (id, timestamp) ) PARTITION BY RANGE (timestamp);" in sql
+
+    def test_start_migration_renames_and_backfills_partitions(self, monkeypatch):
+        """Test the legacy rename, past month partitions from the retention cutoff, and the id sequence"""
+        fixed_today(monkeypatch, date(2024, 3, 5))
+        cursor = RecordingCursor(results=[[(datetime(2023, 6, 1, 12), 42)]])
+        start_log_migration(cursor)
+
+        assert cursor.executed[0][0] == "ALTER TABLE mcp_request_logs RENAME TO mcp_request_logs_legacy"
+        assert cursor.statements("CREATE TABLE mcp_request_logs (")
+        assert [name for name, _ in self.created(cursor)] == [
+            "mcp_request_logs_2023_12", "mcp_request_logs_2024_01", "mcp_request_logs_2024_02"
+        ]
+        assert cursor.statements("SELECT setval")[0][1] == (42,)
+
+    def test_start_migration_of_empty_table(self, monkeypatch):
+        """Test that an empty legacy table needs no backfill partitions or sequence bump"""
+        fixed_today(monkeypatch, date(2024, 3, 5))
+        cursor = RecordingCursor(results=[[(None, None)]])
+        start_log_migration(cursor)
+        assert self.created(cursor) == []
+        assert not cursor.statements("SELECT setval")
+
+    @pytest.fixture
+    def setup_run(self, monkeypatch):
+        """Run setup_database against a recording cursor, capturing started threads"""
+        fixed_today(monkeypatch, date(2024, 3, 5))
+        monkeypatch.setattr(zen_coordinator, "LOG_MAINTENANCE_INTERVAL", 0)
+        started = []
+
+        class FakeThread:
+            def __init__(self, target, daemon=False):
+                self.target = target
+
+            def start(self):
+                started.append(self.target)
+
+        monkeypatch.setattr(zen_coordinator.threading, "Thread", FakeThread)
+
+        def run(relkind, legacy_exists, legacy_stats=None):
+            cursor = RecordingCursor(results=[
+                [(relkind,)] if relkind else [],
+                *([[legacy_stats]] if legacy_stats else []),
+                [],
+                [(legacy_exists,)],
+            ])
+
+            class FakeConnection:
+                def cursor(self):
+                    return cursor
+
+                def commit(self):
+                    pass
+
+                def close(self):
+                    pass
+
+            monkeypatch.setattr(zen_coordinator.psycopg2, "connect", lambda **kwargs: FakeConnection())
+            zen_coordinator.setup_database()
+            return cursor, started
+
+        return run
+
+    def test_setup_migrates_plain_table(self, setup_run):
+        """Test that a plain log table is swapped out and the background move started"""
+        cursor, started = setup_run("r", True, legacy_stats=(datetime(2024, 2, 1), 7))
+        assert cursor.statements("ALTER TABLE mcp_request_logs RENAME TO mcp_request_logs_legacy")
+        assert started == [zen_coordinator.migrate_legacy_logs]
+
+    def test_setup_resumes_existing_migration(self, setup_run):
+        """Test that a restart with mcp_request_logs_legacy still present resumes without renaming again"""
+        cursor, started = setup_run("p", True)
+        assert not cursor.statements("ALTER TABLE mcp_request_logs RENAME")
+        assert not cursor.statements("CREATE TABLE mcp_request_logs (")
+        assert started == [zen_coordinator.migrate_legacy_logs]
+
+    def test_setup_partitioned_table_without_legacy(self, setup_run):
+        """Test that a finished migration does nothing beyond partition maintenance"""
+        cursor, started = setup_run("p", False)
+        assert not cursor.statements("ALTER TABLE mcp_request_logs RENAME")
+        assert started == []
+        assert cursor.statements("CREATE TABLE IF NOT EXISTS mcp_request_logs_2024_03")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -9,8 +9,12 @@ import socket
 import urllib.parse
 import urllib.request
 from http.server import HTTPServer, BaseHTTPRequestHandler
+from datetime import date
 import logging
+import threading
+import time
 import uuid
+from collections import OrderedDict
 import psycopg2
 import redis
 
@@ -110,6 +114,177 @@ else:
         "db": 0
     }
 
+# Request log partitioning: monthly range partitions on timestamp
+LOG_PARTITIONS_AHEAD = int(os.getenv("MCP_LOG_PARTITIONS_AHEAD", "2"))
+LOG_RETENTION_MONTHS = int(os.getenv("MCP_LOG_RETENTION_MONTHS", "6"))
+LOG_RETENTION_ACTION = os.getenv("MCP_LOG_RETENTION_ACTION", "drop")  # drop | detach
+LOG_MAINTENANCE_INTERVAL = int(os.getenv("MCP_LOG_MAINTENANCE_INTERVAL", "86400"))
+LOG_MIGRATION_BATCH_SIZE = int(os.getenv("MCP_LOG_MIGRATION_BATCH_SIZE", "5000"))
+
+# Near cache: in-process copies of cached service responses (mcp:* keys),
+# invalidated through Redis CLIENT TRACKING; the TTL is only a safety bound
+NEAR_CACHE_ENABLED = os.getenv("MCP_NEAR_CACHE", "false").lower() == "true"
+NEAR_CACHE_MAX_ENTRIES = int(os.getenv("MCP_NEAR_CACHE_MAX_ENTRIES", "1000"))
+NEAR_CACHE_MAX_BYTES = int(os.getenv("MCP_NEAR_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+NEAR_CACHE_TTL = float(os.getenv("MCP_NEAR_CACHE_TTL", "300"))
+NEAR_CACHE_PREFIX = "mcp:"
+
+class NearCache:
+    """Bounded in-process LRU of Redis values, kept coherent by CLIENT TRACKING
+
+    A background thread holds one connection with tracking on in BCAST mode
+    for the mcp: prefix, redirected to itself and subscribed to
+    __redis__:invalidate. Entries are only served while it is connected, and
+    a read that overlaps an invalidation of its key is not stored.
+    """
+    INVALIDATE_CHANNEL = b"__redis__:invalidate"
+    PING_INTERVAL = 5.0
+
+    def __init__(self, max_entries=NEAR_CACHE_MAX_ENTRIES, max_bytes=NEAR_CACHE_MAX_BYTES, ttl=NEAR_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, raw)
+        self.bytes = 0
+        self.fetching = {}  # keys with reads in flight
+        self.dirty = set()  # in-flight keys invalidated since their read was sent
+        self.flushes = 0
+        self.connected = False
+        self.thread = None
+        self.hits = self.misses = self.invalidations = self.evictions = 0
+
+    def get(self, key, fetch):
+        """Return the local copy of key, or fetch() it from Redis and keep it"""
+        if not self.connected or not key.startswith(NEAR_CACHE_PREFIX):
+            return fetch()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            self.fetching[key] = self.fetching.get(key, 0) + 1
+            flushes = self.flushes
+
+        raw = None
+        try:
+            raw = fetch()
+            return raw
+        finally:
+            with self.lock:
+                if raw is not None and key not in self.dirty and flushes == self.flushes and self.connected:
+                    self._put(key, raw)
+                self.fetching[key] -= 1
+                if not self.fetching[key]:
+                    del self.fetching[key]
+                    self.dirty.discard(key)
+
+    def _put(self, key, raw):
+        if len(raw) > self.max_bytes:
+            return
+        self._drop(key)
+        self.entries[key] = (time.monotonic() + self.ttl, raw)
+        self.bytes += len(raw)
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[1])
+
+    def invalidate(self, keys=None):
+        """Drop keys (str or bytes), or everything when keys is None"""
+        with self.lock:
+            if keys is None:
+                self.entries.clear()
+                self.bytes = 0
+                self.flushes += 1
+                self.invalidations += 1
+                return
+            for key in keys:
+                key = key.decode("utf-8", errors="replace") if isinstance(key, bytes) else key
+                if key in self.entries or key in self.fetching:
+                    self._drop(key)
+                    if key in self.fetching:
+                        self.dirty.add(key)
+                    self.invalidations += 1
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.listen, daemon=True)
+            self.thread.start()
+
+    def listen(self):
+        """Hold the tracking connection open and apply invalidations; reconnect on failure"""
+        # RESP2, where invalidations arrive as pub/sub messages on the redirect connection
+        pool = redis.ConnectionPool(**REDIS_CONFIG, protocol=2, socket_timeout=5, socket_connect_timeout=5)
+        delay = 1.0
+        while True:
+            connection = pool.make_connection()
+            try:
+                connection.connect()
+                connection.send_command("CLIENT", "ID")
+                client_id = connection.read_response()
+                connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", client_id,
+                                        "BCAST", "PREFIX", NEAR_CACHE_PREFIX)
+                connection.read_response()
+                connection.send_command("SUBSCRIBE", self.INVALIDATE_CHANNEL)
+                connection.read_response()
+
+                self.invalidate()
+                self.connected = True
+                delay = 1.0
+                logging.info("Near cache tracking enabled")
+
+                awaiting_pong = False
+                while True:
+                    if not connection.can_read(timeout=self.PING_INTERVAL):
+                        if awaiting_pong:
+                            raise ConnectionError("Tracking connection stopped answering PING")
+                        connection.send_command("PING")
+                        awaiting_pong = True
+                        continue
+                    message = connection.read_response()
+                    if message[0] == b"pong":
+                        awaiting_pong = False
+                    elif message[0] == b"message" and message[1] == self.INVALIDATE_CHANNEL:
+                        # A nil key list means the whole database was flushed
+                        self.invalidate(message[2])
+            except redis.ResponseError as e:
+                logging.error(f"Near cache disabled, CLIENT TRACKING unavailable: {e}")
+                return
+            except Exception as e:
+                logging.warning(f"Near cache tracking connection lost: {e}")
+            finally:
+                self.connected = False
+                self.invalidate()
+                connection.disconnect()
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.thread is not None,
+            "connected": self.connected,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions
+        }
+
+near_cache = NearCache()
+
 def get_redis_client():
     """Get Redis client for caching"""
     try:
@@ -152,7 +327,6 @@ def check_mcp_service_health(port, container_name=None):
 
 def call_mcp_service(port, method, params=None, container_name=None):
     """Call MCP service using proper JSON-RPC 2.0 protocol with caching"""
-    import time
     start_time = time.time()
     
     try:
@@ -161,7 +335,7 @@ def call_mcp_service(port, method, params=None, container_name=None):
         cache_key = f"mcp:{port}:{method}:{json.dumps(params, sort_keys=True)}"
         
         if redis_client and method in ["tools/list", "health"]:
-            cached = redis_client.get(cache_key)
+            cached = near_cache.get(cache_key, lambda: redis_client.get(cache_key))
             if cached:
                 return {
                     "success": True,
@@ -202,6 +376,7 @@ def call_mcp_service(port, method, params=None, container_name=None):
                 # Cache successful responses
                 if redis_client and method in ["tools/list", "health"]:
                     redis_client.setex(cache_key, 300, json.dumps(response_data))  # 5min cache
+                    near_cache.invalidate([cache_key])
                 
                 response_time = time.time() - start_time
                 return {
@@ -245,6 +420,19 @@ def _execute_http_request(url, method="GET", data=None):
         return {"success": False, "error": f"Request failed: {str(e)}"}
 
 
+def _memory_filter_args(tool_args):
+    """Query parameters for the optional memory list/search filters"""
+    args = {
+        key: tool_args[key]
+        for key in ("agent", "type", "min_importance", "max_importance")
+        if tool_args.get(key) is not None
+    }
+    if tool_args.get("include_archive"):
+        args["include_archive"] = "true"
+    if tool_args.get("metadata_filter"):
+        args["metadata_filter"] = json.dumps(tool_args["metadata_filter"])
+    return args
+
 def adapt_to_native_api(port, method, params=None, container_name=None):
     """Adapt MCP calls to native FastAPI endpoints as fallback."""
     
@@ -256,9 +444,12 @@ def adapt_to_native_api(port, method, params=None, container_name=None):
         if tool_name == "search_memories":
             hostname = container_name if container_name else "localhost"
             service_port = 8000 if container_name else port
-            query = urllib.parse.quote(tool_args.get("query", ""))
-            limit = tool_args.get("limit", 10)
-            url = f"http://{hostname}:{service_port}/memory/search?query={query}&limit={limit}"
+            query_string = urllib.parse.urlencode({
+                "query": tool_args.get("query", ""),
+                "limit": tool_args.get("limit", 10),
+                **_memory_filter_args(tool_args)
+            })
+            url = f"http://{hostname}:{service_port}/memory/search?{query_string}"
             return _execute_http_request(url, method="GET")
 
         elif tool_name == "memory_stats":
@@ -268,13 +459,22 @@ def adapt_to_native_api(port, method, params=None, container_name=None):
             return _execute_http_request(url, method="GET")
 
         elif tool_name == "list_memories":
-            limit = tool_args.get("limit", 20)
-            offset = tool_args.get("offset", 0)
+            query_string = urllib.parse.urlencode({
+                "limit": tool_args.get("limit", 20),
+                "offset": tool_args.get("offset", 0),
+                **_memory_filter_args(tool_args)
+            })
             hostname = container_name if container_name else "localhost"
             service_port = 8000 if container_name else port
-            url = f"http://{hostname}:{service_port}/memory/list?limit={limit}&offset={offset}"
+            url = f"http://{hostname}:{service_port}/memory/list?{query_string}"
             return _execute_http_request(url, method="GET")
             
+        elif tool_name == "get_context":
+            hostname = container_name if container_name else "localhost"
+            service_port = 8000 if container_name else port
+            url = f"http://{hostname}:{service_port}/memory/context"
+            return _execute_http_request(url, method="POST", data=tool_args)
+
         elif tool_name == "store_memory":
             hostname = container_name if container_name else "localhost"
             service_port = 8000 if container_name else port
@@ -398,6 +598,7 @@ class ZENCoordinator(BaseHTTPRequestHandler):
             "services_total": total_services,
             "database_healthy": db_healthy,
             "redis_healthy": redis_healthy,
+            "near_cache": near_cache.stats(),
             "architecture": "organized PostgreSQL + Redis"
         }).encode())
     
@@ -442,7 +643,7 @@ class ZENCoordinator(BaseHTTPRequestHandler):
                        AVG(response_time) as avg_time,
                        SUM(CASE WHEN success THEN 1 ELSE 0 END) as success_count
                 FROM mcp_request_logs
-                WHERE timestamp >= NOW() - INTERVAL '24 hours'
+                WHERE timestamp >= LOCALTIMESTAMP - INTERVAL '24 hours'
                 GROUP BY service, tool
                 ORDER BY count DESC
             """)
@@ -614,23 +815,147 @@ class ZENCoordinator(BaseHTTPRequestHandler):
         
         return None, None, None
 
+def _add_months(month, count):
+    """First day of the month count months after month"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def ensure_log_partition(cursor, month):
+    """Create the mcp_request_logs partition for the month starting at month"""
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS mcp_request_logs_{month:%Y_%m} PARTITION OF mcp_request_logs "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        (month.isoformat(), _add_months(month, 1).isoformat())
+    )
+
+def _retention_cutoff():
+    """First month still kept under the retention policy, or None to keep all"""
+    if LOG_RETENTION_MONTHS <= 0:
+        return None
+    return _add_months(date.today().replace(day=1), -LOG_RETENTION_MONTHS)
+
+def maintain_log_partitions(cursor):
+    """Create partitions ahead of time and retire those past retention"""
+    current = date.today().replace(day=1)
+    for offset in range(LOG_PARTITIONS_AHEAD + 1):
+        ensure_log_partition(cursor, _add_months(current, offset))
+
+    if _retention_cutoff() is None:
+        return
+    cutoff = _retention_cutoff().strftime("%Y_%m")
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'mcp_request_logs'::regclass
+    """)
+    for (partition,) in cursor.fetchall():
+        if partition.startswith("mcp_request_logs_") and partition[-7:] < cutoff:
+            cursor.execute(f"ALTER TABLE mcp_request_logs DETACH PARTITION {partition}")
+            if LOG_RETENTION_ACTION == "drop":
+                cursor.execute(f"DROP TABLE {partition}")
+            logging.info(f"Retired request log partition {partition} ({LOG_RETENTION_ACTION})")
+
+def create_partitioned_logs(cursor):
+    """Create mcp_request_logs as a monthly range-partitioned table"""
+    cursor.execute("""
+        CREATE TABLE mcp_request_logs (
+            id BIGSERIAL,
+            service VARCHAR(50),
+            tool VARCHAR(100),
+            success BOOLEAN,
+            response_time FLOAT,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+    """
+    )
+
+def start_log_migration(cursor):
+    """Swap a plain mcp_request_logs heap for a partitioned table
+
+    The old table is renamed to mcp_request_logs_legacy in the same
+    transaction, so new requests log into partitions straight away while
+    migrate_legacy_logs() moves the old rows over in the background.
+    """
+    cursor.execute("ALTER TABLE mcp_request_logs RENAME TO mcp_request_logs_legacy")
+    cursor.execute("ALTER TABLE mcp_request_logs_legacy RENAME CONSTRAINT mcp_request_logs_pkey TO mcp_request_logs_legacy_pkey")
+    cursor.execute("ALTER INDEX IF EXISTS idx_mcp_logs_timestamp RENAME TO idx_mcp_logs_legacy_timestamp")
+    create_partitioned_logs(cursor)
+
+    cursor.execute("SELECT MIN(timestamp), MAX(id) FROM mcp_request_logs_legacy")
+    oldest, max_id = cursor.fetchone()
+    if oldest:
+        month = max(oldest.date().replace(day=1), _retention_cutoff() or date.min)
+        while month < date.today().replace(day=1):
+            ensure_log_partition(cursor, month)
+            month = _add_months(month, 1)
+    if max_id:
+        cursor.execute("SELECT setval(pg_get_serial_sequence('mcp_request_logs', 'id'), %s)", (max_id,))
+
+def migrate_legacy_logs():
+    """Move rows from mcp_request_logs_legacy in small batches, newest first
+
+    Rows already past the retention policy are dropped instead of moved.
+    """
+    cutoff = _retention_cutoff() or date.min
+    try:
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        cursor = conn.cursor()
+        moved = 0
+        while True:
+            cursor.execute("""
+                WITH moved AS (
+                    DELETE FROM mcp_request_logs_legacy WHERE id IN (
+                        SELECT id FROM mcp_request_logs_legacy ORDER BY id DESC LIMIT %s
+                    )
+                    RETURNING id, service, tool, success, response_time, timestamp
+                )
+                INSERT INTO mcp_request_logs (id, service, tool, success, response_time, timestamp)
+                SELECT id, service, tool, success, response_time, COALESCE(timestamp, LOCALTIMESTAMP)
+                FROM moved
+                WHERE COALESCE(timestamp, LOCALTIMESTAMP) >= %s
+            """, (LOG_MIGRATION_BATCH_SIZE, cutoff))
+            moved += cursor.rowcount
+            conn.commit()
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM mcp_request_logs_legacy)")
+            if not cursor.fetchone()[0]:
+                break
+            time.sleep(0.1)
+
+        cursor.execute("DROP TABLE mcp_request_logs_legacy")
+        conn.commit()
+        cursor.close()
+        conn.close()
+        logging.info(f"Request log migration finished: {moved} rows moved into partitions")
+    except Exception as e:
+        logging.warning(f"Request log migration failed: {e}")
+
+def log_partition_maintenance_loop():
+    """Keep request log partitions ahead of time and within retention"""
+    while True:
+        time.sleep(LOG_MAINTENANCE_INTERVAL)
+        try:
+            conn = psycopg2.connect(**POSTGRES_CONFIG)
+            cursor = conn.cursor()
+            maintain_log_partitions(cursor)
+            conn.commit()
+            cursor.close()
+            conn.close()
+        except Exception as e:
+            logging.warning(f"Request log partition maintenance failed: {e}")
+
 def setup_database():
     """Setup database tables for logging"""
     try:
         conn = psycopg2.connect(**POSTGRES_CONFIG)
         cursor = conn.cursor()
         
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS mcp_request_logs (
-                id SERIAL PRIMARY KEY,
-                service VARCHAR(50),
-                tool VARCHAR(100),
-                success BOOLEAN,
-                response_time FLOAT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """
-        )
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('mcp_request_logs')")
+        existing = cursor.fetchone()
+        if existing is None:
+            create_partitioned_logs(cursor)
+        elif existing[0] == "r":
+            start_log_migration(cursor)
         
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_mcp_logs_timestamp 
@@ -638,11 +963,20 @@ def setup_database():
         """
         )
         
+        maintain_log_partitions(cursor)
+        cursor.execute("SELECT to_regclass('mcp_request_logs_legacy') IS NOT NULL")
+        migrating = cursor.fetchone()[0]
+        
         conn.commit()
         cursor.close()
         conn.close()
         print("✅ Database tables created/verified")
         
+        if migrating:
+            threading.Thread(target=migrate_legacy_logs, daemon=True).start()
+        if LOG_MAINTENANCE_INTERVAL > 0:
+            threading.Thread(target=log_partition_maintenance_loop, daemon=True).start()
+        
     except Exception as e:
         print(f"⚠️ Database setup warning: {e}")
 
@@ -657,6 +991,9 @@ def main():
     # Setup database
     setup_database()
     
+    if NEAR_CACHE_ENABLED:
+        near_cache.start()
+    
     # Start HTTP server
     server = HTTPServer(("0.0.0.0", 8020), ZENCoordinator)
     
@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+"""
+Memory MCP Service Tests
+"""
+import pytest
+from datetime import date, datetime
+
+# Import the main app
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+from fastapi import HTTPException
+from main import (
+    MemoryCache, dedup_batch, ensure_stats_table, archive_cold_memories, content_hash, expire_memories, fetch_changes, memory_filters,
+    parse_metadata_filter, parse_type_ttls, resolve_change_position, retire_archive_partitions
+)
+
+class FakeCursor:
+    """Records executed statements and replays queued fetch results"""
+
+    def __init__(self, results=None, rowcount=0):
+        self.executed = []
+        self.results = list(results or [])
+        self.rowcount = rowcount
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+
+    def fetchall(self):
+        return self.results.pop(0) if self.results else []
+
+    def fetchone(self):
+        rows = self.fetchall()
+        return rows[0] if rows else None
+
+    def statements(self, prefix):
+        return [(sql, params) for sql, params in self.executed if sql.startswith(prefix)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeConnection:
+    """Hands out a single FakeCursor and records commits and rollbacks"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+        self.rolled_back = False
+        self.closed = False
+
+    def cursor(self, cursor_factory=None):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+def memory_row(memory_id, archived=False):
+    return {
+        "id": memory_id, "content": f"memory {memory_id}", "type": "user", "importance": 0.5,
+        "agent": "claude-code", "timestamp": datetime(2024, 1, 1), "metadata": {},
+        "hit_count": 1, "archived": archived
+    }
+
+class TestContentHash:
+    """Test content normalisation for deduplication"""
+
+    def test_whitespace_and_case_are_ignored(self):
+        """Test that trivially different content hashes the same"""
+        assert content_hash("User prefers  dark mode\n") == content_hash("user prefers dark mode")
+
+    def test_different_content_differs(self):
+        """Test that distinct content hashes differently"""
+        assert content_hash("dark mode") != content_hash("light mode")
+
+class TestTypeTTLs:
+    """Test per-type TTL configuration parsing"""
+
+    def test_parse(self):
+        """Test parsing a type=seconds list"""
+        assert parse_type_ttls("working=86400, session=600") == {"working": 86400, "session": 600}
+
+    def test_parse_empty(self):
+        """Test that an empty spec disables TTLs"""
+        assert parse_type_ttls("") == {}
+
+class TestMemoryCache:
+    """Test the generation-based read-through cache"""
+
+    def test_hit_after_set(self):
+        """Test that a cached value is served within its generation"""
+        cache = MemoryCache(max_entries=10, ttl=60)
+        generation = cache.generation()
+        assert cache.get("search:x", generation) is None
+        cache.set("search:x", [{"id": 1}], generation)
+        assert cache.get("search:x", generation) == [{"id": 1}]
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    def test_invalidate_starts_new_generation(self):
+        """Test that entries cached before a write are never served after it"""
+        cache = MemoryCache(max_entries=10, ttl=60)
+        generation = cache.generation()
+        cache.set("list:100:0:False", [{"id": 1}], generation)
+        cache.invalidate()
+        assert cache.get("list:100:0:False", cache.generation()) is None
+
+    def test_read_started_before_write_is_not_served(self):
+        """Test that a result computed before an invalidation stays in the old generation"""
+        cache = MemoryCache(max_entries=10, ttl=60)
+        generation = cache.generation()
+        cache.invalidate()
+        cache.set("search:x", [{"id": 1}], generation)
+        assert cache.get("search:x", cache.generation()) is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = MemoryCache(max_entries=2, ttl=60)
+        generation = cache.generation()
+        cache.set("a", 1, generation)
+        cache.set("b", 2, generation)
+        cache.get("a", generation)
+        cache.set("c", 3, generation)
+        assert cache.get("b", generation) is None
+        assert cache.get("a", generation) == 1
+
+    def test_ttl_expiry(self):
+        """Test that expired entries miss"""
+        cache = MemoryCache(max_entries=10, ttl=0)
+        generation = cache.generation()
+        cache.set("a", 1, generation)
+        assert cache.get("a", generation) is None
+
+    def test_redis_calls_run_off_the_event_loop(self):
+        """Test that lookup, set and invalidate reach Redis from a worker thread"""
+        import asyncio
+        import threading
+
+        class ThreadRecordingRedis:
+            def __init__(self):
+                self.data = {}
+                self.threads = []
+
+            def get(self, key):
+                self.threads.append(threading.current_thread())
+                return self.data.get(key)
+
+            def setex(self, key, ttl, value):
+                self.threads.append(threading.current_thread())
+                self.data[key] = value
+
+            def incr(self, key):
+                self.threads.append(threading.current_thread())
+                self.data[key] = int(self.data.get(key) or 0) + 1
+
+        cache = MemoryCache(max_entries=10, ttl=60)
+        cache.redis = ThreadRecordingRedis()
+
+        async def exercise():
+            generation, cached = await cache.lookup("search:x")
+            assert (generation, cached) == (0, None)
+            await cache.offload(cache.set, "search:x", [{"id": 1}], generation)
+            cache.entries.clear()
+            assert await cache.lookup("search:x") == (0, [{"id": 1}])
+            await cache.offload(cache.invalidate)
+            assert await cache.lookup("search:x") == (1, None)
+
+        asyncio.run(exercise())
+        assert cache.redis.threads
+        assert threading.main_thread() not in cache.redis.threads
+
+class TestCompaction:
+    """Test TTL expiry, cold archiving and archive retention"""
+
+    def test_compaction_is_opt_in(self, monkeypatch):
+        """Test that the background compactor is off unless an interval is configured"""
+        import asyncio
+        import importlib
+        monkeypatch.delenv("MEMORY_COMPACT_INTERVAL", raising=False)
+        try:
+            assert importlib.reload(main).COMPACT_INTERVAL == 0
+        finally:
+            importlib.reload(main)
+
+        monkeypatch.setattr(main, "COMPACT_INTERVAL", 0)
+        monkeypatch.setattr(main, "STATS_RECONCILE_INTERVAL", 0)
+        monkeypatch.setattr(main, "compact_task", None)
+        monkeypatch.setattr(main, "ensure_table_exists", lambda: None)
+        monkeypatch.setattr(main.change_feed, "start", lambda: None)
+        asyncio.run(main.startup_event())
+        assert main.compact_task is None
+
+    def test_expire_without_ttls_does_nothing(self, monkeypatch):
+        """Test that no rows are deleted when no type has a TTL"""
+        monkeypatch.setattr(main, "MEMORY_TYPE_TTLS", {})
+        cursor = FakeCursor()
+        assert expire_memories(cursor, 100) == 0
+        assert cursor.executed == []
+
+    def test_expire_deletes_per_type(self, monkeypatch):
+        """Test one bounded DELETE per configured type"""
+        monkeypatch.setattr(main, "MEMORY_TYPE_TTLS", {"working": 86400, "session": 600})
+        cursor = FakeCursor(rowcount=3)
+        assert expire_memories(cursor, 100) == 6
+        deletes = cursor.statements("DELETE FROM unified_memory")
+        assert [params for _, params in deletes] == [("working", 86400, 100), ("session", 600, 100)]
+
+    def test_archive_nothing_cold(self):
+        """Test that no partition or move happens when nothing is below the threshold"""
+        cursor = FakeCursor(results=[[]])
+        assert archive_cold_memories(cursor, 50) == 0
+        assert len(cursor.executed) == 1
+        sql, params = cursor.executed[0]
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert params["threshold"] == main.ARCHIVE_THRESHOLD and params["limit"] == 50
+
+    def test_archive_moves_cold_rows(self):
+        """Test that cold rows get month partitions and are moved in one statement"""
+        cold = [(1, datetime(2024, 1, 5)), (2, datetime(2024, 1, 20)), (7, datetime(2024, 3, 1))]
+        cursor = FakeCursor(results=[cold], rowcount=3)
+        assert archive_cold_memories(cursor, 50) == 3
+
+        partitions = cursor.statements("CREATE TABLE IF NOT EXISTS unified_memory_archive_")
+        assert sorted(sql.split()[5] for sql, _ in partitions) == [
+            "unified_memory_archive_2024_01", "unified_memory_archive_2024_03"
+        ]
+        [(move_sql, move_params)] = cursor.statements("WITH moved AS")
+        assert "DELETE FROM unified_memory WHERE id = ANY" in move_sql
+        assert "INSERT INTO unified_memory_archive" in move_sql
+        assert move_params == ([1, 2, 7],)
+
+        # The move is bracketed so the change log records it as 'archive'
+        settings = [sql for sql, _ in cursor.statements("SELECT set_config('memory.delete_operation'")]
+        assert settings == [
+            "SELECT set_config('memory.delete_operation', 'archive', true)",
+            "SELECT set_config('memory.delete_operation', '', true)",
+        ]
+        assert cursor.executed[-1][0] == settings[-1]
+
+    def test_retention_disabled(self, monkeypatch):
+        """Test that the archive is kept forever by default"""
+        monkeypatch.setattr(main, "ARCHIVE_RETENTION_MONTHS", 0)
+        cursor = FakeCursor()
+        assert retire_archive_partitions(cursor) == []
+        assert cursor.executed == []
+
+    @pytest.mark.parametrize("action, dropped", [("drop", True), ("detach", False)])
+    def test_retention_retires_old_partitions(self, monkeypatch, action, dropped):
+        """Test that partitions before the cutoff month are detached, and dropped unless detach is configured"""
+        monkeypatch.setattr(main, "ARCHIVE_RETENTION_MONTHS", 2)
+        monkeypatch.setattr(main, "ARCHIVE_RETENTION_ACTION", action)
+
+        class FixedDate(date):
+            @classmethod
+            def today(cls):
+                return cls(2024, 5, 15)
+
+        monkeypatch.setattr(main, "date", FixedDate)
+        partitions = [("unified_memory_archive_2024_02",), ("unified_memory_archive_2024_03",),
+                      ("unified_memory_archive_2024_04",)]
+        cursor = FakeCursor(results=[partitions])
+        assert retire_archive_partitions(cursor) == ["unified_memory_archive_2024_02"]
+        assert cursor.statements("ALTER TABLE unified_memory_archive DETACH PARTITION") == [
+            ("ALTER TABLE unified_memory_archive DETACH PARTITION unified_memory_archive_2024_02", None)
+        ]
+        assert bool(cursor.statements("DROP TABLE")) == dropped
+
+class TestBulkEndpoints:
+    """Test /memory/get_many and /memory/delete_many against a mocked cursor"""
+
+    @pytest.fixture
+    def client(self):
+        from fastapi.testclient import TestClient
+        return TestClient(main.app)
+
+    def use_cursor(self, monkeypatch, cursor):
+        conn = FakeConnection(cursor)
+        monkeypatch.setattr(main, "get_memory_connection", lambda: conn)
+        return conn
+
+    def test_get_many_keeps_request_order(self, client, monkeypatch):
+        """Test that memories come back in request order, whatever order the rows arrive in"""
+        cursor = FakeCursor(results=[[memory_row(3), memory_row(1), memory_row(2)]])
+        conn = self.use_cursor(monkeypatch, cursor)
+        response = client.post("/memory/get_many", json={"ids": [2, 3, 1]})
+        assert response.status_code == 200
+        assert [memory["id"] for memory in response.json()["memories"]] == [2, 3, 1]
+        assert response.json()["missing"] == []
+        assert len(cursor.executed) == 1 and cursor.executed[0][1] == ([2, 3, 1],)
+        assert conn.closed
+
+    def test_get_many_reports_missing(self, client, monkeypatch):
+        """Test that ids without a row are listed as missing, in request order"""
+        self.use_cursor(monkeypatch, FakeCursor(results=[[memory_row(5, archived=True)]]))
+        response = client.post("/memory/get_many", json={"ids": [9, 5, 4], "include_archive": True})
+        body = response.json()
+        assert [memory["id"] for memory in body["memories"]] == [5]
+        assert body["memories"][0]["archived"] is True
+        assert body["missing"] == [9, 4]
+
+    def test_get_many_collapses_duplicates(self, client, monkeypatch):
+        """Test that a repeated id is queried and returned once"""
+        cursor = FakeCursor(results=[[memory_row(1), memory_row(2)]])
+        self.use_cursor(monkeypatch, cursor)
+        body = client.post("/memory/get_many", json={"ids": [1, 2, 1, 7, 7]}).json()
+        assert [memory["id"] for memory in body["memories"]] == [1, 2]
+        assert body["missing"] == [7]
+        assert cursor.executed[0][1] == ([1, 2, 7],)
+
+    def test_delete_many_reports_not_found(self, client, monkeypatch):
+        """Test deleted and not_found lists follow request order and duplicates collapse"""
+        cursor = FakeCursor(results=[[(4,), (2,)]])
+        conn = self.use_cursor(monkeypatch, cursor)
+        body = client.post("/memory/delete_many", json={"ids": [2, 8, 4, 2]}).json()
+        assert body == {"success": True, "deleted": [2, 4], "not_found": [8]}
+        assert cursor.executed[0][1] == ([2, 8, 4],)
+        assert conn.committed and conn.closed
+
+    def test_delete_many_rolls_back_on_error(self, client, monkeypatch):
+        """Test that a failing delete rolls back and returns 500"""
+        class FailingCursor(FakeCursor):
+            def execute(self, sql, params=None):
+                raise RuntimeError("boom")
+
+        conn = self.use_cursor(monkeypatch, FailingCursor())
+        response = client.post("/memory/delete_many", json={"ids": [1]})
+        assert response.status_code == 500
+        assert conn.rolled_back and not conn.committed
+
+class TestMemoryFilters:
+    """Test filter parsing and the generated WHERE conditions"""
+
+    def test_no_filters(self):
+        """Test that no filters produce no conditions"""
+        assert memory_filters() == ([], [])
+
+    def test_all_filters(self):
+        """Test conditions and parameters line up in a fixed order"""
+        conditions, params = memory_filters("claude-code", "project", 0.2, 0.9, {"repo": "zen"})
+        assert conditions == [
+            "agent = %s", "type = %s", "importance >= %s", "importance <= %s", "metadata @> %s"
+        ]
+        assert params[:4] == ["claude-code", "project", 0.2, 0.9]
+        assert params[4].adapted == {"repo": "zen"}
+
+    def test_zero_bounds_are_kept(self):
+        """Test that a 0.0 importance bound is a filter, not a missing value"""
+        assert memory_filters(min_importance=0.0, max_importance=0.0) == (
+            ["importance >= %s", "importance <= %s"], [0.0, 0.0]
+        )
+
+    def test_empty_metadata_filter_is_ignored(self):
+        """Test that {} adds no containment condition"""
+        assert memory_filters(metadata_filter={}) == ([], [])
+
+    def test_parse_metadata_filter(self):
+        """Test that a JSON object is decoded and an absent filter is None"""
+        assert parse_metadata_filter(None) is None
+        assert parse_metadata_filter("") is None
+        assert parse_metadata_filter('{"tags": ["a"], "n": 12345678901234567890}') == {
+            "tags": ["a"], "n": 12345678901234567890
+        }
+
+    @pytest.mark.parametrize("raw", [
+        "{not json", "[1, 2]", '"text"', "42", "null", '{"score": NaN}', '{"x": Infinity}',
+        "[" * 100000
+    ])
+    def test_malformed_metadata_filter(self, raw):
+        """Test that anything but a valid JSON object is a 400"""
+        with pytest.raises(HTTPException) as error:
+            parse_metadata_filter(raw)
+        assert error.value.status_code == 400
+
+    @pytest.mark.parametrize("path", ["/memory/list", "/memory/search?query=x"])
+    def test_malformed_metadata_filter_endpoint(self, path, monkeypatch):
+        """Test that the list and search endpoints reject a bad filter before touching the database"""
+        from fastapi.testclient import TestClient
+
+        def no_database():
+            raise AssertionError("database should not be reached")
+
+        monkeypatch.setattr(main, "get_memory_connection", no_database)
+        separator = "&" if "?" in path else "?"
+        response = TestClient(main.app).get(f"{path}{separator}metadata_filter=%5B1%5D")
+        assert response.status_code == 400
+
+    def test_filters_reach_the_query(self, monkeypatch):
+        """Test that /memory/list passes filter parameters ahead of limit and offset"""
+        from fastapi.testclient import TestClient
+        main.memory_cache.invalidate()
+        cursor = FakeCursor(results=[[memory_row(1)]])
+        monkeypatch.setattr(main, "get_memory_connection", lambda: FakeConnection(cursor))
+        response = TestClient(main.app).get(
+            "/memory/list", params={"agent": "a", "type": "t", "limit": 5, "offset": 10,
+                                    "metadata_filter": '{"k": "v"}'}
+        )
+        assert response.status_code == 200
+        sql, params = cursor.executed[0]
+        assert "WHERE agent = %s AND type = %s AND metadata @> %s" in sql
+        assert params[:2] == ("a", "t") and params[2].adapted == {"k": "v"} and params[3:] == (5, 10)
+
+class TestContextEndpoint:
+    """Test /memory/context budgets and query construction against a mocked cursor"""
+
+    @pytest.fixture
+    def run(self, monkeypatch):
+        from fastapi.testclient import TestClient
+
+        def post(body, rows=None):
+            cursor = FakeCursor(results=[rows or []])
+            monkeypatch.setattr(main, "get_memory_connection", lambda: FakeConnection(cursor))
+            response = TestClient(main.app).post("/memory/context", json=body)
+            assert response.status_code == 200
+            [(sql, params)] = cursor.executed
+            # Every placeholder has exactly one parameter
+            assert sql.count("%s") == len(params)
+            return response.json(), sql, params
+
+        return post
+
+    def context_row(self, memory_id, running_chars, candidate_count):
+        return {**memory_row(memory_id), "score": 1.5, "running_chars": running_chars,
+                "candidate_count": candidate_count}
+
+    @pytest.mark.parametrize("body, budget", [
+        ({"query": "x"}, main.CONTEXT_MAX_CHARS),
+        ({"query": "x", "max_chars": 1000}, 1000),
+        ({"query": "x", "max_tokens": 50}, 50 * main.CHARS_PER_TOKEN),
+        ({"query": "x", "max_chars": 1000, "max_tokens": 50}, 50 * main.CHARS_PER_TOKEN),
+        ({"query": "x", "max_chars": None}, main.CONTEXT_MAX_CHARS),
+    ])
+    def test_budget(self, run, body, budget):
+        """Test that max_tokens converts to characters and a null max_chars falls back to the default"""
+        result, _, params = run(body)
+        assert params[-1] == budget
+        assert result["budget_chars"] == budget
+
+    def test_query_uses_full_text_only(self, run):
+        """Test that the query is matched with the FTS expression and no ILIKE scan"""
+        _, sql, params = run({"query": "deploy plan", "agent": "ops"})
+        assert "WHERE to_tsvector('simple', content) @@ plainto_tsquery('simple', %s) AND agent = %s" in sql
+        assert "ILIKE" not in sql
+        assert params[4:7] == ("deploy plan", "deploy plan", "ops")
+
+    def test_empty_query_adds_no_text_condition(self, run):
+        """Test that a blank query ranks on importance and recency without filtering on text"""
+        _, sql, params = run({"query": "  ", "type": "project"})
+        assert "WHERE type = %s" in sql
+        assert "@@" not in sql
+        assert params[4:6] == ("  ", "project")
+        assert params[-2:] == (main.CONTEXT_CANDIDATES, main.CONTEXT_MAX_CHARS)
+
+    def test_pack_reports_usage(self, run):
+        """Test used characters, the token estimate and truncation from the packed rows"""
+        rows = [self.context_row(1, 8, 3), self.context_row(2, 16, 3)]
+        result, _, _ = run({"query": "memory", "max_chars": 20}, rows)
+        assert [memory["id"] for memory in result["memories"]] == [1, 2]
+        assert result["context"] == "- memory 1\n- memory 2"
+        assert result["used_chars"] == 16
+        assert result["estimated_tokens"] == 16 // main.CHARS_PER_TOKEN
+        assert result["truncated"] is True
+
+class TestChangeFeedPosition:
+    """Test how change feed positions are resolved and resumed"""
+
+    def use_cursor(self, monkeypatch, cursor):
+        monkeypatch.setattr(main, "get_memory_connection", lambda: FakeConnection(cursor))
+        return cursor
+
+    def test_resume_known_change(self, monkeypatch):
+        """Test that a known change id resumes after its (txid, id)"""
+        self.use_cursor(monkeypatch, FakeCursor(results=[[(10,)], [("812",)]]))
+        assert resolve_change_position(42) == ((812, 42), 42, False, 10)
+
+    def test_no_position_starts_at_head(self, monkeypatch):
+        """Test that a new consumer starts at the last commit-safe change"""
+        cursor = self.use_cursor(monkeypatch, FakeCursor(results=[[(10,)], [("900", 57)]]))
+        assert resolve_change_position(None) == ((900, 57), 57, False, 10)
+        assert "pg_snapshot_xmin(pg_current_snapshot())" in cursor.executed[-1][0]
+
+    def test_no_position_on_empty_log(self, monkeypatch):
+        """Test that an empty log starts from the beginning"""
+        self.use_cursor(monkeypatch, FakeCursor(results=[[(0,)], []]))
+        assert resolve_change_position(None) == ((0, 0), 0, False, 0)
+
+    def test_since_zero_reads_whole_log(self, monkeypatch):
+        """Test that since=0 replays from the start while nothing has been pruned"""
+        self.use_cursor(monkeypatch, FakeCursor(results=[[(1,)], []]))
+        assert resolve_change_position(0) == ((0, 0), 0, False, 1)
+
+    @pytest.mark.parametrize("since, oldest", [(0, 5), (3, 5), (999, 5)])
+    def test_pruned_position_resets(self, monkeypatch, since, oldest):
+        """Test that a position missing from the log resets to the head"""
+        self.use_cursor(monkeypatch, FakeCursor(results=[[(oldest,)], [], [("900", 57)]]))
+        assert resolve_change_position(since) == ((900, 57), 57, True, oldest)
+
+    def test_fetch_reads_after_position(self, monkeypatch):
+        """Test that only finished transactions are read, in (txid, id) order after the position"""
+        row = {**memory_row(7), "change_id": 12, "txid": "815", "memory_id": 7, "operation": "insert",
+               "changed_at": datetime(2024, 1, 1)}
+        cursor = self.use_cursor(monkeypatch, FakeCursor(results=[[row]]))
+        changes = fetch_changes((812, 42), 100)
+        sql, params = cursor.executed[0]
+        assert "(c.txid, c.id) > (%s::text::xid8, %s)" in sql
+        assert "c.txid < pg_snapshot_xmin(pg_current_snapshot())" in sql
+        assert "ORDER BY c.txid, c.id" in sql
+        assert params == ("812", 42, 100)
+        assert changes[0]["change_id"] == 12 and changes[0]["txid"] == 815
+        assert changes[0]["memory"]["id"] == 7
+
+    def test_page_endpoint(self, monkeypatch):
+        """Test that a JSON page reports the reset flag and the next position"""
+        from fastapi.testclient import TestClient
+        calls = []
+        monkeypatch.setattr(main, "resolve_change_position", lambda since: ((900, 57), 57, True, 50))
+
+        def fake_fetch(position, limit):
+            calls.append((position, limit))
+            return [{"change_id": 55, "txid": 901, "operation": "delete", "memory": None}]
+
+        monkeypatch.setattr(main, "fetch_changes", fake_fetch)
+        client = TestClient(main.app)
+        body = client.get("/memory/changes", params={"stream": "false", "since": 3, "limit": 10}).json()
+        assert body == {"changes": fake_fetch((900, 57), 10), "next_since": 55, "reset": True}
+        assert calls[0] == ((900, 57), 10)
+
+        monkeypatch.setattr(main, "fetch_changes", lambda position, limit: [])
+        body = client.get("/memory/changes", params={"stream": "false"}).json()
+        assert body == {"changes": [], "next_since": 57, "reset": True}
+
+class TestStatsCounters:
+    """Test the sharded counters behind /memory/stats"""
+
+    def use_cursor(self, monkeypatch, cursor):
+        conn = FakeConnection(cursor)
+        monkeypatch.setattr(main, "get_memory_connection", lambda: conn)
+        return conn
+
+    def test_bump_picks_a_shard(self, monkeypatch):
+        """Test that the bump function spreads writes over STATS_SHARDS rows keyed by shard"""
+        monkeypatch.setattr(main, "STATS_SHARDS", 8)
+        cursor = FakeCursor(results=[[(1,)]])
+        ensure_stats_table(cursor)
+        bump = next(sql for sql, _ in cursor.executed if "FUNCTION unified_memory_stats_bump" in sql)
+        assert "pg_backend_pid() % 8" in bump
+        assert "ON CONFLICT (dimension, key, shard)" in bump
+        assert not cursor.statements("LOCK TABLE")
+
+    def test_empty_counters_are_seeded(self):
+        """Test that a database without a total row is recounted on startup"""
+        cursor = FakeCursor(results=[[]])
+        ensure_stats_table(cursor)
+        assert cursor.statements("LOCK TABLE unified_memory IN SHARE MODE")
+        assert cursor.statements("INSERT INTO unified_memory_stats")
+
+    def test_stats_sum_the_shards(self, monkeypatch):
+        """Test that /memory/stats folds shard rows per dimension and key and averages the sums"""
+        rows = [
+            {"dimension": "total", "key": "", "memory_count": 4, "importance_sum": 2.0, "importance_count": 4},
+            {"dimension": "agent", "key": "a", "memory_count": 3, "importance_sum": 0.9, "importance_count": 3},
+            {"dimension": "agent", "key": "b", "memory_count": 1, "importance_sum": 1.1, "importance_count": 1},
+            {"dimension": "type", "key": "user", "memory_count": 4, "importance_sum": 2.0, "importance_count": 0},
+        ]
+        cursor = FakeCursor(results=[rows])
+        conn = self.use_cursor(monkeypatch, cursor)
+        from fastapi.testclient import TestClient
+        body = TestClient(main.app).get("/memory/stats").json()
+
+        sql = cursor.executed[0][0]
+        assert "SUM(memory_count)::BIGINT" in sql and "SUM(importance_count)::BIGINT" in sql
+        assert "GROUP BY dimension, key" in sql and "HAVING SUM(memory_count) > 0" in sql
+        assert body["total_memories"] == 4 and body["average_importance"] == pytest.approx(0.5)
+        assert body["unique_agents"] == 2 and body["unique_types"] == 1
+        assert body["by_agent"]["a"] == {"count": 3, "average_importance": pytest.approx(0.3)}
+        assert body["by_type"]["user"]["average_importance"] == 0.0
+        assert conn.closed
+
+    def test_stats_empty_table(self, monkeypatch):
+        """Test the zero summary when every counter is gone"""
+        self.use_cursor(monkeypatch, FakeCursor(results=[[]]))
+        from fastapi.testclient import TestClient
+        body = TestClient(main.app).get("/memory/stats").json()
+        assert body["total_memories"] == 0 and body["average_importance"] == 0.0 and body["by_agent"] == {}
+
+    def test_reconcile_rebuilds_under_lock(self, monkeypatch):
+        """Test that reconcile locks the table, replaces every counter row and commits"""
+        cursor = FakeCursor()
+        conn = self.use_cursor(monkeypatch, cursor)
+        from fastapi.testclient import TestClient
+        response = TestClient(main.app).post("/memory/stats/reconcile")
+        assert response.status_code == 200 and response.json()["success"]
+        statements = [sql.split(" (")[0] for sql, _ in cursor.executed]
+        assert statements[:3] == ["LOCK TABLE unified_memory IN SHARE MODE", "DELETE FROM unified_memory_stats",
+                                  "INSERT INTO unified_memory_stats"]
+        assert conn.committed and conn.closed
+
+    def test_reconcile_failure_rolls_back(self, monkeypatch):
+        """Test that a failed recount leaves the old counters and returns 500"""
+        class FailingCursor(FakeCursor):
+            def execute(self, sql, params=None):
+                super().execute(sql, params)
+                if sql.lstrip().startswith("INSERT"):
+                    raise RuntimeError("boom")
+
+        conn = self.use_cursor(monkeypatch, FailingCursor())
+        from fastapi.testclient import TestClient
+        response = TestClient(main.app).post("/memory/stats/reconcile")
+        assert response.status_code == 500
+        assert conn.rolled_back and not conn.committed
+
+class TestDeduplication:
+    """Test the content-hash upsert and the legacy dedup backfill"""
+
+    def use_cursor(self, monkeypatch, cursor):
+        conn = FakeConnection(cursor)
+        monkeypatch.setattr(main, "get_memory_connection", lambda: conn)
+        return conn
+
+    def test_store_upserts_on_content_hash(self, monkeypatch):
+        """Test the upsert statement, its parameters and the duplicate flag"""
+        cursor = FakeCursor(results=[[{"id": 7, "timestamp": datetime(2024, 1, 1), "hit_count": 3, "inserted": False}]])
+        conn = self.use_cursor(monkeypatch, cursor)
+        from fastapi.testclient import TestClient
+        body = TestClient(main.app).post("/memory/store", json={
+            "content": "  Deploy  NOTES ", "type": "project", "importance": 0.7, "agent": "a", "metadata": {"k": 1}
+        }).json()
+        assert body == {"success": True, "memory_id": 7, "stored_at": "2024-01-01T00:00:00",
+                        "duplicate": True, "hit_count": 3}
+
+        sql, params = cursor.executed[0]
+        assert "ON CONFLICT (content_hash) DO UPDATE SET" in sql
+        assert "hit_count = unified_memory.hit_count + 1" in sql
+        assert "importance = GREATEST(unified_memory.importance, EXCLUDED.importance)" in sql
+        assert "metadata = unified_memory.metadata || EXCLUDED.metadata" in sql
+        assert sql.count("%s") == len(params) == 6
+        assert params[:4] == ("  Deploy  NOTES ", "project", 0.7, "a")
+        assert params[4].adapted == {"k": 1}
+        assert params[5] == content_hash("deploy notes")
+        assert conn.committed
+
+    def test_store_new_memory(self, monkeypatch):
+        """Test that a first write is not reported as a duplicate"""
+        cursor = FakeCursor(results=[[{"id": 8, "timestamp": datetime(2024, 1, 1), "hit_count": 1, "inserted": True}]])
+        self.use_cursor(monkeypatch, cursor)
+        from fastapi.testclient import TestClient
+        body = TestClient(main.app).post("/memory/store", json={"content": "fresh"}).json()
+        assert body["duplicate"] is False and body["hit_count"] == 1
+
+    def test_dedup_hashes_unique_rows(self, monkeypatch):
+        """Test that a row without a twin just gets its hash"""
+        legacy = [{"id": 5, "content": "Alpha", "importance": 0.2, "hit_count": 1, "metadata": {}}]
+        cursor = FakeCursor(results=[legacy, []])
+        conn = self.use_cursor(monkeypatch, cursor)
+        assert dedup_batch(10) == {"scanned": 1, "hashed": 1, "merged": 0}
+        assert cursor.executed[-1][1] == (content_hash("Alpha"), 5)
+        assert conn.committed
+
+    def test_dedup_folds_duplicate_into_survivor(self, monkeypatch):
+        """Test that hits, importance and metadata move to the survivor and the duplicate is deleted"""
+        legacy = [{"id": 9, "content": "alpha ", "importance": 0.9, "hit_count": 4, "metadata": {"src": "old"}}]
+        cursor = FakeCursor(results=[legacy, [{"id": 3}]])
+        conn = self.use_cursor(monkeypatch, cursor)
+        assert dedup_batch(10) == {"scanned": 1, "hashed": 0, "merged": 1}
+
+        update_sql, update_params = cursor.statements("UPDATE unified_memory SET hit_count")[0]
+        assert "hit_count = hit_count + %s" in update_sql
+        assert "importance = GREATEST(importance, %s)" in update_sql
+        assert "metadata = CASE WHEN id < %s THEN metadata || %s ELSE %s || metadata END" in update_sql
+        assert update_sql.count("%s") == len(update_params)
+        hits, importance, duplicate_id, newer, older, survivor_id = update_params
+        assert (hits, importance, duplicate_id, survivor_id) == (4, 0.9, 9, 3)
+        assert newer.adapted == older.adapted == {"src": "old"}
+        assert cursor.executed[-1] == ("DELETE FROM unified_memory WHERE id = %s", (9,))
+        assert conn.committed
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
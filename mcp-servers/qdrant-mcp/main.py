@@ -3,240 +3,1602 @@
 Qdrant MCP Service - Vector database operations, embeddings, similarity search
 Port: 8023
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from qdrant_client import AsyncQdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client import AsyncQdrantClient, models
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, MatchAny, MatchExcept,
+    Range, DatetimeRange, PayloadSchemaType, Batch
+)
+import asyncio
+import base64
+import functools
+import hashlib
 import json
-from typing import Dict, List, Optional, Any, Union
-from datetime import datetime
+import re
+import shutil
+import struct
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Any, Union, AsyncIterator
+from datetime import datetime, timezone
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
 from contextlib import asynccontextmanager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Qdrant client
+# Qdrant client, or a LocalVectorStore with the same interface
 qdrant_client = None
 
+# Vector backend: "qdrant", or "local" for the in-process NumPy index. With
+# QDRANT_LOCAL_FALLBACK the local index serves (a replica of) the data when
+# Qdrant is unreachable at startup.
+VECTOR_BACKEND = os.getenv('QDRANT_BACKEND', 'qdrant')
+LOCAL_INDEX_PATH = os.getenv('QDRANT_LOCAL_PATH', '/data/qdrant-local')
+LOCAL_FALLBACK = os.getenv('QDRANT_LOCAL_FALLBACK', 'false').lower() == 'true'
+backend_mode = None  # qdrant, local, local-fallback
+
+# Bulk ingest defaults: points per upsert request and upserts in flight
+INGEST_BATCH_SIZE = int(os.getenv('QDRANT_INGEST_BATCH_SIZE', '256'))
+INGEST_PARALLEL = int(os.getenv('QDRANT_INGEST_PARALLEL', '4'))
+
+# Points fetched per scroll request when exporting a collection
+EXPORT_PAGE_SIZE = int(os.getenv('QDRANT_EXPORT_PAGE_SIZE', '1000'))
+
+# Collection metadata cache TTL (seconds) and concurrent get_collection calls for list
+COLLECTION_INFO_TTL = float(os.getenv('QDRANT_COLLECTION_INFO_TTL', '5'))
+COLLECTION_INFO_PARALLEL = int(os.getenv('QDRANT_COLLECTION_INFO_PARALLEL', '8'))
+
+# Sparse (BM25) vectors and hybrid search: default sparse vector name, BM25
+# parameters, where per-collection term statistics live, and the RRF constant
+SPARSE_VECTOR_NAME = os.getenv('QDRANT_SPARSE_VECTOR_NAME', 'text')
+BM25_K1 = float(os.getenv('QDRANT_BM25_K1', '1.2'))
+BM25_B = float(os.getenv('QDRANT_BM25_B', '0.75'))
+SPARSE_STATS_DIR = os.getenv('QDRANT_SPARSE_STATS_DIR', '/tmp/qdrant-mcp-sparse')
+BM25_LOG_COMPACT_MIN = int(os.getenv('QDRANT_BM25_LOG_COMPACT_MIN', '1000'))  # delta log entries before compacting
+RRF_K = int(os.getenv('QDRANT_RRF_K', '60'))
+
+# Text embeddings: backend (hash, sentence-transformers), micro-batching and the on-disk vector cache
+EMBEDDING_BACKEND = os.getenv('QDRANT_EMBEDDING_BACKEND', 'hash')
+EMBEDDING_MODEL = os.getenv('QDRANT_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+EMBEDDING_DIM = int(os.getenv('QDRANT_EMBEDDING_DIM', '384'))  # hash backend only
+EMBEDDING_BATCH_SIZE = int(os.getenv('QDRANT_EMBEDDING_BATCH_SIZE', '64'))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv('QDRANT_EMBEDDING_BATCH_WAIT_MS', '5'))
+EMBEDDING_WORKERS = int(os.getenv('QDRANT_EMBEDDING_WORKERS', '2'))
+EMBEDDING_CACHE_DIR = os.getenv('QDRANT_EMBEDDING_CACHE_DIR', '/tmp/qdrant-mcp-embeddings')
+EMBEDDING_CACHE_SIZE = int(os.getenv('QDRANT_EMBEDDING_CACHE_SIZE', '100000'))  # vectors, 0 disables
+
+# Text embedding service, created at startup
+embedder = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    \"\"\"Application lifespan manager\"\"\"
-    global qdrant_client
+    """Application lifespan manager"""
+    global qdrant_client, embedder, backend_mode
     
     # Startup
     try:
-        qdrant_url = os.getenv('QDRANT_URL', 'http://qdrant:6333')
-        qdrant_client = AsyncQdrantClient(url=qdrant_url, timeout=60)
-        
-        # Test connection
-        collections = await qdrant_client.get_collections()
-        logger.info(f\"Qdrant connection successful. Found {len(collections.collections)} collections\")
+        embedder = create_embedder()
+        logger.info(f"Embedding backend ready: {embedder.backend.name} (dim {embedder.backend.dim})")
     except Exception as e:
-        logger.error(f\"Failed to connect to Qdrant: {e}\")
-        qdrant_client = None
+        logger.error(f"Failed to load embedding backend: {e}")
+        embedder = None
+    
+    if VECTOR_BACKEND == 'local':
+        qdrant_client = LocalVectorStore(LOCAL_INDEX_PATH)
+        backend_mode = 'local'
+        logger.info(f"Using local vector index at {LOCAL_INDEX_PATH} ({len(qdrant_client.collections)} collections)")
+    else:
+        try:
+            qdrant_url = os.getenv('QDRANT_URL', 'http://qdrant:6333')
+            qdrant_client = AsyncQdrantClient(url=qdrant_url, timeout=60)
+            
+            # Test connection
+            collections = await qdrant_client.get_collections()
+            backend_mode = 'qdrant'
+            logger.info(f"Qdrant connection successful. Found {len(collections.collections)} collections")
+        except Exception as e:
+            logger.error(f"Failed to connect to Qdrant: {e}")
+            qdrant_client = None
+            if LOCAL_FALLBACK:
+                qdrant_client = LocalVectorStore(LOCAL_INDEX_PATH)
+                backend_mode = 'local-fallback'
+                logger.warning(f"Serving degraded from local vector index at {LOCAL_INDEX_PATH}")
     
     yield
     
     # Shutdown
+    if embedder:
+        embedder.close()
     if qdrant_client:
         await qdrant_client.close()
-        logger.info(\"Qdrant client closed\")
+        logger.info("Vector backend closed")
 
 app = FastAPI(
-    title=\"Qdrant MCP Service\",
-    description=\"Vector database operations, embeddings, and similarity search\",
-    version=\"1.0.0\",
+    title="Qdrant MCP Service",
+    description="Vector database operations, embeddings, and similarity search",
+    version="1.0.0",
     lifespan=lifespan
 )
 
 # Request/Response Models
 class CollectionRequest(BaseModel):
-    \"\"\"Collection management request\"\"\"
-    operation: str = Field(..., description=\"create, delete, list, info\")
+    """Collection management request"""
+    operation: str = Field(..., description="create, delete, list, info, create_index, delete_index")
     collection_name: Optional[str] = None
     vector_size: Optional[int] = None
-    distance: Optional[str] = \"Cosine\"  # Cosine, Euclid, Dot
+    distance: Optional[str] = "Cosine"  # Cosine, Euclid, Dot
+    field_name: Optional[str] = None  # Payload field for create_index/delete_index
+    field_type: Optional[str] = None  # keyword, integer, float, datetime, bool, text
+    # Storage and index options for create
+    quantization: Optional[str] = None  # scalar, product, binary
+    quantization_always_ram: bool = True  # Keep quantized vectors in RAM when originals are on disk
+    product_compression: str = "x16"  # x4, x8, x16, x32, x64
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    hnsw_on_disk: Optional[bool] = None
+    on_disk: bool = False  # Store original vectors in memmapped files
+    on_disk_payload: bool = False
+    indexing_threshold: Optional[int] = None  # Optimizer: KB of vectors before HNSW indexing
+    memmap_threshold: Optional[int] = None  # Optimizer: KB per segment before memmapping
+    default_segment_number: Optional[int] = None
+    # Named vectors: {name: {"size", "distance", "on_disk"}} instead of vector_size, plus sparse vector names
+    vectors: Optional[Dict[str, Dict[str, Any]]] = None
+    sparse_vectors: Optional[List[str]] = None
 
 class VectorRequest(BaseModel):
-    \"\"\"Vector operations request\"\"\"
-    operation: str = Field(..., description=\"insert, update, delete, get\")
+    """Vector operations request"""
+    operation: str = Field(..., description="insert, update, delete, get")
     collection_name: str
-    points: Optional[List[Dict[str, Any]]] = None
+    points: Optional[List[Dict[str, Any]]] = None  # each with "vector" or "vector_b64"
     point_id: Optional[Union[int, str]] = None
     vector: Optional[List[float]] = None
+    vector_b64: Optional[str] = None  # base64 little-endian float32, instead of vector
     payload: Optional[Dict[str, Any]] = None
+    vector_encoding: str = "json"  # json, float32_b64 - encoding of returned vectors
+    vectors: Optional[Dict[str, List[float]]] = None  # Named dense vectors, for update
+    text: Optional[str] = None  # Encoded as a BM25 sparse vector, for update
+
+class BulkIngestRequest(BaseModel):
+    """Columnar bulk ingest request"""
+    collection_name: str
+    ids: List[Union[int, str]]
+    vectors: Optional[List[List[float]]] = None
+    vectors_b64: Optional[str] = None  # row-major float32 matrix, instead of vectors
+    payloads: Optional[List[Dict[str, Any]]] = None
+    batch_size: int = INGEST_BATCH_SIZE
+    parallel: int = INGEST_PARALLEL
+    wait: bool = False
 
 class SearchRequest(BaseModel):
-    \"\"\"Vector search request\"\"\"
+    """Vector search request"""
     collection_name: str
-    query_vector: List[float]
+    query_vector: Optional[List[float]] = None
+    query_vector_b64: Optional[str] = None  # base64 little-endian float32, instead of query_vector
+    vector_name: Optional[str] = None  # Named vector to search, None for the unnamed vector
+    limit: int = 10
+    score_threshold: Optional[float] = None
+    filter: Optional[Dict[str, Any]] = None
+    with_payload: bool = True
+    with_vectors: bool = False
+    vector_encoding: str = "json"  # json, float32_b64 - encoding of returned vectors
+    hnsw_ef: Optional[int] = None  # Search-time HNSW beam width
+    exact: bool = False  # Brute force, bypassing HNSW and quantization
+    rescore: Optional[bool] = None  # Re-rank quantized candidates with original vectors
+    oversampling: Optional[float] = None  # Quantized candidates fetched per requested result
+
+class BatchSearchQuery(BaseModel):
+    """One query of a batch search"""
+    query_vector: Optional[List[float]] = None
+    query_vector_b64: Optional[str] = None
+    vector_name: Optional[str] = None
     limit: int = 10
     score_threshold: Optional[float] = None
     filter: Optional[Dict[str, Any]] = None
+    hnsw_ef: Optional[int] = None  # Search-time HNSW beam width
+    exact: bool = False  # Brute force, bypassing HNSW and quantization
+    rescore: Optional[bool] = None  # Re-rank quantized candidates with original vectors
+    oversampling: Optional[float] = None  # Quantized candidates fetched per requested result
+
+class SearchBatchRequest(BaseModel):
+    """Batch vector search request"""
+    collection_name: str
+    searches: List[BatchSearchQuery]
     with_payload: bool = True
     with_vectors: bool = False
+    ids_only: bool = False  # Return only ids and scores, as parallel arrays
+    vector_encoding: str = "json"  # json, float32_b64 - encoding of returned vectors
+
+class HybridSearchRequest(BaseModel):
+    """Hybrid dense + sparse search request, fused with reciprocal rank fusion"""
+    collection_name: str
+    query_text: Optional[str] = None  # BM25 sparse query, and the dense query when embed_query is set
+    query_vector: Optional[List[float]] = None
+    query_vector_b64: Optional[str] = None
+    dense_vector_name: Optional[str] = None  # Named vector for the dense query, None for the unnamed vector
+    named_vectors: Optional[Dict[str, List[float]]] = None  # Further dense queries, one per named vector
+    sparse_vector_name: Optional[str] = SPARSE_VECTOR_NAME  # None to skip the lexical query
+    embed_query: bool = False  # Embed query_text with the embedding service for the dense query
+    limit: int = 10
+    prefetch_limit: Optional[int] = None  # Candidates per sub-query, default 4 * limit
+    rrf_k: int = RRF_K
+    weights: Optional[Dict[str, float]] = None  # Per sub-query weight, keyed by vector name ("dense" if unnamed)
+    filter: Optional[Dict[str, Any]] = None
+    with_payload: bool = True
 
 class SimilarityRequest(BaseModel):
-    \"\"\"Similarity search request\"\"\"
+    """Similarity search request"""
     collection_name: str
     text_query: Optional[str] = None  # For text-based search
     vector_query: Optional[List[float]] = None  # Direct vector search
     limit: int = 10
     threshold: float = 0.7
+    filter: Optional[Dict[str, Any]] = None
+    with_payload: bool = True
 
-@app.get(\"/health\")
-async def health_check():
-    \"\"\"Health check endpoint\"\"\"
-    qdrant_status = \"healthy\" if qdrant_client else \"disconnected\"
-    
-    info = {}
-    if qdrant_client:
+class EmbedRequest(BaseModel):
+    """Text embedding request"""
+    texts: List[str]
+    vector_encoding: str = "json"  # json, float32_b64
+
+# Binary vector transport
+#
+# Vectors may travel as base64 little-endian float32 ("float32_b64") inside
+# JSON, or as application/octet-stream frames for bulk ingest. A frame is
+#   header  <4sIII: magic b"QVF1", count, dim, flags
+#   vectors count * dim float32 little-endian
+#   ids     count uint64 little-endian            (flags & FRAME_UINT_IDS)
+#           or uint32 length + JSON array of ids  (flags & FRAME_JSON_IDS)
+#   payload uint32 length + JSON array            (flags & FRAME_PAYLOADS)
+# and a body may hold any number of frames back to back.
+FRAME_HEADER = struct.Struct("<4sIII")
+FRAME_MAGIC = b"QVF1"
+FRAME_UINT_IDS = 1
+FRAME_PAYLOADS = 2
+FRAME_JSON_IDS = 4
+LENGTH_PREFIX = struct.Struct("<I")
+
+def decode_vectors_b64(data: str, dim: Optional[int] = None) -> np.ndarray:
+    """Decode base64 float32 into a (rows, dim) array without per-element objects"""
+    try:
+        flat = np.frombuffer(base64.b64decode(data, validate=True), dtype="<f4")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid base64 vector: {str(e)}")
+    if dim is None:
+        return flat.reshape(1, -1)
+    if dim <= 0 or flat.size % dim:
+        raise HTTPException(status_code=400, detail=f"Vector data is not a multiple of dimension {dim}")
+    return flat.reshape(-1, dim)
+
+def encode_vector_b64(vector) -> str:
+    """Encode a vector as base64 little-endian float32"""
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+
+def resolve_vector(vector: Optional[List[float]], vector_b64: Optional[str]) -> Optional[List[float]]:
+    """Return the JSON vector, or decode its base64 alternative"""
+    if vector is not None or not vector_b64:
+        return vector
+    return decode_vectors_b64(vector_b64)[0].tolist()
+
+def render_vector(vector, encoding: str):
+    """Render a returned vector in the requested encoding"""
+    if vector is None or encoding != "float32_b64" or isinstance(vector, dict):
+        return vector
+    return encode_vector_b64(vector)
+
+def encode_frame(vectors: np.ndarray, ids: Optional[List[Union[int, str]]] = None,
+                 payloads: Optional[List[Dict[str, Any]]] = None) -> bytes:
+    """Serialize vectors with optional ids and payloads as one binary frame"""
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    count, dim = vectors.shape
+    flags, parts = 0, [vectors.tobytes()]
+    if ids is not None:
+        if all(isinstance(point_id, int) for point_id in ids):
+            flags |= FRAME_UINT_IDS
+            parts.append(np.asarray(ids, dtype="<u8").tobytes())
+        else:
+            flags |= FRAME_JSON_IDS
+            encoded = json.dumps(ids).encode("utf-8")
+            parts += [LENGTH_PREFIX.pack(len(encoded)), encoded]
+    if payloads is not None:
+        flags |= FRAME_PAYLOADS
+        encoded = json.dumps(payloads).encode("utf-8")
+        parts += [LENGTH_PREFIX.pack(len(encoded)), encoded]
+    return FRAME_HEADER.pack(FRAME_MAGIC, count, dim, flags) + b"".join(parts)
+
+class FrameDecoder:
+    """Incrementally split a byte stream into binary vector frames"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> List[tuple]:
+        """Add bytes; return every (vectors, ids, payloads) frame now complete"""
+        self.buffer += chunk
+        frames = []
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                return frames
+            frames.append(frame)
+
+    def finish(self):
+        if self.buffer:
+            raise ValueError(f"Truncated vector frame ({len(self.buffer)} trailing bytes)")
+
+    def _next_frame(self):
+        if len(self.buffer) < FRAME_HEADER.size:
+            return None
+        magic, count, dim, flags = FRAME_HEADER.unpack_from(self.buffer)
+        if magic != FRAME_MAGIC:
+            raise ValueError("Bad vector frame magic")
+
+        offset = FRAME_HEADER.size
+        vectors_end = offset + count * dim * 4
+        sections = []
+        if flags & FRAME_UINT_IDS:
+            sections.append(("uint_ids", count * 8))
+        if flags & FRAME_JSON_IDS:
+            sections.append(("json_ids", None))
+        if flags & FRAME_PAYLOADS:
+            sections.append(("payloads", None))
+
+        position = vectors_end
+        spans = {}
+        for name, size in sections:
+            if size is None:
+                if len(self.buffer) < position + LENGTH_PREFIX.size:
+                    return None
+                (size,) = LENGTH_PREFIX.unpack_from(self.buffer, position)
+                position += LENGTH_PREFIX.size
+            spans[name] = (position, position + size)
+            position += size
+        if len(self.buffer) < position:
+            return None
+
+        data = bytes(self.buffer[:position])
+        del self.buffer[:position]
+        vectors = np.frombuffer(data, dtype="<f4", count=count * dim, offset=offset).reshape(count, dim)
+        ids = None
+        if "uint_ids" in spans:
+            start, _ = spans["uint_ids"]
+            ids = np.frombuffer(data, dtype="<u8", count=count, offset=start).tolist()
+        elif "json_ids" in spans:
+            start, end = spans["json_ids"]
+            ids = json.loads(data[start:end])
+        payloads = None
+        if "payloads" in spans:
+            start, end = spans["payloads"]
+            payloads = json.loads(data[start:end])
+        return vectors, ids, payloads
+
+# Text embeddings
+#
+# Requests are queued and grouped into micro-batches (up to
+# EMBEDDING_BATCH_SIZE texts or EMBEDDING_BATCH_WAIT_MS of waiting), cached
+# vectors are served from a memory-mapped table keyed by content hash, and
+# only the misses are sent to the backend on a worker thread pool.
+
+class HashEmbeddingBackend:
+    """Dependency-free CPU embedder: signed feature hashing of words and character trigrams"""
+    name = "hash"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype="<f4")
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            padded = f" {' '.join(words)} "
+            features = words + [padded[i:i + 3] for i in range(len(padded) - 2)]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+class SentenceTransformerBackend:
+    """Local transformer model via the optional sentence-transformers package"""
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers/{model_name}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True), dtype="<f4")
+
+EMBEDDING_BACKENDS = {
+    "hash": HashEmbeddingBackend,
+    "sentence-transformers": SentenceTransformerBackend
+}
+
+class VectorCache:
+    """Fixed-capacity open-addressing table of vectors in memory-mapped files
+
+    Keys are 16-byte content digests; a full probe window overwrites its
+    home slot, so the cache never grows past capacity.
+    """
+    MAX_PROBE = 8
+
+    def __init__(self, directory: str, name: str, dim: int, capacity: int):
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, re.sub(r"[^\w.-]", "_", f"{name}-{dim}-{capacity}"))
+        self.capacity = capacity
+        self.keys = self._open(f"{stem}.keys", (capacity, 16), np.uint8)
+        self.vectors = self._open(f"{stem}.vectors", (capacity, dim), "<f4")
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def _open(path: str, shape: tuple, dtype) -> np.memmap:
+        expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        mode = "r+" if os.path.exists(path) and os.path.getsize(path) == expected else "w+"
+        return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+    def _slots(self, key: bytes):
+        home = int.from_bytes(key[:8], "little") % self.capacity
+        return [(home + i) % self.capacity for i in range(min(self.MAX_PROBE, self.capacity))]
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        wanted = np.frombuffer(key, dtype=np.uint8)
+        for slot in self._slots(key):
+            stored = self.keys[slot]
+            if np.array_equal(stored, wanted):
+                self.hits += 1
+                return np.array(self.vectors[slot])
+            if not stored.any():
+                break
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, vector: np.ndarray):
+        slots = self._slots(key)
+        wanted = np.frombuffer(key, dtype=np.uint8)
+        slot = next((s for s in slots if not self.keys[s].any() or np.array_equal(self.keys[s], wanted)), slots[0])
+        self.vectors[slot] = vector
+        self.keys[slot] = wanted
+
+    def flush(self):
+        self.keys.flush()
+        self.vectors.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+        }
+
+class Embedder:
+    """Micro-batching front end for an embedding backend"""
+
+    def __init__(self, backend, cache: Optional[VectorCache] = None, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 batch_wait_ms: float = EMBEDDING_BATCH_WAIT_MS, workers: int = EMBEDDING_WORKERS):
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="embed")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.in_flight = set()
+        self.batches = self.texts_embedded = 0
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.backend.name}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, sharing backend calls with concurrent requests"""
+        if not texts:
+            return np.zeros((0, self.backend.dim), dtype="<f4")
+        loop = asyncio.get_running_loop()
+        if self.worker is None or self.loop is not loop:
+            self.loop = loop
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.create_task(self._collect())
+        futures = [loop.create_future() for _ in texts]
+        for text, future in zip(texts, futures):
+            self.queue.put_nowait((text, future))
+        return np.stack(await asyncio.gather(*futures))
+
+    async def _collect(self):
+        """Group queued texts into batches of up to batch_size or batch_wait seconds"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._run(batch))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+
+    async def _run(self, batch: List[tuple]):
+        """Serve cache hits, embed the distinct misses on the pool, and resolve futures"""
+        waiting: Dict[str, List[asyncio.Future]] = {}
+        for text, future in batch:
+            if future.cancelled():
+                continue
+            cached = self.cache.get(self.key(text)) if self.cache else None
+            if cached is not None:
+                future.set_result(cached)
+            else:
+                waiting.setdefault(text, []).append(future)
+        if not waiting:
+            return
+
+        texts = list(waiting)
         try:
-            collections = await qdrant_client.get_collections()
-            info = {
-                \"collections_count\": len(collections.collections),
-                \"collections\": [col.name for col in collections.collections]
-            }
+            vectors = await asyncio.get_running_loop().run_in_executor(self.executor, self.backend.embed, texts)
         except Exception as e:
-            qdrant_status = f\"error: {str(e)}\"
+            for futures in waiting.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts_embedded += len(texts)
+        for text, vector in zip(texts, vectors):
+            if self.cache:
+                self.cache.put(self.key(text), vector)
+            for future in waiting[text]:
+                if not future.done():
+                    future.set_result(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "dim": self.backend.dim,
+            "batches": self.batches,
+            "texts_embedded": self.texts_embedded,
+            "avg_batch_size": round(self.texts_embedded / self.batches, 2) if self.batches else None,
+            "cache": self.cache.stats() if self.cache else None
+        }
+
+    def close(self):
+        if self.worker:
+            self.worker.cancel()
+        self.executor.shutdown(wait=False)
+        if self.cache:
+            self.cache.flush()
+
+def create_embedder() -> Embedder:
+    """Build the configured embedding backend and its cache"""
+    if EMBEDDING_BACKEND not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {EMBEDDING_BACKEND}")
+    backend = EMBEDDING_BACKENDS[EMBEDDING_BACKEND]()
+    cache = None
+    if EMBEDDING_CACHE_SIZE > 0:
+        cache = VectorCache(EMBEDDING_CACHE_DIR, backend.name, backend.dim, EMBEDDING_CACHE_SIZE)
+    return Embedder(backend, cache)
+
+# Sparse vectors and rank fusion
+#
+# Sparse vectors hold BM25 weights computed here: terms are hashed to 32-bit
+# indices, documents carry the saturated term frequency and queries the IDF,
+# so their dot product in Qdrant is the BM25 score. Document counts and term
+# document frequencies are kept per collection in SPARSE_STATS_DIR (a snapshot
+# plus an append-only delta log), and are only updated once Qdrant has
+# acknowledged the write.
+
+class BM25Encoder:
+    """BM25 sparse vector encoder with persisted corpus statistics
+
+    Each document's length and terms are kept by point id, so re-upserting a
+    point replaces its contribution and deleting it subtracts it. Statistics
+    files from before per-point tracking keep their totals as a baseline.
+
+    Changes are appended to a delta log next to the JSON snapshot, so a write
+    costs I/O proportional to its own points. The log is replayed and folded
+    into the snapshot on open, and once it outgrows the number of points.
+    """
+
+    def __init__(self, path: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.k1 = k1
+        self.b = b
+        self.documents = self.total_length = 0
+        self.df: Counter = Counter()
+        self.points: Dict[str, List] = {}  # point id -> [length, term indices]
+        self.pending: List[List] = []  # changes not yet appended to the log
+        self.logged = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                stats = json.load(f)
+            self.documents = stats["documents"]
+            self.total_length = stats["total_length"]
+            self.df = Counter({int(index): count for index, count in stats["df"].items()})
+            self.points = stats.get("points", {})
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # A write cut short by a crash, never acknowledged
+                    self._apply(entry)
+            self.pending = []
+            self.compact()
+
+    @staticmethod
+    def term_counts(text: str) -> Counter:
+        return Counter(
+            int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little")
+            for term in re.findall(r"\w+", text.lower())
+        )
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        """Encode a document against the corpus statistics, counting it as one more document"""
+        counts = self.term_counts(text)
+        length = sum(counts.values())
+        avg_length = (self.total_length + length) / (self.documents + 1)
+        norm = self.k1 * (1 - self.b + self.b * length / avg_length) if avg_length else self.k1
+        indices = sorted(counts)
+        return models.SparseVector(
+            indices=indices,
+            values=[counts[i] * (self.k1 + 1) / (counts[i] + norm) for i in indices]
+        )
+
+    def add_document(self, point_id: Union[int, str], text: str):
+        """Count a stored point's text, replacing any text it had before"""
+        counts = self.term_counts(text)
+        self._apply([str(point_id), sum(counts.values()), sorted(counts)])
+
+    def remove_document(self, point_id: Union[int, str]) -> bool:
+        """Stop counting a point's text; False if it had none"""
+        if str(point_id) not in self.points:
+            return False
+        self._apply([str(point_id)])
+        return True
+
+    def _apply(self, entry: List):
+        """Apply one change: [id, length, terms] sets a point's text, [id] removes it
+
+        Applying a change twice has the same effect as once, so replaying a
+        log already folded into the snapshot is harmless.
+        """
+        point_id = entry[0]
+        previous = self.points.pop(point_id, None)
+        if previous is not None:
+            length, terms = previous
+            self.documents -= 1
+            self.total_length -= length
+            self.df.subtract(terms)
+            for term in terms:
+                if self.df[term] <= 0:
+                    del self.df[term]
+        if len(entry) == 3:
+            length, terms = entry[1], entry[2]
+            self.points[point_id] = [length, terms]
+            self.documents += 1
+            self.total_length += length
+            self.df.update(terms)
+        self.pending.append(entry)
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        """Encode a query as IDF weights of its distinct terms"""
+        indices = sorted(self.term_counts(text))
+        values = [
+            float(np.log(1 + (self.documents - self.df[i] + 0.5) / (self.df[i] + 0.5))) if self.documents else 1.0
+            for i in indices
+        ]
+        return models.SparseVector(indices=indices, values=values)
+
+    def save(self):
+        """Append changes made since the last save to the delta log"""
+        if not self.pending:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.log_path, "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in self.pending))
+        self.logged += len(self.pending)
+        self.pending = []
+        if self.logged > max(BM25_LOG_COMPACT_MIN, len(self.points)):
+            self.compact()
+
+    def compact(self):
+        """Write the full statistics as the snapshot and start an empty delta log"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump({"documents": self.documents, "total_length": self.total_length,
+                       "df": {str(index): count for index, count in self.df.items()},
+                       "points": self.points}, f)
+        os.replace(f"{self.path}.tmp", self.path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.logged = 0
+
+sparse_encoders: Dict[str, BM25Encoder] = {}
+
+def sparse_stats_path(collection_name: str) -> str:
+    return os.path.join(SPARSE_STATS_DIR, f"{collection_name}.json")
+
+def sparse_encoder(collection_name: str) -> BM25Encoder:
+    """The BM25 encoder holding a collection's corpus statistics"""
+    if collection_name not in sparse_encoders:
+        sparse_encoders[collection_name] = BM25Encoder(sparse_stats_path(collection_name))
+    return sparse_encoders[collection_name]
+
+def drop_sparse_encoder(collection_name: str):
+    encoder = sparse_encoders.pop(collection_name, None)
+    path = encoder.path if encoder else sparse_stats_path(collection_name)
+    for stats_file in (path, f"{path}.log"):
+        if os.path.exists(stats_file):
+            os.remove(stats_file)
+
+def has_sparse_stats(collection_name: str) -> bool:
+    path = sparse_stats_path(collection_name)
+    return collection_name in sparse_encoders or os.path.exists(path) or os.path.exists(f"{path}.log")
+
+def record_sparse_documents(collection_name: str, texts: Dict[Union[int, str], Optional[str]]):
+    """Apply acknowledged writes to a collection's BM25 statistics
+
+    texts maps each written point id to its text, or to None when the point
+    was deleted or stored without text.
+    """
+    if all(text is None for text in texts.values()) and not has_sparse_stats(collection_name):
+        return
+    encoder = sparse_encoder(collection_name)
+    for point_id, text in texts.items():
+        if text is None:
+            encoder.remove_document(point_id)
+        else:
+            encoder.add_document(point_id, text)
+    encoder.save()
+
+def point_vector(collection_name: str, vector: Optional[List[float]], named: Optional[Dict[str, List[float]]] = None,
+                 text: Optional[str] = None, sparse: Optional[Dict[str, Dict[str, List]]] = None):
+    """Build a point's vector: a plain list, or a dict of named dense and sparse vectors
+
+    text is BM25-encoded into the SPARSE_VECTOR_NAME sparse vector.
+    """
+    if not named and text is None and not sparse:
+        return vector
+    if vector is not None:
+        raise HTTPException(status_code=400, detail="Use 'vectors' for named dense vectors alongside sparse vectors")
+    vectors: Dict[str, Any] = dict(named or {})
+    for name, values in (sparse or {}).items():
+        vectors[name] = models.SparseVector(indices=values["indices"], values=values["values"])
+    if text is not None:
+        vectors[SPARSE_VECTOR_NAME] = sparse_encoder(collection_name).encode_document(text)
+    return vectors
+
+def reciprocal_rank_fusion(ranked_lists: Dict[str, List[Any]], k: int = RRF_K,
+                           weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """Fuse ranked hit lists: score(d) = sum of weight / (k + rank) over the lists containing d"""
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for label, hits in ranked_lists.items():
+        weight = (weights or {}).get(label, 1.0)
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.setdefault(hit.id, {"id": hit.id, "score": 0.0, "ranks": {}, "hit": hit})
+            entry["score"] += weight / (k + rank)
+            entry["ranks"][label] = rank
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+
+def vector_config_summary(params: models.CollectionParams) -> Dict[str, Any]:
+    """Describe unnamed, named and sparse vector configuration"""
+    vectors = params.vectors
+    if isinstance(vectors, VectorParams):
+        summary = {
+            "vector_size": vectors.size,
+            "distance": vectors.distance.value,
+            "on_disk": bool(vectors.on_disk)
+        }
+    else:
+        summary = {
+            "vectors": {
+                name: {"size": config.size, "distance": config.distance.value, "on_disk": bool(config.on_disk)}
+                for name, config in (vectors or {}).items()
+            }
+        }
+    summary["sparse_vectors"] = list((params.sparse_vectors or {}).keys())
+    return summary
+
+def query_vector_for(vector: List[float], vector_name: Optional[str]):
+    """Wrap a dense query for a named vector"""
+    return models.NamedVector(name=vector_name, vector=vector) if vector_name else vector
+
+# Collection storage and search tuning
+
+def build_quantization_config(request: CollectionRequest) -> Optional[models.QuantizationConfig]:
+    """Build the quantization config for a create request"""
+    if not request.quantization:
+        return None
+    if request.quantization == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=request.quantization_always_ram))
+    if request.quantization == "product":
+        try:
+            compression = models.CompressionRatio(request.product_compression.lower())
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Unknown product_compression: {request.product_compression}")
+        return models.ProductQuantization(product=models.ProductQuantizationConfig(
+            compression=compression, always_ram=request.quantization_always_ram))
+    if request.quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+            always_ram=request.quantization_always_ram))
+    raise HTTPException(status_code=400, detail=f"Unknown quantization: {request.quantization}")
+
+def build_search_params(search: Union[SearchRequest, BatchSearchQuery]) -> Optional[models.SearchParams]:
+    """Build search params from the per-query ef/exact/rescore knobs"""
+    quantization = None
+    if search.rescore is not None or search.oversampling is not None:
+        quantization = models.QuantizationSearchParams(rescore=search.rescore, oversampling=search.oversampling)
+    if search.hnsw_ef is None and not search.exact and quantization is None:
+        return None
+    return models.SearchParams(hnsw_ef=search.hnsw_ef, exact=search.exact, quantization=quantization)
+
+# Local vector index
+#
+# An in-process stand-in for AsyncQdrantClient covering the calls the tools
+# make. Each collection is a directory holding meta.json, a float32 memmap
+# of vectors (one row per slot, grown by doubling) and an append-only JSON
+# lines log of point ids and payloads replayed on open. Search is exact:
+# one BLAS matrix-vector product over the live rows, then argpartition.
+
+def payload_value(payload: Dict[str, Any], key: str):
+    """Look up a dotted payload key"""
+    value = payload
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def _in_range(value, bounds) -> bool:
+    if value is None or isinstance(value, bool):
+        return False
+    if isinstance(bounds, DatetimeRange):
+        try:
+            value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return False
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        normalize = lambda bound: bound if bound is None or bound.tzinfo else bound.replace(tzinfo=timezone.utc)
+        gt, gte, lt, lte = (normalize(b) for b in (bounds.gt, bounds.gte, bounds.lt, bounds.lte))
+    elif isinstance(value, (int, float)):
+        gt, gte, lt, lte = bounds.gt, bounds.gte, bounds.lt, bounds.lte
+    else:
+        return False
+    return ((gt is None or value > gt) and (gte is None or value >= gte)
+            and (lt is None or value < lt) and (lte is None or value <= lte))
+
+def condition_matches(condition, payload: Dict[str, Any]) -> bool:
+    """Evaluate one field condition or nested filter against a payload"""
+    if isinstance(condition, Filter):
+        return filter_matches(condition, payload)
+    value = payload_value(payload, condition.key)
+    values = value if isinstance(value, list) else [value]
+    match = condition.match
+    if isinstance(match, MatchValue):
+        return match.value in values
+    if isinstance(match, MatchAny):
+        return any(v in match.any for v in values)
+    if isinstance(match, MatchExcept):
+        return value is not None and not any(v in match.except_ for v in values)
+    if condition.range is not None:
+        return any(_in_range(v, condition.range) for v in values)
+    raise ValueError(f"Unsupported condition for local index: {condition}")
+
+def filter_matches(query_filter: Optional[Filter], payload: Dict[str, Any]) -> bool:
+    """Evaluate a Qdrant Filter (must, should, must_not) against a payload"""
+    if query_filter is None:
+        return True
+    if query_filter.must and not all(condition_matches(c, payload) for c in query_filter.must):
+        return False
+    if query_filter.should and not any(condition_matches(c, payload) for c in query_filter.should):
+        return False
+    if query_filter.must_not and any(condition_matches(c, payload) for c in query_filter.must_not):
+        return False
+    return True
+
+class LocalCollection:
+    """One collection of the local index
+
+    Searches run in worker threads while upserts and deletes run on the event
+    loop, so the id/slot/payload maps are only touched under self.lock. A
+    search snapshots the live slots under the lock and scores them outside
+    it; slots are never reused, so the snapshot stays meaningful.
+    """
+
+    def __init__(self, path: str, size: Optional[int] = None, distance: Optional[Distance] = None):
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if size is not None:
+            os.makedirs(path, exist_ok=True)
+            self.meta = {"size": size, "distance": distance.value, "capacity": 1024, "payload_schema": {}}
+            self._write_meta()
+        else:
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        self.size = self.meta["size"]
+        self.distance = Distance(self.meta["distance"])
+        self.vectors = self._map(self.meta["capacity"])
+        self.ids: List[Union[int, str]] = []  # slot -> id
+        self.payloads: List[Optional[Dict[str, Any]]] = []  # slot -> payload, None once deleted
+        self.slots: Dict[Union[int, str], int] = {}  # id -> live slot
+        self.lock = threading.Lock()
+        self._replay()
+        self.log = open(os.path.join(path, "points.log"), "a")
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f)
+
+    def _map(self, capacity: int) -> np.memmap:
+        file_path = os.path.join(self.path, "vectors.f32")
+        needed = capacity * self.size * 4
+        with open(file_path, "ab") as f:
+            if f.tell() < needed:
+                f.truncate(needed)
+        return np.memmap(file_path, dtype="<f4", mode="r+", shape=(capacity, self.size))
+
+    def _replay(self):
+        log_path = os.path.join(self.path, "points.log")
+        if not os.path.exists(log_path):
+            return
+        lines = 0
+        with open(log_path) as f:
+            for line in f:
+                lines += 1
+                entry = json.loads(line)
+                if entry.get("deleted"):
+                    self._forget(entry["id"])
+                else:
+                    self._assign(entry["id"], entry["slot"], entry.get("payload") or {})
+        if lines > 2 * len(self.slots) + 1000:
+            self._compact_log(log_path)
+
+    def _compact_log(self, log_path: str):
+        """Rewrite the log with one line per live point"""
+        with open(f"{log_path}.tmp", "w") as f:
+            for point_id, slot in self.slots.items():
+                f.write(json.dumps({"id": point_id, "slot": slot, "payload": self.payloads[slot]}) + "\n")
+        os.replace(f"{log_path}.tmp", log_path)
+
+    def _assign(self, point_id, slot: int, payload: Dict[str, Any]):
+        while len(self.ids) <= slot:
+            self.ids.append(None)
+            self.payloads.append(None)
+        old = self.slots.get(point_id)
+        if old is not None and old != slot:
+            self.payloads[old] = None
+        self.ids[slot] = point_id
+        self.payloads[slot] = payload
+        self.slots[point_id] = slot
+
+    def _forget(self, point_id):
+        slot = self.slots.pop(point_id, None)
+        if slot is not None:
+            self.payloads[slot] = None
+
+    def prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype="<f4").reshape(-1, self.size)
+        if self.distance == Distance.COSINE:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def upsert(self, ids: List[Union[int, str]], vectors, payloads: Optional[List[Optional[Dict[str, Any]]]]):
+        vectors = self.prepare(vectors)
+        if len(vectors) != len(ids):
+            raise ValueError("ids and vectors must have the same length")
+        with self.lock:
+            self._upsert(ids, vectors, payloads)
+
+    def _upsert(self, ids: List[Union[int, str]], vectors: np.ndarray,
+                payloads: Optional[List[Optional[Dict[str, Any]]]]):
+        # Overwrite in place when the id exists, otherwise append new slots
+        slots, next_slot = [], len(self.ids)
+        for point_id in ids:
+            slot = self.slots.get(point_id)
+            if slot is None:
+                slot, next_slot = next_slot, next_slot + 1
+            slots.append(slot)
+        if next_slot > self.meta["capacity"]:
+            capacity = self.meta["capacity"]
+            while capacity < next_slot:
+                capacity *= 2
+            self.vectors.flush()
+            self.vectors = self._map(capacity)
+            self.meta["capacity"] = capacity
+            self._write_meta()
+        self.vectors[slots] = vectors
+        lines = []
+        for i, (point_id, slot) in enumerate(zip(ids, slots)):
+            payload = (payloads[i] if payloads else None) or {}
+            self._assign(point_id, slot, payload)
+            lines.append(json.dumps({"id": point_id, "slot": slot, "payload": payload}))
+        self.log.write("\n".join(lines) + "\n")
+        self.log.flush()
+
+    def delete(self, ids: List[Union[int, str]]):
+        with self.lock:
+            for point_id in ids:
+                self._forget(point_id)
+            self.log.write("".join(json.dumps({"id": point_id, "deleted": True}) + "\n" for point_id in ids))
+            self.log.flush()
+
+    def retrieve(self, ids, with_payload=True, with_vectors=False) -> List[models.Record]:
+        with self.lock:
+            return [self.record(self.slots[point_id], with_payload, with_vectors)
+                    for point_id in ids if point_id in self.slots]
+
+    def live_slots(self, query_filter: Optional[Filter] = None) -> np.ndarray:
+        if query_filter is None:
+            return np.fromiter(self.slots.values(), dtype=np.int64, count=len(self.slots))
+        return np.array([slot for slot in self.slots.values() if filter_matches(query_filter, self.payloads[slot])],
+                        dtype=np.int64)
+
+    def record(self, slot: int, with_payload, with_vectors, score: Optional[float] = None):
+        payload = self.payloads[slot] if with_payload else None
+        vector = self.vectors[slot].tolist() if with_vectors else None
+        if score is None:
+            return models.Record(id=self.ids[slot], payload=payload, vector=vector)
+        return models.ScoredPoint(id=self.ids[slot], version=0, score=score, payload=payload, vector=vector)
+
+    SCORE_CHUNK = 16384
+
+    def _score_rows(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Similarity for Cosine/Dot, distance for Euclid"""
+        if self.distance == Distance.EUCLID:
+            diff = rows - query
+            return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        return rows @ query
+
+    def search(self, query, limit: int, query_filter: Optional[Filter] = None, score_threshold: Optional[float] = None,
+               offset: int = 0, with_payload=True, with_vectors=False) -> List[models.ScoredPoint]:
+        with self.lock:
+            slots = self.live_slots(query_filter)
+            total = len(self.ids)
+            vectors = self.vectors
+        if not len(slots):
+            return []
+        query = self.prepare(query)[0]
+        # Score the memmap in fixed-size chunks so a search never copies the
+        # whole matrix; sparse filters gather only the matching rows
+        if len(slots) * 4 >= total:
+            full = np.empty(total, dtype="<f4")
+            for start in range(0, total, self.SCORE_CHUNK):
+                end = min(start + self.SCORE_CHUNK, total)
+                full[start:end] = self._score_rows(vectors[start:end], query)
+            scores = full[slots]
+        else:
+            scores = np.concatenate([
+                self._score_rows(vectors[slots[start:start + self.SCORE_CHUNK]], query)
+                for start in range(0, len(slots), self.SCORE_CHUNK)
+            ])
+        # Rank on "higher is better": Euclid distances are negated
+        ranking = -scores if self.distance == Distance.EUCLID else scores
+        if score_threshold is not None:
+            keep = scores <= score_threshold if self.distance == Distance.EUCLID else scores >= score_threshold
+            slots, scores, ranking = slots[keep], scores[keep], ranking[keep]
+        wanted = min(offset + limit, len(slots))
+        if wanted <= 0:
+            return []
+        top = np.argpartition(-ranking, wanted - 1)[:wanted]
+        top = top[np.argsort(-ranking[top], kind="stable")][offset:]
+        with self.lock:
+            return [self.record(int(slots[i]), with_payload, with_vectors, float(scores[i])) for i in top]
+
+    def scroll(self, query_filter: Optional[Filter], limit: int, offset: Optional[int],
+               with_payload=True, with_vectors=False):
+        records, slot = [], offset or 0
+        with self.lock:
+            while slot < len(self.ids) and len(records) < limit:
+                payload = self.payloads[slot]
+                if payload is not None and self.slots.get(self.ids[slot]) == slot and filter_matches(query_filter, payload):
+                    records.append(self.record(slot, with_payload, with_vectors))
+                slot += 1
+            return records, (slot if slot < len(self.ids) else None)
+
+    def info(self) -> models.CollectionInfo:
+        with self.lock:
+            count = len(self.slots)
+        return models.CollectionInfo(
+            status=models.CollectionStatus.GREEN,
+            optimizer_status=models.OptimizersStatusOneOf.OK,
+            vectors_count=count,
+            indexed_vectors_count=0,
+            points_count=count,
+            segments_count=1,
+            config=models.CollectionConfig(
+                params=models.CollectionParams(
+                    vectors=VectorParams(size=self.size, distance=self.distance, on_disk=True),
+                    on_disk_payload=False
+                ),
+                hnsw_config=models.HnswConfig(m=0, ef_construct=0, full_scan_threshold=0),
+                optimizer_config=models.OptimizersConfig(deleted_threshold=0, vacuum_min_vector_number=0,
+                                                         default_segment_number=1, flush_interval_sec=0),
+                wal_config=models.WalConfig(wal_capacity_mb=0, wal_segments_ahead=0)
+            ),
+            payload_schema={
+                field: models.PayloadIndexInfo(data_type=PayloadSchemaType(data_type), points=count)
+                for field, data_type in self.meta["payload_schema"].items()
+            }
+        )
+
+    def close(self):
+        self.vectors.flush()
+        self.log.close()
+
+class LocalVectorStore:
+    """AsyncQdrantClient-compatible facade over LocalCollection directories"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.collections: Dict[str, LocalCollection] = {}
+        for name in sorted(os.listdir(path)):
+            if os.path.exists(os.path.join(path, name, "meta.json")):
+                self.collections[name] = LocalCollection(os.path.join(path, name))
+
+    def _collection(self, collection_name: str) -> LocalCollection:
+        if collection_name not in self.collections:
+            raise ValueError(f"Collection {collection_name} not found")
+        return self.collections[collection_name]
+
+    @staticmethod
+    def _done() -> models.UpdateResult:
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    async def get_collections(self) -> models.CollectionsResponse:
+        return models.CollectionsResponse(
+            collections=[models.CollectionDescription(name=name) for name in self.collections]
+        )
+
+    async def get_collection(self, collection_name: str) -> models.CollectionInfo:
+        return self._collection(collection_name).info()
+
+    async def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self.collections
+
+    async def create_collection(self, collection_name: str, vectors_config: VectorParams, **kwargs) -> bool:
+        """Create a collection; HNSW, quantization and optimizer options do not apply and are ignored"""
+        if collection_name in self.collections:
+            raise ValueError(f"Collection {collection_name} already exists")
+        if not isinstance(vectors_config, VectorParams) or kwargs.get("sparse_vectors_config"):
+            raise ValueError("Local index supports a single unnamed dense vector per collection")
+        self.collections[collection_name] = LocalCollection(
+            os.path.join(self.path, collection_name), vectors_config.size, vectors_config.distance
+        )
+        return True
+
+    async def delete_collection(self, collection_name: str) -> bool:
+        collection = self.collections.pop(collection_name, None)
+        if collection is None:
+            return False
+        collection.close()
+        shutil.rmtree(collection.path, ignore_errors=True)
+        return True
+
+    async def upsert(self, collection_name: str, points, wait: bool = True, **kwargs) -> models.UpdateResult:
+        collection = self._collection(collection_name)
+        if isinstance(points, Batch):
+            collection.upsert(points.ids, points.vectors, points.payloads)
+        else:
+            collection.upsert([p.id for p in points], [p.vector for p in points], [p.payload for p in points])
+        return self._done()
+
+    async def delete(self, collection_name: str, points_selector, **kwargs) -> models.UpdateResult:
+        ids = points_selector.points if isinstance(points_selector, models.PointIdsList) else points_selector
+        self._collection(collection_name).delete(list(ids))
+        return self._done()
+
+    async def retrieve(self, collection_name: str, ids, with_payload=True, with_vectors=False, **kwargs):
+        return self._collection(collection_name).retrieve(ids, with_payload, with_vectors)
+
+    async def search(self, collection_name: str, query_vector, query_filter: Optional[Filter] = None,
+                     search_params=None, limit: int = 10, offset: Optional[int] = None, with_payload=True,
+                     with_vectors=False, score_threshold: Optional[float] = None, **kwargs):
+        collection = self._collection(collection_name)
+        return await asyncio.to_thread(collection.search, query_vector, limit, query_filter, score_threshold,
+                                       offset or 0, with_payload, with_vectors)
+
+    async def search_batch(self, collection_name: str, requests: List[models.SearchRequest], **kwargs):
+        collection = self._collection(collection_name)
+
+        def run():
+            return [collection.search(r.vector, r.limit, r.filter, r.score_threshold, r.offset or 0,
+                                      r.with_payload, r.with_vector) for r in requests]
+        return await asyncio.to_thread(run)
+
+    async def scroll(self, collection_name: str, scroll_filter: Optional[Filter] = None, limit: int = 10,
+                     offset=None, with_payload=True, with_vectors=False, **kwargs):
+        return self._collection(collection_name).scroll(scroll_filter, limit, offset, with_payload, with_vectors)
+
+    async def create_payload_index(self, collection_name: str, field_name: str, field_schema, **kwargs):
+        """Record the index for info output; filtering is a payload scan either way"""
+        collection = self._collection(collection_name)
+        collection.meta["payload_schema"][field_name] = PayloadSchemaType(field_schema).value
+        collection._write_meta()
+        return self._done()
+
+    async def delete_payload_index(self, collection_name: str, field_name: str, **kwargs):
+        collection = self._collection(collection_name)
+        collection.meta["payload_schema"].pop(field_name, None)
+        collection._write_meta()
+        return self._done()
+
+    async def close(self):
+        for collection in self.collections.values():
+            collection.close()
+
+# Collection metadata cache
+
+class CollectionInfoCache:
+    """Short-TTL cache of collection names and get_collection results
+
+    Concurrent misses for the same key share one Qdrant call; create and
+    delete invalidate explicitly, other changes age out within the TTL.
+    Invalidation bumps a generation counter, and a fetch that started
+    before it neither stores its result nor is shared with later callers.
+    """
+
+    def __init__(self, ttl: float = COLLECTION_INFO_TTL):
+        self.ttl = ttl
+        self.entries: Dict[str, tuple] = {}
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.generation = 0
+        self.hits = self.misses = 0
+
+    async def _get(self, key: str, fetch):
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        if key in self.pending:
+            return await asyncio.shield(self.pending[key])
+        generation = self.generation
+        task = asyncio.ensure_future(fetch())
+        self.pending[key] = task
+        try:
+            value = await task
+            if self.generation == generation:
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+        finally:
+            if self.pending.get(key) is task:
+                del self.pending[key]
+
+    async def names(self) -> List[str]:
+        async def fetch():
+            collections = await qdrant_client.get_collections()
+            return [col.name for col in collections.collections]
+        return await self._get("\0names", fetch)
+
+    async def info(self, collection_name: str):
+        return await self._get(collection_name, lambda: qdrant_client.get_collection(collection_name))
+
+    async def info_many(self, names: List[str], parallel: int = COLLECTION_INFO_PARALLEL) -> List[Any]:
+        """Fetch info for many collections with at most `parallel` requests in flight"""
+        semaphore = asyncio.Semaphore(max(1, parallel))
+
+        async def bounded(name):
+            async with semaphore:
+                return await self.info(name)
+
+        return await asyncio.gather(*(bounded(name) for name in names))
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        """Drop one collection (and the name list), or everything"""
+        self.generation += 1
+        if collection_name is None:
+            self.entries.clear()
+            self.pending.clear()
+        else:
+            for key in (collection_name, "\0names"):
+                self.entries.pop(key, None)
+                self.pending.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ttl": self.ttl, "entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+collection_cache = CollectionInfoCache()
+
+@app.get("/health")
+async def health_check():
+    """Liveness check; does not call Qdrant (see /ready)"""
+    return {
+        "status": "healthy",
+        "service": "Qdrant MCP",
+        "port": 8023,
+        "timestamp": datetime.now().isoformat(),
+        "features": ["collections", "vectors", "search", "similarity", "embeddings"],
+        "qdrant": {
+            "status": "connected" if qdrant_client else "disconnected",
+            "backend": backend_mode
+        },
+        "embeddings": embedder.stats() if embedder else None,
+        "collection_cache": collection_cache.stats()
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: round trip to Qdrant and the embedding backend"""
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    
+    try:
+        started = time.perf_counter()
+        collections = await asyncio.wait_for(qdrant_client.get_collections(), timeout=5)
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Qdrant not ready: {str(e)}")
     
     return {
-        \"status\": \"healthy\",
-        \"service\": \"Qdrant MCP\",
-        \"port\": 8023,
-        \"timestamp\": datetime.now().isoformat(),
-        \"features\": [\"collections\", \"vectors\", \"search\", \"similarity\"],
-        \"qdrant\": {
-            \"status\": qdrant_status,
-            \"info\": info
-        }
+        "status": "degraded" if backend_mode == "local-fallback" else "ready",
+        "service": "Qdrant MCP",
+        "timestamp": datetime.now().isoformat(),
+        "qdrant": {
+            "status": "healthy",
+            "backend": backend_mode,
+            "latency_ms": latency_ms,
+            "collections_count": len(collections.collections),
+            "collections": [col.name for col in collections.collections]
+        },
+        "embeddings": "ready" if embedder else "unavailable"
     }
 
-@app.post(\"/tools/collection\")
+@app.post("/tools/collection")
 async def collection_tool(request: CollectionRequest) -> Dict[str, Any]:
-    \"\"\"
+    """
     Collection management
     
     Tool: collection
     Description: Create, delete, list, get info about vector collections
-    \"\"\"
+    """
     if not qdrant_client:
-        raise HTTPException(status_code=503, detail=\"Qdrant connection not available\")
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
     
     try:
-        if request.operation == \"create\":
-            if not request.collection_name or not request.vector_size:
-                raise HTTPException(status_code=400, detail=\"Collection name and vector size required\")
+        if request.operation == "create":
+            if not request.collection_name or not (request.vector_size or request.vectors):
+                raise HTTPException(status_code=400, detail="Collection name and vector size (or named vectors) required")
             
             distance_map = {
-                \"Cosine\": Distance.COSINE,
-                \"Euclid\": Distance.EUCLID,
-                \"Dot\": Distance.DOT
+                "Cosine": Distance.COSINE,
+                "Euclid": Distance.EUCLID,
+                "Dot": Distance.DOT
             }
             
             distance_func = distance_map.get(request.distance, Distance.COSINE)
             
+            hnsw_config = None
+            if request.hnsw_m is not None or request.hnsw_ef_construct is not None or request.hnsw_on_disk is not None:
+                hnsw_config = models.HnswConfigDiff(
+                    m=request.hnsw_m, ef_construct=request.hnsw_ef_construct, on_disk=request.hnsw_on_disk
+                )
+            
+            optimizers_config = None
+            if (request.indexing_threshold is not None or request.memmap_threshold is not None
+                    or request.default_segment_number is not None):
+                optimizers_config = models.OptimizersConfigDiff(
+                    indexing_threshold=request.indexing_threshold,
+                    memmap_threshold=request.memmap_threshold,
+                    default_segment_number=request.default_segment_number
+                )
+            
+            if request.vectors:
+                vectors_config = {
+                    name: VectorParams(
+                        size=config["size"],
+                        distance=distance_map.get(config.get("distance", request.distance), Distance.COSINE),
+                        on_disk=config.get("on_disk", request.on_disk)
+                    )
+                    for name, config in request.vectors.items()
+                }
+            else:
+                vectors_config = VectorParams(size=request.vector_size, distance=distance_func, on_disk=request.on_disk)
+            
+            sparse_vectors_config = None
+            if request.sparse_vectors:
+                sparse_vectors_config = {name: models.SparseVectorParams() for name in request.sparse_vectors}
+            
             await qdrant_client.create_collection(
                 collection_name=request.collection_name,
-                vectors_config=VectorParams(size=request.vector_size, distance=distance_func)
+                vectors_config=vectors_config,
+                sparse_vectors_config=sparse_vectors_config,
+                on_disk_payload=request.on_disk_payload,
+                hnsw_config=hnsw_config,
+                optimizers_config=optimizers_config,
+                quantization_config=build_quantization_config(request)
             )
+            collection_cache.invalidate(request.collection_name)
             
             return {
-                \"operation\": \"create\",
-                \"collection_name\": request.collection_name,
-                \"vector_size\": request.vector_size,
-                \"distance\": request.distance,
-                \"success\": True,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "create",
+                "collection_name": request.collection_name,
+                "vector_size": request.vector_size,
+                "distance": request.distance,
+                "vectors": list(request.vectors) if request.vectors else None,
+                "sparse_vectors": request.sparse_vectors,
+                "quantization": request.quantization,
+                "on_disk": request.on_disk,
+                "on_disk_payload": request.on_disk_payload,
+                "success": True,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"delete\":
+        elif request.operation == "delete":
             if not request.collection_name:
-                raise HTTPException(status_code=400, detail=\"Collection name required\")
+                raise HTTPException(status_code=400, detail="Collection name required")
             
             await qdrant_client.delete_collection(request.collection_name)
+            collection_cache.invalidate(request.collection_name)
+            drop_sparse_encoder(request.collection_name)
             
             return {
-                \"operation\": \"delete\",
-                \"collection_name\": request.collection_name,
-                \"success\": True,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "delete",
+                "collection_name": request.collection_name,
+                "success": True,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"list\":
-            collections = await qdrant_client.get_collections()
+        elif request.operation == "list":
+            names = await collection_cache.names()
+            infos = await collection_cache.info_many(names)
             
             collection_list = []
-            for col in collections.collections:
-                info = await qdrant_client.get_collection(col.name)
+            for name, info in zip(names, infos):
                 collection_list.append({
-                    \"name\": col.name,
-                    \"vectors_count\": info.vectors_count,
-                    \"points_count\": info.points_count,
-                    \"status\": info.status.value
+                    "name": name,
+                    "vectors_count": info.vectors_count,
+                    "points_count": info.points_count,
+                    "status": info.status.value
                 })
             
             return {
-                \"operation\": \"list\",
-                \"collections\": collection_list,
-                \"collection_count\": len(collection_list),
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "list",
+                "collections": collection_list,
+                "collection_count": len(collection_list),
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"info\":
+        elif request.operation == "info":
             if not request.collection_name:
-                raise HTTPException(status_code=400, detail=\"Collection name required\")
+                raise HTTPException(status_code=400, detail="Collection name required")
             
-            info = await qdrant_client.get_collection(request.collection_name)
+            info = await collection_cache.info(request.collection_name)
             
             return {
-                \"operation\": \"info\",
-                \"collection_name\": request.collection_name,
-                \"info\": {
-                    \"status\": info.status.value,
-                    \"vectors_count\": info.vectors_count,
-                    \"points_count\": info.points_count,
-                    \"segments_count\": info.segments_count,
-                    \"config\": {
-                        \"vector_size\": info.config.params.vectors.size,
-                        \"distance\": info.config.params.vectors.distance.value
+                "operation": "info",
+                "collection_name": request.collection_name,
+                "info": {
+                    "status": info.status.value,
+                    "vectors_count": info.vectors_count,
+                    "points_count": info.points_count,
+                    "segments_count": info.segments_count,
+                    "config": {
+                        **vector_config_summary(info.config.params),
+                        "on_disk_payload": bool(info.config.params.on_disk_payload),
+                        "hnsw": {
+                            "m": info.config.hnsw_config.m,
+                            "ef_construct": info.config.hnsw_config.ef_construct,
+                            "on_disk": bool(info.config.hnsw_config.on_disk)
+                        },
+                        "quantization": (
+                            info.config.quantization_config.model_dump(exclude_none=True)
+                            if info.config.quantization_config else None
+                        ),
+                        "optimizer": {
+                            "indexing_threshold": info.config.optimizer_config.indexing_threshold,
+                            "memmap_threshold": info.config.optimizer_config.memmap_threshold
+                        }
+                    },
+                    "payload_indexes": {
+                        field: {"type": str(schema.data_type.value), "points": schema.points}
+                        for field, schema in (info.payload_schema or {}).items()
                     }
                 },
-                \"timestamp\": datetime.now().isoformat()
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        elif request.operation == "create_index":
+            if not request.collection_name or not request.field_name:
+                raise HTTPException(status_code=400, detail="Collection name and field name required")
+            if request.field_type not in PAYLOAD_INDEX_TYPES:
+                raise HTTPException(status_code=400, detail=f"field_type must be one of: {', '.join(PAYLOAD_INDEX_TYPES)}")
+            
+            result = await qdrant_client.create_payload_index(
+                collection_name=request.collection_name,
+                field_name=request.field_name,
+                field_schema=PAYLOAD_INDEX_TYPES[request.field_type],
+                wait=True
+            )
+            collection_cache.invalidate(request.collection_name)
+            
+            return {
+                "operation": "create_index",
+                "collection_name": request.collection_name,
+                "field_name": request.field_name,
+                "field_type": request.field_type,
+                "status": result.status.value,
+                "success": True,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        elif request.operation == "delete_index":
+            if not request.collection_name or not request.field_name:
+                raise HTTPException(status_code=400, detail="Collection name and field name required")
+            
+            result = await qdrant_client.delete_payload_index(
+                collection_name=request.collection_name,
+                field_name=request.field_name,
+                wait=True
+            )
+            collection_cache.invalidate(request.collection_name)
+            
+            return {
+                "operation": "delete_index",
+                "collection_name": request.collection_name,
+                "field_name": request.field_name,
+                "status": result.status.value,
+                "success": True,
+                "timestamp": datetime.now().isoformat()
             }
         
         else:
-            raise HTTPException(status_code=400, detail=f\"Unknown operation: {request.operation}\")
+            raise HTTPException(status_code=400, detail=f"Unknown operation: {request.operation}")
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f\"Collection operation failed: {str(e)}\")
-        raise HTTPException(status_code=500, detail=f\"Collection operation failed: {str(e)}\")
+        logger.error(f"Collection operation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Collection operation failed: {str(e)}")
 
-@app.post(\"/tools/vector\")
+@app.post("/tools/vector")
 async def vector_tool(request: VectorRequest) -> Dict[str, Any]:
-    \"\"\"
+    """
     Vector operations
     
     Tool: vector
     Description: Insert, update, delete, get vectors and their payloads
-    \"\"\"
+    """
     if not qdrant_client:
-        raise HTTPException(status_code=503, detail=\"Qdrant connection not available\")
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
     
     try:
-        if request.operation == \"insert\":
+        if request.operation == "insert":
             if not request.points:
-                raise HTTPException(status_code=400, detail=\"Points required for insert\")
+                raise HTTPException(status_code=400, detail="Points required for insert")
             
             points = []
             for point_data in request.points:
                 point = PointStruct(
-                    id=point_data.get(\"id\"),
-                    vector=point_data.get(\"vector\"),
-                    payload=point_data.get(\"payload\", {})
+                    id=point_data.get("id"),
+                    vector=point_vector(
+                        request.collection_name,
+                        resolve_vector(point_data.get("vector"), point_data.get("vector_b64")),
+                        named=point_data.get("vectors"),
+                        text=point_data.get("text"),
+                        sparse=point_data.get("sparse")
+                    ),
+                    payload=point_data.get("payload", {})
                 )
                 points.append(point)
             
@@ -244,23 +1606,27 @@ async def vector_tool(request: VectorRequest) -> Dict[str, Any]:
                 collection_name=request.collection_name,
                 points=points
             )
+            record_sparse_documents(request.collection_name,
+                                    {point_data.get("id"): point_data.get("text") for point_data in request.points})
             
             return {
-                \"operation\": \"insert\",
-                \"collection_name\": request.collection_name,
-                \"points_inserted\": len(points),
-                \"operation_id\": result.operation_id,
-                \"status\": result.status.value,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "insert",
+                "collection_name": request.collection_name,
+                "points_inserted": len(points),
+                "operation_id": result.operation_id,
+                "status": result.status.value,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"update\":
-            if not request.point_id or not request.vector:
-                raise HTTPException(status_code=400, detail=\"Point ID and vector required for update\")
+        elif request.operation == "update":
+            vector = point_vector(request.collection_name, resolve_vector(request.vector, request.vector_b64),
+                                  named=request.vectors, text=request.text)
+            if not request.point_id or not vector:
+                raise HTTPException(status_code=400, detail="Point ID and vector required for update")
             
             point = PointStruct(
                 id=request.point_id,
-                vector=request.vector,
+                vector=vector,
                 payload=request.payload or {}
             )
             
@@ -268,37 +1634,39 @@ async def vector_tool(request: VectorRequest) -> Dict[str, Any]:
                 collection_name=request.collection_name,
                 points=[point]
             )
+            record_sparse_documents(request.collection_name, {request.point_id: request.text})
             
             return {
-                \"operation\": \"update\",
-                \"collection_name\": request.collection_name,
-                \"point_id\": request.point_id,
-                \"operation_id\": result.operation_id,
-                \"status\": result.status.value,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "update",
+                "collection_name": request.collection_name,
+                "point_id": request.point_id,
+                "operation_id": result.operation_id,
+                "status": result.status.value,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"delete\":
+        elif request.operation == "delete":
             if not request.point_id:
-                raise HTTPException(status_code=400, detail=\"Point ID required for delete\")
+                raise HTTPException(status_code=400, detail="Point ID required for delete")
             
             result = await qdrant_client.delete(
                 collection_name=request.collection_name,
                 points_selector=[request.point_id]
             )
+            record_sparse_documents(request.collection_name, {request.point_id: None})
             
             return {
-                \"operation\": \"delete\",
-                \"collection_name\": request.collection_name,
-                \"point_id\": request.point_id,
-                \"operation_id\": result.operation_id,
-                \"status\": result.status.value,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "delete",
+                "collection_name": request.collection_name,
+                "point_id": request.point_id,
+                "operation_id": result.operation_id,
+                "status": result.status.value,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"get\":
+        elif request.operation == "get":
             if not request.point_id:
-                raise HTTPException(status_code=400, detail=\"Point ID required for get\")
+                raise HTTPException(status_code=400, detail="Point ID required for get")
             
             points = await qdrant_client.retrieve(
                 collection_name=request.collection_name,
@@ -309,61 +1677,442 @@ async def vector_tool(request: VectorRequest) -> Dict[str, Any]:
             
             if not points:
                 return {
-                    \"operation\": \"get\",
-                    \"collection_name\": request.collection_name,
-                    \"point_id\": request.point_id,
-                    \"found\": False,
-                    \"timestamp\": datetime.now().isoformat()
+                    "operation": "get",
+                    "collection_name": request.collection_name,
+                    "point_id": request.point_id,
+                    "found": False,
+                    "timestamp": datetime.now().isoformat()
                 }
             
             point = points[0]
             return {
-                \"operation\": \"get\",
-                \"collection_name\": request.collection_name,
-                \"point_id\": request.point_id,
-                \"point\": {
-                    \"id\": point.id,
-                    \"vector\": point.vector,
-                    \"payload\": point.payload
+                "operation": "get",
+                "collection_name": request.collection_name,
+                "point_id": request.point_id,
+                "point": {
+                    "id": point.id,
+                    "vector": render_vector(point.vector, request.vector_encoding),
+                    "payload": point.payload
                 },
-                \"found\": True,
-                \"timestamp\": datetime.now().isoformat()
+                "found": True,
+                "timestamp": datetime.now().isoformat()
             }
         
         else:
-            raise HTTPException(status_code=400, detail=f\"Unknown operation: {request.operation}\")
+            raise HTTPException(status_code=400, detail=f"Unknown operation: {request.operation}")
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f\"Vector operation failed: {str(e)}\")
-        raise HTTPException(status_code=500, detail=f\"Vector operation failed: {str(e)}\")
+        logger.error(f"Vector operation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Vector operation failed: {str(e)}")
+
+async def upsert_batches(collection_name: str, batches: AsyncIterator[Batch],
+                         parallel: int, wait: bool) -> Dict[str, Any]:
+    """Upsert batches with at most `parallel` requests in flight
+
+    Batches are pulled from the iterator only when a slot frees up, so memory
+    stays bounded by parallel * batch size however large the import is. The
+    first failed batch stops the upload: no further batches are sent, the
+    ones in flight are cancelled and its error is raised.
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, parallel))
+    in_flight = set()
+    failures = []
+    points = batch_count = 0
+    # Bulk points carry no BM25 text, so overwriting one drops its old text from the statistics
+    overwritten = [] if has_sparse_stats(collection_name) else None
+
+    def settle(task: asyncio.Task, ids: List[Union[int, str]]):
+        # Record the outcome before freeing the slot, so the next batch sees a failure
+        nonlocal points, batch_count
+        in_flight.discard(task)
+        semaphore.release()
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            failures.append(task.exception())
+        else:
+            points += len(ids)
+            batch_count += 1
+            if overwritten is not None:
+                overwritten.extend(ids)
+
+    try:
+        async for batch in batches:
+            await semaphore.acquire()
+            if failures:
+                semaphore.release()
+                break
+            task = asyncio.create_task(
+                qdrant_client.upsert(collection_name=collection_name, points=batch, wait=wait)
+            )
+            in_flight.add(task)
+            task.add_done_callback(functools.partial(settle, ids=batch.ids))
+        if in_flight and not failures:
+            await asyncio.wait(set(in_flight), return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if overwritten:
+            record_sparse_documents(collection_name, dict.fromkeys(overwritten))
+    if failures:
+        raise failures[0]
+
+    elapsed = time.perf_counter() - started
+    return {
+        "collection_name": collection_name,
+        "points_upserted": points,
+        "batches": batch_count,
+        "parallel": parallel,
+        "wait": wait,
+        "elapsed_seconds": round(elapsed, 3),
+        "points_per_second": round(points / elapsed, 1) if elapsed > 0 else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+async def columnar_batches(ids: List[Union[int, str]], vectors, payloads: Optional[List[Dict[str, Any]]],
+                           batch_size: int) -> AsyncIterator[Batch]:
+    """Slice columnar ids/vectors/payloads into Batch chunks"""
+    size = max(1, batch_size)
+    for start in range(0, len(ids), size):
+        chunk = vectors[start:start + size]
+        yield Batch(
+            ids=ids[start:start + size],
+            vectors=chunk.tolist() if isinstance(chunk, np.ndarray) else chunk,
+            payloads=payloads[start:start + size] if payloads else None
+        )
+
+async def frame_batches(request: Request, batch_size: int) -> AsyncIterator[Batch]:
+    """Decode a streamed body of binary vector frames into batches"""
+    decoder = FrameDecoder()
+
+    async def frames():
+        async for chunk in request.stream():
+            for frame in decoder.feed(chunk):
+                yield frame
+        decoder.finish()
+
+    async for vectors, ids, payloads in frames():
+        if ids is None:
+            raise ValueError("Binary ingest frames must carry point ids")
+        async for batch in columnar_batches(ids, vectors, payloads, batch_size):
+            yield batch
 
-@app.post(\"/tools/search\")
+async def ndjson_batches(request: Request, batch_size: int) -> AsyncIterator[Batch]:
+    """Parse a streamed NDJSON body of {"id", "vector", "payload"} lines into batches"""
+    ids, vectors, payloads = [], [], []
+    buffer = b""
+
+    def take(line: bytes):
+        if line.strip():
+            point = json.loads(line)
+            ids.append(point["id"])
+            vectors.append(point["vector"])
+            payloads.append(point.get("payload") or {})
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            take(line)
+            if len(ids) >= batch_size:
+                yield Batch(ids=ids, vectors=vectors, payloads=payloads)
+                ids, vectors, payloads = [], [], []
+    take(buffer)
+    if ids:
+        yield Batch(ids=ids, vectors=vectors, payloads=payloads)
+
+@app.post("/tools/ingest")
+async def ingest_tool(request: BulkIngestRequest) -> Dict[str, Any]:
+    """
+    Bulk point ingest from columnar arrays
+    
+    Tool: ingest
+    Description: Chunked, parallel upsert of ids/vectors/payloads arrays
+    """
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    
+    vectors = request.vectors
+    if vectors is None and request.vectors_b64:
+        matrix = decode_vectors_b64(request.vectors_b64)[0]
+        if not request.ids or matrix.size % len(request.ids):
+            raise HTTPException(status_code=400, detail="vectors_b64 size does not match the number of ids")
+        vectors = matrix.reshape(len(request.ids), -1)
+    if vectors is None or len(request.ids) != len(vectors) or (request.payloads and len(request.payloads) != len(request.ids)):
+        raise HTTPException(status_code=400, detail="ids, vectors and payloads must have the same length")
+    
+    try:
+        return await upsert_batches(request.collection_name,
+                                    columnar_batches(request.ids, vectors, request.payloads, request.batch_size),
+                                    request.parallel, request.wait)
+    except Exception as e:
+        logger.error(f"Bulk ingest failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk ingest failed: {str(e)}")
+
+@app.post("/tools/ingest/ndjson")
+async def ingest_ndjson_tool(request: Request, collection_name: str, batch_size: int = INGEST_BATCH_SIZE,
+                             parallel: int = INGEST_PARALLEL, wait: bool = False) -> Dict[str, Any]:
+    """
+    Bulk point ingest from a streamed NDJSON body
+    
+    Tool: ingest
+    Description: One {"id", "vector", "payload"} object per line, upserted as
+    it arrives so the body never has to fit in memory
+    """
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    
+    try:
+        return await upsert_batches(collection_name, ndjson_batches(request, max(1, batch_size)),
+                                    parallel, wait)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid NDJSON point: {str(e)}")
+    except Exception as e:
+        logger.error(f"Bulk ingest failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk ingest failed: {str(e)}")
+
+PAYLOAD_INDEX_TYPES = {
+    "keyword": PayloadSchemaType.KEYWORD,
+    "integer": PayloadSchemaType.INTEGER,
+    "float": PayloadSchemaType.FLOAT,
+    "datetime": PayloadSchemaType.DATETIME,
+    "bool": PayloadSchemaType.BOOL,
+    "text": PayloadSchemaType.TEXT
+}
+
+RANGE_OPERATORS = {"gt", "gte", "lt", "lte"}
+MATCH_OPERATORS = {"any", "except", "eq"}
+
+def build_condition(field: str, spec: Any) -> FieldCondition:
+    """Build one field condition
+
+    A scalar matches exactly and a list matches any of its values. A dict
+    holds either one match operator (any, except, eq) or range bounds
+    gt/gte/lt/lte (ISO strings select a datetime range). Unknown keys, or
+    operators that cannot be combined, raise ValueError.
+    """
+    if isinstance(spec, list):
+        return FieldCondition(key=field, match=MatchAny(any=spec))
+    if not isinstance(spec, dict):
+        return FieldCondition(key=field, match=MatchValue(value=spec))
+
+    unknown = set(spec) - MATCH_OPERATORS - RANGE_OPERATORS
+    if unknown:
+        raise ValueError(f"Unsupported operator(s) {sorted(unknown)} for field '{field}'")
+    matches = MATCH_OPERATORS & set(spec)
+    if len(matches) > 1 or (matches and len(spec) > 1):
+        raise ValueError(f"Conflicting operators {sorted(spec)} for field '{field}'")
+    if not spec:
+        raise ValueError(f"Empty filter for field '{field}'")
+
+    if "any" in spec:
+        return FieldCondition(key=field, match=MatchAny(any=spec["any"]))
+    if "except" in spec:
+        return FieldCondition(key=field, match=MatchExcept(**{"except": spec["except"]}))
+    if "eq" in spec:
+        return FieldCondition(key=field, match=MatchValue(value=spec["eq"]))
+    if any(isinstance(value, str) for value in spec.values()):
+        return FieldCondition(key=field, range=DatetimeRange(**spec))
+    return FieldCondition(key=field, range=Range(**spec))
+
+def build_filter(filter_spec: Optional[Dict[str, Any]]) -> Optional[Filter]:
+    """Convert a payload filter spec into a Qdrant Filter
+
+    Top-level fields are all required ({field: value} keeps its old equality
+    meaning). The reserved keys must, should and must_not take a nested
+    {field: spec} object for the corresponding clause. An invalid spec is a
+    400.
+    """
+    if not filter_spec:
+        return None
+    clauses = {"must": [], "should": [], "must_not": []}
+    try:
+        for key, spec in filter_spec.items():
+            if key in clauses:
+                if not isinstance(spec, dict):
+                    raise ValueError(f"'{key}' filter must be an object of field conditions")
+                clauses[key] += [build_condition(field, value) for field, value in spec.items()]
+            else:
+                clauses["must"].append(build_condition(key, spec))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filter: {str(e)}")
+    return Filter(**{clause: conditions for clause, conditions in clauses.items() if conditions})
+
+@app.post("/tools/ingest/binary")
+async def ingest_binary_tool(request: Request, collection_name: str, batch_size: int = INGEST_BATCH_SIZE,
+                             parallel: int = INGEST_PARALLEL, wait: bool = False) -> Dict[str, Any]:
+    """
+    Bulk point ingest from streamed binary vector frames
+    
+    Tool: ingest
+    Description: application/octet-stream body of QVF1 frames (float32
+    vectors plus ids and optional payloads), decoded with NumPy as it arrives
+    """
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    
+    try:
+        return await upsert_batches(collection_name, frame_batches(request, max(1, batch_size)),
+                                    parallel, wait)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid vector frame: {str(e)}")
+    except Exception as e:
+        logger.error(f"Bulk ingest failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk ingest failed: {str(e)}")
+
+async def scroll_pages(collection_name: str, page_size: int,
+                       scroll_filter: Optional[Filter] = None) -> AsyncIterator[List[models.Record]]:
+    """Page through a collection with scroll, fetching the next page while the current one is consumed"""
+    async def fetch(offset):
+        return await qdrant_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+
+    pending = asyncio.create_task(fetch(None))
+    try:
+        while pending:
+            records, next_offset = await pending
+            pending = asyncio.create_task(fetch(next_offset)) if next_offset is not None else None
+            if records:
+                yield records
+    finally:
+        if pending:
+            pending.cancel()
+
+def export_ndjson_page(records: List[models.Record]) -> bytes:
+    """Render a scroll page as {"id", "vector", "payload"} lines, the /tools/ingest/ndjson input format"""
+    return b"".join(
+        (json.dumps({"id": record.id, "vector": record.vector, "payload": record.payload or {}}) + "\n").encode("utf-8")
+        for record in records
+    )
+
+def export_frame_page(records: List[models.Record]) -> bytes:
+    """Render a scroll page as one binary vector frame"""
+    return encode_frame(
+        np.asarray([record.vector for record in records], dtype="<f4"),
+        ids=[record.id for record in records],
+        payloads=[record.payload or {} for record in records]
+    )
+
+@app.get("/tools/export")
+async def export_tool(collection_name: str, format: str = "ndjson", page_size: int = EXPORT_PAGE_SIZE,
+                      filter: Optional[str] = None) -> StreamingResponse:
+    """
+    Stream every point of a collection
+    
+    Tool: export
+    Description: Scroll through the collection and stream points as NDJSON or
+    binary vector frames, holding at most two pages in memory
+    """
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    if format not in ("ndjson", "binary"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or binary")
+    
+    try:
+        filter_spec = json.loads(filter) if filter else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filter JSON: {str(e)}")
+    if filter_spec is not None and not isinstance(filter_spec, dict):
+        raise HTTPException(status_code=400, detail="filter must be a JSON object")
+    scroll_filter = build_filter(filter_spec)
+    
+    try:
+        info = await collection_cache.info(collection_name)
+    except Exception as e:
+        logger.error(f"Export failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    
+    vectors_config = info.config.params.vectors
+    if not isinstance(vectors_config, VectorParams):
+        raise HTTPException(status_code=400, detail="Export supports single unnamed vector collections only")
+    
+    render = export_frame_page if format == "binary" else export_ndjson_page
+    
+    async def body():
+        async for records in scroll_pages(collection_name, max(1, page_size), scroll_filter):
+            yield render(records)
+    
+    return StreamingResponse(
+        body(),
+        media_type="application/octet-stream" if format == "binary" else "application/x-ndjson",
+        headers={
+            "X-Vector-Size": str(vectors_config.size),
+            "X-Distance": vectors_config.distance.value,
+            "X-Points-Count": str(info.points_count or 0)
+        }
+    )
+
+@app.post("/tools/import")
+async def import_tool(request: Request, collection_name: str, batch_size: int = INGEST_BATCH_SIZE,
+                      parallel: int = INGEST_PARALLEL, wait: bool = False, vector_size: Optional[int] = None,
+                      distance: str = "Cosine") -> Dict[str, Any]:
+    """
+    Stream an export back into a collection
+    
+    Tool: import
+    Description: Accept a /tools/export body (NDJSON, or binary frames when the
+    Content-Type is application/octet-stream) and pipeline it into batched
+    parallel upserts; with vector_size, a missing collection is created first
+    """
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    
+    binary = request.headers.get("content-type", "").startswith("application/octet-stream")
+    batches = frame_batches(request, max(1, batch_size)) if binary else ndjson_batches(request, max(1, batch_size))
+    
+    try:
+        created = False
+        if vector_size and not await qdrant_client.collection_exists(collection_name):
+            distance_map = {"Cosine": Distance.COSINE, "Euclid": Distance.EUCLID, "Dot": Distance.DOT}
+            await qdrant_client.create_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(size=vector_size, distance=distance_map.get(distance, Distance.COSINE))
+            )
+            collection_cache.invalidate(collection_name)
+            created = True
+        
+        result = await upsert_batches(collection_name, batches, parallel, wait)
+        result["collection_created"] = created
+        result["format"] = "binary" if binary else "ndjson"
+        return result
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import body: {str(e)}")
+    except Exception as e:
+        logger.error(f"Import failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+
+@app.post("/tools/search")
 async def search_tool(request: SearchRequest) -> Dict[str, Any]:
-    \"\"\"
+    """
     Vector similarity search
     
     Tool: search
     Description: Find similar vectors with optional filtering and scoring
-    \"\"\"
+    """
     if not qdrant_client:
-        raise HTTPException(status_code=503, detail=\"Qdrant connection not available\")
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    
+    query_vector = resolve_vector(request.query_vector, request.query_vector_b64)
+    if not query_vector:
+        raise HTTPException(status_code=400, detail="query_vector or query_vector_b64 required")
     
     try:
-        # Build filter if provided
-        search_filter = None
-        if request.filter:
-            conditions = []
-            for field, value in request.filter.items():
-                conditions.append(FieldCondition(key=field, match=MatchValue(value=value)))
-            if conditions:
-                search_filter = Filter(must=conditions)
-        
         results = await qdrant_client.search(
             collection_name=request.collection_name,
-            query_vector=request.query_vector,
+            query_vector=query_vector_for(query_vector, request.vector_name),
             limit=request.limit,
             score_threshold=request.score_threshold,
-            query_filter=search_filter,
+            query_filter=build_filter(request.filter),
+            search_params=build_search_params(request),
             with_payload=request.with_payload,
             with_vectors=request.with_vectors
         )
@@ -371,75 +2120,452 @@ async def search_tool(request: SearchRequest) -> Dict[str, Any]:
         search_results = []
         for result in results:
             result_data = {
-                \"id\": result.id,
-                \"score\": result.score
+                "id": result.id,
+                "score": result.score
             }
             
             if request.with_payload:
-                result_data[\"payload\"] = result.payload
+                result_data["payload"] = result.payload
             
             if request.with_vectors:
-                result_data[\"vector\"] = result.vector
+                result_data["vector"] = render_vector(result.vector, request.vector_encoding)
             
             search_results.append(result_data)
         
         return {
-            \"collection_name\": request.collection_name,
-            \"query_vector_size\": len(request.query_vector),
-            \"results\": search_results,
-            \"result_count\": len(search_results),
-            \"limit\": request.limit,
-            \"score_threshold\": request.score_threshold,
-            \"timestamp\": datetime.now().isoformat()
+            "collection_name": request.collection_name,
+            "query_vector_size": len(query_vector),
+            "results": search_results,
+            "result_count": len(search_results),
+            "limit": request.limit,
+            "score_threshold": request.score_threshold,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Search operation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search operation failed: {str(e)}")
+
+def build_batch_search(index: int, search: BatchSearchQuery, with_payload: bool,
+                       with_vectors: bool) -> models.SearchRequest:
+    """Build one batch search request, rejecting an invalid entry with a 400 naming it"""
+    try:
+        vector = resolve_vector(search.query_vector, search.query_vector_b64)
+        if not vector:
+            raise HTTPException(status_code=400, detail="query_vector or query_vector_b64 required")
+        return models.SearchRequest(
+            vector=query_vector_for(vector, search.vector_name),
+            limit=search.limit,
+            score_threshold=search.score_threshold,
+            filter=build_filter(search.filter),
+            params=build_search_params(search),
+            with_payload=with_payload,
+            with_vector=with_vectors
+        )
+    except HTTPException as e:
+        raise HTTPException(status_code=400, detail=f"searches[{index}]: {e.detail}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"searches[{index}]: {str(e)}")
+
+@app.post("/tools/search_batch")
+async def search_batch_tool(request: SearchBatchRequest) -> Dict[str, Any]:
+    """
+    Batch vector similarity search
+    
+    Tool: search_batch
+    Description: Run many query vectors, each with its own filter and limit,
+    in a single Qdrant batch search round trip
+    """
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    
+    with_payload = request.with_payload and not request.ids_only
+    with_vectors = request.with_vectors and not request.ids_only
+    
+    searches = [
+        build_batch_search(index, search, with_payload, with_vectors)
+        for index, search in enumerate(request.searches)
+    ]
+    
+    try:
+        batch_results = await qdrant_client.search_batch(
+            collection_name=request.collection_name,
+            requests=searches
+        )
+        
+        if request.ids_only:
+            results = [
+                {"ids": [hit.id for hit in hits], "scores": [hit.score for hit in hits]}
+                for hits in batch_results
+            ]
+        else:
+            results = []
+            for hits in batch_results:
+                query_results = []
+                for hit in hits:
+                    result_data = {"id": hit.id, "score": hit.score}
+                    if with_payload:
+                        result_data["payload"] = hit.payload
+                    if with_vectors:
+                        result_data["vector"] = render_vector(hit.vector, request.vector_encoding)
+                    query_results.append(result_data)
+                results.append(query_results)
+        
+        return {
+            "collection_name": request.collection_name,
+            "query_count": len(request.searches),
+            "results": results,
+            "ids_only": request.ids_only,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch search operation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch search operation failed: {str(e)}")
+
+@app.post("/tools/hybrid_search")
+async def hybrid_search_tool(request: HybridSearchRequest) -> Dict[str, Any]:
+    """
+    Hybrid dense + sparse search
+    
+    Tool: hybrid_search
+    Description: Run the BM25 sparse query and one or more dense (named)
+    vector queries in one batch round trip and fuse them with reciprocal
+    rank fusion into a single ranked list
+    """
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    
+    try:
+        queries: Dict[str, Any] = {}
+        dense = resolve_vector(request.query_vector, request.query_vector_b64)
+        if dense is None and request.embed_query and request.query_text:
+            if not embedder:
+                raise HTTPException(status_code=503, detail="Embedding backend not available")
+            dense = (await embedder.embed([request.query_text]))[0].tolist()
+        if dense is not None:
+            queries[request.dense_vector_name or "dense"] = query_vector_for(dense, request.dense_vector_name)
+        for name, vector in (request.named_vectors or {}).items():
+            if name in queries:
+                raise HTTPException(status_code=400, detail=f"named_vectors repeats the dense query '{name}'")
+            queries[name] = models.NamedVector(name=name, vector=vector)
+        if request.query_text and request.sparse_vector_name:
+            if request.sparse_vector_name in queries:
+                raise HTTPException(status_code=400,
+                                    detail=f"sparse_vector_name '{request.sparse_vector_name}' repeats a dense query")
+            sparse = sparse_encoder(request.collection_name).encode_query(request.query_text)
+            if sparse.indices:
+                queries[request.sparse_vector_name] = models.NamedSparseVector(
+                    name=request.sparse_vector_name, vector=sparse)
+        if not queries:
+            raise HTTPException(status_code=400, detail="query_text, query_vector or named_vectors required")
+        
+        query_filter = build_filter(request.filter)
+        prefetch_limit = request.prefetch_limit or request.limit * 4
+        batch_results = await qdrant_client.search_batch(
+            collection_name=request.collection_name,
+            requests=[
+                models.SearchRequest(vector=vector, filter=query_filter, limit=prefetch_limit,
+                                     with_payload=request.with_payload)
+                for vector in queries.values()
+            ]
+        )
+        
+        fused = reciprocal_rank_fusion(dict(zip(queries, batch_results)), request.rrf_k, request.weights)
+        results = []
+        for entry in fused[:request.limit]:
+            result_data = {"id": entry["id"], "score": round(entry["score"], 6), "ranks": entry["ranks"]}
+            if request.with_payload:
+                result_data["payload"] = entry["hit"].payload
+            results.append(result_data)
+        
+        return {
+            "collection_name": request.collection_name,
+            "fusion": "rrf",
+            "rrf_k": request.rrf_k,
+            "sub_queries": {label: len(hits) for label, hits in zip(queries, batch_results)},
+            "results": results,
+            "result_count": len(results),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Hybrid search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Hybrid search failed: {str(e)}")
+
+@app.post("/tools/embed")
+async def embed_tool(request: EmbedRequest) -> Dict[str, Any]:
+    """
+    Text embedding
+    
+    Tool: embed
+    Description: Turn texts into vectors with the configured backend,
+    micro-batched with concurrent requests and cached by content hash
+    """
+    if not embedder:
+        raise HTTPException(status_code=503, detail="Embedding backend not available")
+    
+    try:
+        vectors = await embedder.embed(request.texts)
+        return {
+            "backend": embedder.backend.name,
+            "dim": embedder.backend.dim,
+            "vectors": [render_vector(vector.tolist(), request.vector_encoding) for vector in vectors],
+            "count": len(request.texts),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Embedding failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Embedding failed: {str(e)}")
+
+@app.post("/tools/similarity")
+async def similarity_tool(request: SimilarityRequest) -> Dict[str, Any]:
+    """
+    Text or vector similarity search
+    
+    Tool: similarity
+    Description: Embed text_query (or use vector_query directly) and return
+    points scoring at least the threshold
+    """
+    if not qdrant_client:
+        raise HTTPException(status_code=503, detail="Qdrant connection not available")
+    if request.vector_query is None and not request.text_query:
+        raise HTTPException(status_code=400, detail="text_query or vector_query required")
+    if request.vector_query is None and not embedder:
+        raise HTTPException(status_code=503, detail="Embedding backend not available")
+    
+    try:
+        query_vector = request.vector_query
+        if query_vector is None:
+            query_vector = (await embedder.embed([request.text_query]))[0].tolist()
+        
+        results = await qdrant_client.search(
+            collection_name=request.collection_name,
+            query_vector=query_vector,
+            limit=request.limit,
+            score_threshold=request.threshold,
+            query_filter=build_filter(request.filter),
+            with_payload=request.with_payload
+        )
+        
+        return {
+            "collection_name": request.collection_name,
+            "text_query": request.text_query,
+            "embedding_backend": embedder.backend.name if request.vector_query is None else None,
+            "results": [
+                {"id": result.id, "score": result.score, "payload": result.payload} if request.with_payload
+                else {"id": result.id, "score": result.score}
+                for result in results
+            ],
+            "result_count": len(results),
+            "threshold": request.threshold,
+            "timestamp": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f\"Search operation failed: {str(e)}\")
-        raise HTTPException(status_code=500, detail=f\"Search operation failed: {str(e)}\")
+        logger.error(f"Similarity search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Similarity search failed: {str(e)}")
 
-@app.get(\"/tools/list\")
+@app.get("/tools/list")
 async def list_tools():
-    \"\"\"List all available MCP tools\"\"\"
+    """List all available MCP tools"""
     return {
-        \"tools\": [
+        "tools": [
             {
-                \"name\": \"collection\",
-                \"description\": \"Manage vector collections - create, delete, list, get info\",
-                \"parameters\": {
-                    \"operation\": \"string (required: create|delete|list|info)\",
-                    \"collection_name\": \"string (optional, collection name)\",
-                    \"vector_size\": \"integer (optional, vector dimension for create)\",
-                    \"distance\": \"string (optional: Cosine|Euclid|Dot, default Cosine)\"
+                "name": "collection",
+                "description": "Manage vector collections - create, delete, list, get info",
+                "parameters": {
+                    "operation": "string (required: create|delete|list|info|create_index|delete_index)",
+                    "collection_name": "string (optional, collection name)",
+                    "vector_size": "integer (optional, vector dimension for create)",
+                    "distance": "string (optional: Cosine|Euclid|Dot, default Cosine)",
+                    "vectors": "object (optional for create, named dense vectors {name: {size, distance, on_disk}})",
+                    "sparse_vectors": "array (optional for create, sparse vector names, e.g. [\"text\"] for BM25)",
+                    "field_name": "string (optional, payload field for create_index/delete_index)",
+                    "field_type": "string (optional: keyword|integer|float|datetime|bool|text)",
+                    "quantization": "string (optional for create: scalar|product|binary)",
+                    "quantization_always_ram": "boolean (optional, keep quantized vectors in RAM, default true)",
+                    "product_compression": "string (optional: x4|x8|x16|x32|x64, default x16)",
+                    "hnsw_m": "integer (optional, HNSW edges per node)",
+                    "hnsw_ef_construct": "integer (optional, HNSW build beam width)",
+                    "hnsw_on_disk": "boolean (optional, store the HNSW graph on disk)",
+                    "on_disk": "boolean (optional, store original vectors on disk, default false)",
+                    "on_disk_payload": "boolean (optional, store payloads on disk, default false)",
+                    "indexing_threshold": "integer (optional, optimizer indexing threshold in KB)",
+                    "memmap_threshold": "integer (optional, optimizer memmap threshold in KB)",
+                    "default_segment_number": "integer (optional, optimizer target segment count)"
                 }
             },
             {
-                \"name\": \"vector\",
-                \"description\": \"Vector operations - insert, update, delete, get points\",
-                \"parameters\": {
-                    \"operation\": \"string (required: insert|update|delete|get)\",
-                    \"collection_name\": \"string (required, collection name)\",
-                    \"points\": \"array (optional, list of points for insert)\",
-                    \"point_id\": \"string|integer (optional, point ID)\",
-                    \"vector\": \"array (optional, vector values)\",
-                    \"payload\": \"object (optional, metadata payload)\"
+                "name": "vector",
+                "description": "Vector operations - insert, update, delete, get points",
+                "parameters": {
+                    "operation": "string (required: insert|update|delete|get)",
+                    "collection_name": "string (required, collection name)",
+                    "points": "array (optional, list of points for insert; each may carry vectors, text, sparse)",
+                    "point_id": "string|integer (optional, point ID)",
+                    "vector": "array (optional, vector values)",
+                    "vector_b64": "string (optional, base64 little-endian float32 vector)",
+                    "vector_encoding": "string (optional: json|float32_b64, encoding of returned vectors)",
+                    "payload": "object (optional, metadata payload)",
+                    "vectors": "object (optional, named dense vectors {name: vector})",
+                    "text": f"string (optional, BM25-encoded into the {SPARSE_VECTOR_NAME} sparse vector)"
                 }
             },
             {
-                \"name\": \"search\",
-                \"description\": \"Vector similarity search with filtering and scoring\",
-                \"parameters\": {
-                    \"collection_name\": \"string (required, collection name)\",
-                    \"query_vector\": \"array (required, query vector)\",
-                    \"limit\": \"integer (optional, max results, default 10)\",
-                    \"score_threshold\": \"float (optional, minimum similarity score)\",
-                    \"filter\": \"object (optional, payload filter conditions)\",
-                    \"with_payload\": \"boolean (optional, include payload, default true)\",
-                    \"with_vectors\": \"boolean (optional, include vectors, default false)\"
+                "name": "ingest",
+                "description": "Bulk point ingest with chunking and parallel upserts (POST /tools/ingest for columnar JSON, /tools/ingest/ndjson for streamed NDJSON, /tools/ingest/binary for float32 frames)",
+                "parameters": {
+                    "collection_name": "string (required, collection name)",
+                    "ids": "array (required for columnar, point IDs)",
+                    "vectors": "array (required for columnar unless vectors_b64, one vector per ID)",
+                    "vectors_b64": "string (optional, base64 little-endian float32 row-major matrix)",
+                    "payloads": "array (optional, one payload per ID)",
+                    "batch_size": f"integer (optional, points per upsert, default {INGEST_BATCH_SIZE})",
+                    "parallel": f"integer (optional, concurrent upserts, default {INGEST_PARALLEL})",
+                    "wait": "boolean (optional, wait for indexing of each batch, default false)"
+                }
+            },
+            {
+                "name": "export",
+                "description": "Stream a whole collection via scroll (GET /tools/export) as NDJSON or binary frames",
+                "parameters": {
+                    "collection_name": "string (required, collection name)",
+                    "format": "string (optional: ndjson|binary, default ndjson)",
+                    "page_size": f"integer (optional, points per scroll page, default {EXPORT_PAGE_SIZE})",
+                    "filter": "string (optional, JSON payload filter as for search)"
+                }
+            },
+            {
+                "name": "import",
+                "description": "Stream an export body back in (POST /tools/import) with batched parallel upserts",
+                "parameters": {
+                    "collection_name": "string (required, target collection)",
+                    "batch_size": f"integer (optional, points per upsert, default {INGEST_BATCH_SIZE})",
+                    "parallel": f"integer (optional, concurrent upserts, default {INGEST_PARALLEL})",
+                    "wait": "boolean (optional, wait for indexing of each batch, default false)",
+                    "vector_size": "integer (optional, create the collection if missing)",
+                    "distance": "string (optional: Cosine|Euclid|Dot, default Cosine)"
+                }
+            },
+            {
+                "name": "search",
+                "description": "Vector similarity search with filtering and scoring",
+                "parameters": {
+                    "collection_name": "string (required, collection name)",
+                    "query_vector": "array (required unless query_vector_b64, query vector)",
+                    "query_vector_b64": "string (optional, base64 little-endian float32 query vector)",
+                    "vector_name": "string (optional, named vector to search)",
+                    "limit": "integer (optional, max results, default 10)",
+                    "score_threshold": "float (optional, minimum similarity score)",
+                    "filter": "object (optional, {field: value|[any of]|{gt,gte,lt,lte,any,except}}, plus must/should/must_not)",
+                    "with_payload": "boolean (optional, include payload, default true)",
+                    "with_vectors": "boolean (optional, include vectors, default false)",
+                    "vector_encoding": "string (optional: json|float32_b64, default json)",
+                    "hnsw_ef": "integer (optional, search-time HNSW beam width)",
+                    "exact": "boolean (optional, exact brute-force search, default false)",
+                    "rescore": "boolean (optional, rescore quantized candidates with original vectors)",
+                    "oversampling": "float (optional, quantized candidate oversampling factor)"
+                }
+            },
+            {
+                "name": "hybrid_search",
+                "description": "Dense + BM25 sparse (and multi-vector) search fused server-side with reciprocal rank fusion",
+                "parameters": {
+                    "collection_name": "string (required, collection name)",
+                    "query_text": "string (optional, BM25 sparse query; embedded for the dense query if embed_query)",
+                    "query_vector": "array (optional, dense query vector)",
+                    "query_vector_b64": "string (optional, base64 little-endian float32 dense query vector)",
+                    "dense_vector_name": "string (optional, named vector for the dense query)",
+                    "named_vectors": "object (optional, further dense queries {vector name: vector})",
+                    "sparse_vector_name": f"string (optional, sparse vector for query_text, default {SPARSE_VECTOR_NAME})",
+                    "embed_query": "boolean (optional, embed query_text for the dense query, default false)",
+                    "limit": "integer (optional, fused results, default 10)",
+                    "prefetch_limit": "integer (optional, candidates per sub-query, default 4 * limit)",
+                    "rrf_k": f"integer (optional, RRF constant, default {RRF_K})",
+                    "weights": "object (optional, per sub-query weight by vector name, 'dense' if unnamed)",
+                    "filter": "object (optional, payload filter applied to every sub-query)",
+                    "with_payload": "boolean (optional, include payload, default true)"
+                }
+            },
+            {
+                "name": "embed",
+                "description": "Text to vectors with micro-batching and a content-hash cache",
+                "parameters": {
+                    "texts": "array (required, texts to embed)",
+                    "vector_encoding": "string (optional: json|float32_b64, default json)"
+                }
+            },
+            {
+                "name": "similarity",
+                "description": "Similarity search from text (embedded server-side) or a vector, above a score threshold",
+                "parameters": {
+                    "collection_name": "string (required, collection name)",
+                    "text_query": "string (required unless vector_query, text to embed and search)",
+                    "vector_query": "array (optional, query vector instead of text)",
+                    "limit": "integer (optional, max results, default 10)",
+                    "threshold": "float (optional, minimum score, default 0.7)",
+                    "filter": "object (optional, payload filter as for search)",
+                    "with_payload": "boolean (optional, include payload, default true)"
+                }
+            },
+            {
+                "name": "search_batch",
+                "description": "Many similarity searches in one request, each with its own filter and limit",
+                "parameters": {
+                    "collection_name": "string (required, collection name)",
+                    "searches": "array (required, objects with query_vector, limit, score_threshold, filter)",
+                    "with_payload": "boolean (optional, include payload, default true)",
+                    "with_vectors": "boolean (optional, include vectors, default false)",
+                    "ids_only": "boolean (optional, return only ids and scores per query, default false)",
+                    "vector_encoding": "string (optional: json|float32_b64, encoding of returned vectors)"
                 }
             }
         ]
     }
 
-if __name__ == \"__main__\":
-    import uvicorn
-    uvicorn.run(app, host=\"0.0.0.0\", port=8000)
\ No newline at end of file
+async def replicate_to_local(collection_names: List[str]):
+    """Copy collections from Qdrant into the local index for degraded-mode reads"""
+    source = AsyncQdrantClient(url=os.getenv('QDRANT_URL', 'http://qdrant:6333'), timeout=60)
+    target = LocalVectorStore(LOCAL_INDEX_PATH)
+    try:
+        names = collection_names or [col.name for col in (await source.get_collections()).collections]
+        for name in names:
+            info = await source.get_collection(name)
+            if not isinstance(info.config.params.vectors, VectorParams):
+                logger.warning(f"Skipping {name}: named vectors are not supported by the local index")
+                continue
+            await target.delete_collection(name)
+            await target.create_collection(name, vectors_config=info.config.params.vectors)
+            copied = 0
+            offset = None
+            while True:
+                records, offset = await source.scroll(name, limit=EXPORT_PAGE_SIZE, offset=offset,
+                                                      with_payload=True, with_vectors=True)
+                if records:
+                    target.collections[name].upsert([r.id for r in records], [r.vector for r in records],
+                                                    [r.payload for r in records])
+                    copied += len(records)
+                if offset is None:
+                    break
+            logger.info(f"Replicated {copied} points of {name} to {LOCAL_INDEX_PATH}")
+    finally:
+        await target.close()
+        await source.close()
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "replicate":
+        # python main.py replicate [collection ...]
+        asyncio.run(replicate_to_local(sys.argv[2:]))
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
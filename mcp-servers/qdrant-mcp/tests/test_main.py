@@ -0,0 +1,789 @@
+#!/usr/bin/env python3
+"""
+Qdrant MCP Service Tests
+"""
+import asyncio
+import json
+import re
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+
+# Import the main app
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi import HTTPException
+from qdrant_client.models import Batch, Distance, Record, VectorParams
+import main
+from main import (
+    app, BM25Encoder, BatchSearchQuery, CollectionInfoCache, CollectionRequest, Embedder, FrameDecoder, HashEmbeddingBackend,
+    LocalVectorStore, VectorCache,
+    build_condition, build_filter, build_quantization_config, build_search_params, reciprocal_rank_fusion, decode_vectors_b64, encode_frame, encode_vector_b64
+)
+
+client = TestClient(app)
+
+class TestQdrantMCPHealth:
+    """Test health and basic functionality"""
+
+    def test_health_is_local(self, monkeypatch):
+        """Test that liveness does not touch Qdrant"""
+        monkeypatch.setattr(main, "qdrant_client", None)
+        response = client.get("/health")
+        assert response.status_code == 200
+        assert response.json()["qdrant"]["status"] == "disconnected"
+
+    def test_ready_requires_qdrant(self, monkeypatch):
+        """Test that readiness fails without a Qdrant connection"""
+        monkeypatch.setattr(main, "qdrant_client", None)
+        assert client.get("/ready").status_code == 503
+
+    def test_tools_list_endpoint(self):
+        """Test tools listing"""
+        response = client.get("/tools/list")
+        assert response.status_code == 200
+
+        tool_names = [tool["name"] for tool in response.json()["tools"]]
+        for tool in ["collection", "vector", "ingest", "search", "search_batch"]:
+            assert tool in tool_names
+
+class TestBinaryTransport:
+    """Test base64 and framed float32 vector encodings"""
+
+    def test_base64_round_trip(self):
+        """Test that a vector survives base64 float32 encoding"""
+        vector = [0.25, -1.5, 3.0]
+        decoded = decode_vectors_b64(encode_vector_b64(vector))
+        assert decoded.shape == (1, 3)
+        assert decoded[0].tolist() == vector
+
+    def test_base64_matrix_dimension(self):
+        """Test decoding a row-major matrix with a known dimension"""
+        matrix = np.arange(12, dtype="<f4").reshape(4, 3)
+        decoded = decode_vectors_b64(encode_vector_b64(matrix.ravel()), dim=3)
+        assert decoded.shape == (4, 3)
+        assert np.array_equal(decoded, matrix)
+
+    def test_frame_round_trip_split_stream(self):
+        """Test decoding frames delivered in arbitrary chunks"""
+        first = encode_frame(np.ones((2, 4)), ids=[1, 2], payloads=[{"a": 1}, {"a": 2}])
+        second = encode_frame(np.zeros((1, 4)), ids=["3f2c6a1e-0000-4000-8000-000000000000"])
+        stream = first + second
+
+        decoder = FrameDecoder()
+        frames = []
+        for start in range(0, len(stream), 7):
+            frames += decoder.feed(stream[start:start + 7])
+        decoder.finish()
+
+        assert len(frames) == 2
+        vectors, ids, payloads = frames[0]
+        assert vectors.shape == (2, 4)
+        assert ids == [1, 2]
+        assert payloads == [{"a": 1}, {"a": 2}]
+        vectors, ids, payloads = frames[1]
+        assert ids == ["3f2c6a1e-0000-4000-8000-000000000000"]
+        assert payloads is None
+
+    def test_truncated_frame(self):
+        """Test that a truncated body is rejected"""
+        decoder = FrameDecoder()
+        assert decoder.feed(encode_frame(np.ones((2, 4)), ids=[1, 2])[:-3]) == []
+        with pytest.raises(ValueError):
+            decoder.finish()
+
+class TestPayloadFilters:
+    """Test payload filter spec conversion"""
+
+    def test_equality_is_unchanged(self):
+        """Test that a plain {field: value} filter is an exact match"""
+        condition = build_filter({"category": "books"}).must[0]
+        assert condition.key == "category"
+        assert condition.match.value == "books"
+
+    def test_list_matches_any(self):
+        """Test that a list value becomes an any-of match"""
+        condition = build_filter({"category": ["books", "music"]}).must[0]
+        assert condition.match.any == ["books", "music"]
+
+    def test_ranges(self):
+        """Test numeric and datetime range bounds"""
+        query = build_filter({"price": {"gte": 10, "lt": 20}, "created": {"gte": "2024-01-01T00:00:00Z"}})
+        price, created = query.must
+        assert price.range.gte == 10 and price.range.lt == 20
+        assert created.range.gte.year == 2024
+
+    def test_must_not_and_should(self):
+        """Test the reserved clause keys"""
+        query = build_filter({"in_stock": True, "must_not": {"category": "toys"}, "should": {"tag": ["a", "b"]}})
+        assert query.must[0].match.value is True
+        assert query.must_not[0].match.value == "toys"
+        assert query.should[0].match.any == ["a", "b"]
+
+    @pytest.mark.parametrize("spec, message", [
+        ({"between": [1, 2]}, "Unsupported operator(s) ['between']"),
+        ({"gt": 1, "lte ": 2}, "Unsupported operator(s) ['lte ']"),
+        ({"any": [1, 2], "gte": 1}, "Conflicting operators"),
+        ({"eq": 1, "except": [2]}, "Conflicting operators"),
+        ({}, "Empty filter"),
+        ({"gte": "not a date"}, "gte"),
+    ])
+    def test_invalid_condition(self, spec, message):
+        """Test that unknown, conflicting or malformed operators are a 400 rather than silently dropped"""
+        with pytest.raises(ValueError, match=re.escape(message)):
+            build_condition("price", spec)
+        with pytest.raises(HTTPException) as error:
+            build_filter({"must_not": {"price": spec}})
+        assert error.value.status_code == 400
+        assert message in error.value.detail
+
+    def test_clause_must_be_object(self):
+        """Test that a reserved clause key with a non-object value is a 400"""
+        with pytest.raises(HTTPException) as error:
+            build_filter({"should": ["a"]})
+        assert error.value.status_code == 400
+
+    def test_invalid_filter_on_search_is_400(self, monkeypatch):
+        """Test that the single search endpoint reports a bad filter as a 400"""
+        async def search(**kwargs):
+            raise AssertionError("Qdrant should not be queried")
+
+        monkeypatch.setattr(main, "qdrant_client", SimpleNamespace(search=search))
+        response = client.post("/tools/search", json={
+            "collection_name": "c", "query_vector": [0.1, 0.2], "filter": {"price": {"any": [1], "gte": 1}}
+        })
+        assert response.status_code == 400
+        assert "Conflicting operators" in response.json()["detail"]
+
+class TestCollectionTuning:
+    """Test quantization config and search-time knobs"""
+
+    def test_no_quantization_by_default(self):
+        """Test that a plain create request stays unquantized"""
+        assert build_quantization_config(CollectionRequest(operation="create")) is None
+
+    def test_product_quantization(self):
+        """Test product quantization with a custom compression ratio"""
+        config = build_quantization_config(CollectionRequest(
+            operation="create", quantization="product", product_compression="x32", quantization_always_ram=False))
+        assert config.product.compression.value == "x32"
+        assert config.product.always_ram is False
+
+    def test_unknown_quantization(self):
+        """Test that an unknown quantization kind is rejected"""
+        with pytest.raises(HTTPException):
+            build_quantization_config(CollectionRequest(operation="create", quantization="int4"))
+
+    def test_search_params(self):
+        """Test that search params are only sent when a knob is set"""
+        assert build_search_params(BatchSearchQuery()) is None
+        params = build_search_params(BatchSearchQuery(hnsw_ef=128, rescore=True, oversampling=2.0))
+        assert params.hnsw_ef == 128
+        assert params.quantization.rescore is True
+        assert params.quantization.oversampling == 2.0
+
+class FakeQdrant:
+    """In-memory stand-in for the scroll/upsert calls used by export and import"""
+
+    def __init__(self, points):
+        self.points = points
+        self.upserted = []
+
+    async def get_collection(self, collection_name):
+        params = SimpleNamespace(vectors=VectorParams(size=2, distance=Distance.COSINE))
+        return SimpleNamespace(config=SimpleNamespace(params=params), points_count=len(self.points))
+
+    async def scroll(self, collection_name, scroll_filter, limit, offset, with_payload, with_vectors):
+        start = offset or 0
+        page = self.points[start:start + limit]
+        next_offset = start + limit if start + limit < len(self.points) else None
+        return [Record(id=i, vector=v, payload=p) for i, v, p in page], next_offset
+
+    async def collection_exists(self, collection_name):
+        return True
+
+    async def upsert(self, collection_name, points, wait):
+        self.upserted += list(zip(points.ids, points.vectors, points.payloads))
+
+class FailingQdrant(FakeQdrant):
+    """Stand-in whose upsert fails for any batch containing a given id"""
+
+    def __init__(self, failing_id, delay=0.0):
+        super().__init__([])
+        self.failing_id = failing_id
+        self.delay = delay
+        self.calls = 0
+
+    async def upsert(self, collection_name, points, wait):
+        self.calls += 1
+        if self.failing_id in points.ids:
+            await asyncio.sleep(self.delay)
+            raise RuntimeError(f"batch with {self.failing_id} rejected")
+        self.upserted += points.ids
+
+class CountingQdrant:
+    """Stand-in that counts get_collection calls and tracks concurrency"""
+
+    def __init__(self):
+        self.calls = 0
+        self.active = self.peak = 0
+
+    async def get_collection(self, collection_name):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return SimpleNamespace(name=collection_name)
+
+class TestCollectionInfoCache:
+    """Test bounded parallel collection info and its TTL cache"""
+
+    def test_bounded_parallel_and_cached(self, monkeypatch):
+        """Test that list fetches run concurrently up to the bound and are then cached"""
+        fake = CountingQdrant()
+        monkeypatch.setattr(main, "qdrant_client", fake)
+        cache = CollectionInfoCache(ttl=60)
+        names = [f"c{i}" for i in range(10)]
+
+        infos = asyncio.run(cache.info_many(names, parallel=3))
+        assert [info.name for info in infos] == names
+        assert fake.peak == 3
+
+        asyncio.run(cache.info_many(names, parallel=3))
+        assert fake.calls == 10
+
+        cache.invalidate("c0")
+        asyncio.run(cache.info("c0"))
+        assert fake.calls == 11
+
+    def test_concurrent_misses_share_a_call(self, monkeypatch):
+        """Test that simultaneous misses for one collection make one request"""
+        fake = CountingQdrant()
+        monkeypatch.setattr(main, "qdrant_client", fake)
+        cache = CollectionInfoCache(ttl=60)
+
+        async def run():
+            return await asyncio.gather(*(cache.info("same") for _ in range(5)))
+
+        asyncio.run(run())
+        assert fake.calls == 1
+
+    def test_invalidation_during_fetch(self, monkeypatch):
+        """Test that a fetch overtaken by an invalidation is neither cached nor shared"""
+        versions = iter(["stale", "fresh"])
+        release = {}
+
+        class SlowQdrant:
+            calls = 0
+
+            async def get_collection(self, collection_name):
+                SlowQdrant.calls += 1
+                value = next(versions)
+                if value == "stale":
+                    release["event"] = asyncio.Event()
+                    await release["event"].wait()
+                return SimpleNamespace(name=value)
+
+        monkeypatch.setattr(main, "qdrant_client", SlowQdrant())
+        cache = CollectionInfoCache(ttl=60)
+
+        async def run():
+            first = asyncio.create_task(cache.info("c"))
+            await asyncio.sleep(0)
+            cache.invalidate("c")
+            second = await asyncio.wait_for(cache.info("c"), 1)
+            release["event"].set()
+            return (await first).name, second.name, (await cache.info("c")).name
+
+        assert asyncio.run(run()) == ("stale", "fresh", "fresh")
+        assert SlowQdrant.calls == 2
+
+class TestExportImport:
+    """Test streaming a collection out and back in"""
+
+    POINTS = [(i, [float(i), 0.5], {"n": i}) for i in range(5)]
+
+    @pytest.mark.parametrize("fmt", ["ndjson", "binary"])
+    def test_round_trip(self, monkeypatch, fmt):
+        """Test that an export body imports back to the same points"""
+        fake = FakeQdrant(self.POINTS)
+        monkeypatch.setattr(main, "qdrant_client", fake)
+
+        exported = client.get(f"/tools/export?collection_name=src&format={fmt}&page_size=2")
+        assert exported.status_code == 200
+        assert exported.headers["x-vector-size"] == "2"
+
+        content_type = "application/octet-stream" if fmt == "binary" else "application/x-ndjson"
+        response = client.post("/tools/import?collection_name=dst&batch_size=3", content=exported.content,
+                               headers={"Content-Type": content_type})
+        assert response.status_code == 200
+        assert response.json()["points_upserted"] == 5
+        assert sorted(fake.upserted) == self.POINTS
+
+    @pytest.mark.parametrize("raw", ["not json", "[1]", '"x"', "5", "[]"])
+    def test_malformed_filter_is_400(self, monkeypatch, raw):
+        """Test that a filter that is not a JSON object is rejected before scrolling"""
+        fake = FakeQdrant(self.POINTS)
+        monkeypatch.setattr(main, "qdrant_client", fake)
+        response = client.get("/tools/export", params={"collection_name": "src", "filter": raw})
+        assert response.status_code == 400
+
+    def test_filtered_export(self, monkeypatch):
+        """Test that an object filter is accepted"""
+        monkeypatch.setattr(main, "qdrant_client", FakeQdrant(self.POINTS))
+        response = client.get("/tools/export", params={"collection_name": "src", "filter": '{"n": 1}'})
+        assert response.status_code == 200
+
+class TestBatchFailures:
+    """Test that a failed batch fails the whole upload"""
+
+    def test_ingest_reports_failed_batch(self, monkeypatch):
+        """Test that /tools/ingest returns an error when one batch fails"""
+        monkeypatch.setattr(main, "qdrant_client", FailingQdrant(failing_id=4))
+        response = client.post("/tools/ingest", json={
+            "collection_name": "c", "ids": list(range(8)), "vectors": [[float(i), 0.0] for i in range(8)],
+            "batch_size": 2, "parallel": 3
+        })
+        assert response.status_code == 500
+        assert "batch with 4 rejected" in response.json()["detail"]
+
+    @pytest.mark.parametrize("path", ["/tools/ingest/ndjson", "/tools/import"])
+    def test_streamed_ingest_reports_failed_batch(self, monkeypatch, path):
+        """Test that NDJSON ingest and import return an error when one batch fails"""
+        monkeypatch.setattr(main, "qdrant_client", FailingQdrant(failing_id=1))
+        body = "\n".join(json.dumps({"id": i, "vector": [float(i), 0.0], "payload": {}}) for i in range(6))
+        response = client.post(f"{path}?collection_name=c&batch_size=2", content=body,
+                               headers={"Content-Type": "application/x-ndjson"})
+        assert response.status_code == 500
+        assert "batch with 1 rejected" in response.json()["detail"]
+
+    def test_failure_after_other_batches_finish(self, monkeypatch):
+        """Test that a slow failing batch is still raised once faster batches have completed"""
+        fake = FailingQdrant(failing_id=0, delay=0.05)
+        monkeypatch.setattr(main, "qdrant_client", fake)
+        batches = main.columnar_batches(list(range(6)), [[float(i), 0.0] for i in range(6)], None, 2)
+        with pytest.raises(RuntimeError, match="batch with 0 rejected"):
+            asyncio.run(main.upsert_batches("c", batches, parallel=3, wait=False))
+        assert sorted(fake.upserted) == [2, 3, 4, 5]
+
+    def test_no_batches_sent_after_failure(self, monkeypatch):
+        """Test that sequential upload stops at the first failed batch"""
+        fake = FailingQdrant(failing_id=2)
+        monkeypatch.setattr(main, "qdrant_client", fake)
+        batches = main.columnar_batches(list(range(8)), [[float(i), 0.0] for i in range(8)], None, 2)
+        with pytest.raises(RuntimeError):
+            asyncio.run(main.upsert_batches("c", batches, parallel=1, wait=False))
+        assert fake.calls == 2
+
+    def test_success_counts_all_points(self, monkeypatch):
+        """Test the summary when every batch succeeds"""
+        monkeypatch.setattr(main, "qdrant_client", FailingQdrant(failing_id=-1))
+        batches = main.columnar_batches(list(range(5)), [[float(i), 0.0] for i in range(5)], None, 2)
+        result = asyncio.run(main.upsert_batches("c", batches, parallel=2, wait=False))
+        assert result["points_upserted"] == 5 and result["batches"] == 3
+
+class TestSearchBatchValidation:
+    """Test that invalid batch search entries are rejected before searching"""
+
+    class RecordingQdrant:
+        def __init__(self):
+            self.requests = None
+
+        async def search_batch(self, collection_name, requests):
+            self.requests = requests
+            return [[SimpleNamespace(id=i, score=1.0, payload={}, vector=None)] for i in range(len(requests))]
+
+    @pytest.mark.parametrize("entry, message", [
+        ({"limit": 3}, "query_vector or query_vector_b64 required"),
+        ({"query_vector": []}, "query_vector or query_vector_b64 required"),
+        ({"query_vector_b64": "not base64!"}, "Invalid base64 vector"),
+        ({"query_vector": [0.1, 0.2], "filter": {"must": "x"}}, "'must' filter must be an object"),
+        ({"query_vector": [0.1, 0.2], "filter": {"ts": {"gte": "not a date"}}}, "gte"),
+    ])
+    def test_invalid_entry_is_400(self, monkeypatch, entry, message):
+        """Test that a bad entry returns 400 naming its index and nothing is searched"""
+        fake = self.RecordingQdrant()
+        monkeypatch.setattr(main, "qdrant_client", fake)
+        response = client.post("/tools/search_batch", json={
+            "collection_name": "c", "searches": [{"query_vector": [0.1, 0.2]}, entry]
+        })
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("searches[1]: ")
+        assert message in response.json()["detail"]
+        assert fake.requests is None
+
+    def test_valid_batch(self, monkeypatch):
+        """Test that valid entries, JSON or base64, are sent as one batch"""
+        fake = self.RecordingQdrant()
+        monkeypatch.setattr(main, "qdrant_client", fake)
+        response = client.post("/tools/search_batch", json={
+            "collection_name": "c", "ids_only": True,
+            "searches": [{"query_vector": [0.1, 0.2]}, {"query_vector_b64": encode_vector_b64([0.3, 0.4]), "limit": 2}]
+        })
+        assert response.status_code == 200
+        assert response.json()["results"] == [{"ids": [0], "scores": [1.0]}, {"ids": [1], "scores": [1.0]}]
+        assert [request.limit for request in fake.requests] == [10, 2]
+
+    @pytest.mark.parametrize("encoding", ["json", "float32_b64"])
+    def test_vector_encoding(self, monkeypatch, encoding):
+        """Test that returned vectors honour vector_encoding"""
+        class VectorQdrant:
+            async def search_batch(self, collection_name, requests):
+                return [[SimpleNamespace(id=1, score=0.5, payload={}, vector=[0.25, -1.0])] for _ in requests]
+
+        monkeypatch.setattr(main, "qdrant_client", VectorQdrant())
+        response = client.post("/tools/search_batch", json={
+            "collection_name": "c", "with_vectors": True, "vector_encoding": encoding,
+            "searches": [{"query_vector": [0.1, 0.2]}]
+        })
+        assert response.status_code == 200
+        vector = response.json()["results"][0][0]["vector"]
+        if encoding == "json":
+            assert vector == [0.25, -1.0]
+        else:
+            assert vector == encode_vector_b64([0.25, -1.0])
+            assert decode_vectors_b64(vector).tolist() == [[0.25, -1.0]]
+
+class CountingBackend(HashEmbeddingBackend):
+    """Hash backend that records each batch it is asked to embed"""
+
+    def __init__(self):
+        super().__init__(dim=16)
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return super().embed(texts)
+
+class TestEmbeddings:
+    """Test the embedding backend, vector cache and micro-batcher"""
+
+    def test_hash_backend(self):
+        """Test that hash embeddings are deterministic, normalised and similarity-preserving"""
+        backend = HashEmbeddingBackend(dim=256)
+        a, b, c = backend.embed(["dark mode settings", "dark mode setting", "quarterly revenue report"])
+        assert np.isclose(np.linalg.norm(a), 1.0)
+        assert np.array_equal(a, backend.embed(["dark mode settings"])[0])
+        assert a @ b > a @ c
+
+    def test_cache_persists(self, tmp_path):
+        """Test that cached vectors survive reopening the mmap files"""
+        cache = VectorCache(str(tmp_path), "test", 4, 32)
+        cache.put(b"k" * 16, np.arange(4, dtype="<f4"))
+        cache.flush()
+
+        reopened = VectorCache(str(tmp_path), "test", 4, 32)
+        assert reopened.get(b"k" * 16).tolist() == [0, 1, 2, 3]
+        assert reopened.get(b"x" * 16) is None
+
+    def test_concurrent_requests_share_a_batch(self, tmp_path):
+        """Test micro-batching, in-batch dedup and cache hits"""
+        backend = CountingBackend()
+        embedder = Embedder(backend, VectorCache(str(tmp_path), "test", 16, 64), batch_wait_ms=20)
+
+        async def run():
+            first = await asyncio.gather(embedder.embed(["a", "b"]), embedder.embed(["b", "c"]))
+            again = await embedder.embed(["a", "c"])
+            return first, again
+
+        (left, right), again = asyncio.run(run())
+        embedder.close()
+
+        assert backend.calls == [["a", "b", "c"]]
+        assert np.array_equal(left[1], right[0])
+        assert np.array_equal(again[0], left[0])
+        assert embedder.cache.stats()["hits"] == 2
+
+class TestLocalIndex:
+    """Test the in-process NumPy vector index"""
+
+    def test_search_filter_and_persistence(self, tmp_path):
+        """Test exact search, payload filters, deletes and reopening from disk"""
+        async def build():
+            store = LocalVectorStore(str(tmp_path))
+            await store.create_collection("docs", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+            # More points than the initial capacity, to exercise growth
+            ids = list(range(3000))
+            vectors = [[1.0, i / 3000] for i in ids]
+            payloads = [{"group": "a" if i % 2 else "b", "n": i} for i in ids]
+            await store.upsert("docs", Batch(ids=ids, vectors=vectors, payloads=payloads))
+            await store.delete("docs", points_selector=[0])
+            hits = await store.search("docs", [1.0, 0.0], limit=2)
+            filtered = await store.search("docs", [1.0, 0.0], limit=2, query_filter=build_filter({"group": "b"}))
+            await store.close()
+            return hits, filtered
+
+        hits, filtered = asyncio.run(build())
+        assert [hit.id for hit in hits] == [1, 2]
+        assert hits[0].score == pytest.approx(1.0, abs=1e-6)
+        assert [hit.id for hit in filtered] == [2, 4]
+
+        async def reopen():
+            store = LocalVectorStore(str(tmp_path))
+            info = await store.get_collection("docs")
+            points = await store.retrieve("docs", [0, 5], with_vectors=True)
+            pages = await store.scroll("docs", limit=1000)
+            await store.close()
+            return info, points, pages
+
+        info, points, (records, next_offset) = asyncio.run(reopen())
+        assert info.points_count == 2999
+        assert [point.id for point in points] == [5]
+        assert points[0].payload == {"group": "a", "n": 5}
+        assert len(records) == 1000 and next_offset is not None
+
+    def test_euclid_threshold(self, tmp_path):
+        """Test that Euclid scores are distances, ascending, with an upper threshold"""
+        async def run():
+            store = LocalVectorStore(str(tmp_path))
+            await store.create_collection("points", vectors_config=VectorParams(size=1, distance=Distance.EUCLID))
+            await store.upsert("points", Batch(ids=[1, 2, 3], vectors=[[0.0], [1.0], [5.0]], payloads=None))
+            return await store.search("points", [0.5], limit=10, score_threshold=1.0)
+
+        hits = asyncio.run(run())
+        assert [(hit.id, hit.score) for hit in hits] == [(1, 0.5), (2, 0.5)]
+
+    def test_search_during_writes(self, tmp_path):
+        """Test that threaded searches see a consistent view while points are upserted and deleted"""
+        # Switch threads often so searches interleave with the writes on the event loop
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        async def run():
+            store = LocalVectorStore(str(tmp_path))
+            await store.create_collection("live", vectors_config=VectorParams(size=2, distance=Distance.DOT))
+            await store.upsert("live", Batch(ids=list(range(20000)), vectors=[[1.0, 0.0]] * 20000,
+                                             payloads=[{"keep": True}] * 20000))
+            query_filter = build_filter({"keep": True})
+            searches = [asyncio.create_task(store.search("live", [1.0, 0.0], limit=5, query_filter=query_filter))
+                        for _ in range(20)]
+            for i in range(20000, 22000):
+                await store.upsert("live", Batch(ids=[i], vectors=[[1.0, 0.0]], payloads=[{"keep": True}]))
+                await store.delete("live", points_selector=[i - 20000])
+                await asyncio.sleep(0)
+            results = await asyncio.gather(*searches)
+            info = await store.get_collection("live")
+            await store.close()
+            return results, info
+
+        try:
+            results, info = asyncio.run(run())
+        finally:
+            sys.setswitchinterval(interval)
+        assert all(len(hits) == 5 for hits in results)
+        assert info.points_count == 20000
+
+class TestHybridSearch:
+    """Test BM25 sparse encoding and reciprocal rank fusion"""
+
+    def test_bm25_scores_rare_terms_higher(self, tmp_path):
+        """Test that the sparse dot product ranks like BM25"""
+        encoder = BM25Encoder(str(tmp_path / "docs.json"))
+        texts = ["redis cache redis cache", "postgres cache", "qdrant vectors cache"]
+        for point_id, text in enumerate(texts):
+            encoder.add_document(point_id, text)
+        docs = [encoder.encode_document(text) for text in texts]
+        query = encoder.encode_query("redis cache")
+
+        def score(doc):
+            weights = dict(zip(doc.indices, doc.values))
+            return sum(weights.get(i, 0.0) * w for i, w in zip(query.indices, query.values))
+
+        scores = [score(doc) for doc in docs]
+        assert scores[0] > scores[1] > 0
+        assert scores[1] == pytest.approx(scores[2], rel=0.2)
+
+    def test_bm25_statistics_persist(self, tmp_path):
+        """Test that corpus statistics survive a reload"""
+        path = str(tmp_path / "docs.json")
+        encoder = BM25Encoder(path)
+        encoder.add_document(1, "alpha beta")
+        encoder.save()
+        reloaded = BM25Encoder(path)
+        assert reloaded.documents == 1
+        assert reloaded.encode_query("alpha").values == encoder.encode_query("alpha").values
+        assert reloaded.remove_document(1) and reloaded.documents == 0
+
+    def test_bm25_writes_append_to_the_log(self, tmp_path, monkeypatch):
+        """Test that a save appends only its own changes and the snapshot is rewritten on compaction"""
+        monkeypatch.setattr(main, "BM25_LOG_COMPACT_MIN", 3)
+        path = tmp_path / "docs.json"
+        encoder = BM25Encoder(str(path))
+        encoder.add_document(1, "alpha beta")
+        encoder.save()
+        encoder.remove_document(1)
+        encoder.add_document(2, "gamma")
+        encoder.save()
+        assert not path.exists()
+        assert [json.loads(line) for line in open(encoder.log_path)] == [
+            ["1", 2, sorted(encoder.term_counts("alpha beta"))], ["1"],
+            ["2", 1, sorted(encoder.term_counts("gamma"))],
+        ]
+
+        encoder.add_document(3, "delta")
+        encoder.save()
+        assert path.exists() and not os.path.exists(encoder.log_path)
+        assert json.loads(path.read_text())["documents"] == 2
+
+    def test_bm25_write_after_reload(self, tmp_path):
+        """Test that a write after a reload from snapshot plus log keeps the statistics consistent"""
+        path = str(tmp_path / "docs.json")
+        encoder = BM25Encoder(path)
+        encoder.add_document(1, "alpha beta")
+        encoder.add_document(2, "alpha")
+        encoder.compact()
+        encoder.remove_document(2)
+        encoder.add_document(3, "gamma gamma")
+        encoder.save()
+
+        reloaded = BM25Encoder(path)
+        assert (reloaded.documents, reloaded.total_length) == (2, 4)
+        reloaded.add_document(1, "beta")
+        reloaded.remove_document(3)
+        reloaded.save()
+
+        expected = BM25Encoder(str(tmp_path / "expected.json"))
+        expected.add_document(1, "beta")
+        final = BM25Encoder(path)
+        assert (final.documents, final.total_length, final.df, final.points) == (
+            expected.documents, expected.total_length, expected.df, expected.points
+        )
+
+    def test_bm25_ignores_torn_log_tail(self, tmp_path):
+        """Test that a partial last line from an interrupted write is dropped on replay"""
+        path = str(tmp_path / "docs.json")
+        encoder = BM25Encoder(path)
+        encoder.add_document(1, "alpha beta")
+        encoder.save()
+        with open(encoder.log_path, "a") as f:
+            f.write('["2", 3, [1')
+        reloaded = BM25Encoder(path)
+        assert reloaded.documents == 1 and list(reloaded.points) == ["1"]
+
+    def test_bm25_encoding_does_not_count(self, tmp_path):
+        """Test that encoding alone leaves the statistics untouched"""
+        encoder = BM25Encoder(str(tmp_path / "docs.json"))
+        encoder.encode_document("alpha beta")
+        assert encoder.documents == 0 and not encoder.df
+
+    def test_bm25_overwrite_and_delete(self, tmp_path):
+        """Test that re-adding a point replaces its terms and removing it subtracts them"""
+        encoder = BM25Encoder(str(tmp_path / "docs.json"))
+        encoder.add_document(1, "alpha beta")
+        encoder.add_document(2, "alpha")
+        encoder.add_document(1, "gamma gamma gamma")
+        alpha, beta, gamma = (next(iter(encoder.term_counts(term))) for term in ("alpha", "beta", "gamma"))
+        assert encoder.documents == 2 and encoder.total_length == 4
+        assert encoder.df == {alpha: 1, gamma: 1}
+        assert beta not in encoder.df
+
+        assert encoder.remove_document(1)
+        assert not encoder.remove_document(1)
+        assert encoder.documents == 1 and encoder.total_length == 1
+        assert encoder.df == {alpha: 1}
+
+    def test_stats_follow_acknowledged_writes(self, tmp_path, monkeypatch):
+        """Test that the vector tool updates statistics only after Qdrant accepts the write"""
+        monkeypatch.setattr(main, "SPARSE_STATS_DIR", str(tmp_path))
+        monkeypatch.setattr(main, "sparse_encoders", {})
+
+        class SparseQdrant:
+            fail = False
+
+            async def upsert(self, collection_name, points, **kwargs):
+                if self.fail:
+                    raise RuntimeError("rejected")
+                return SimpleNamespace(operation_id=1, status=SimpleNamespace(value="completed"))
+
+            async def delete(self, collection_name, points_selector, **kwargs):
+                return SimpleNamespace(operation_id=2, status=SimpleNamespace(value="completed"))
+
+        fake = SparseQdrant()
+        monkeypatch.setattr(main, "qdrant_client", fake)
+        insert = {"operation": "insert", "collection_name": "docs",
+                  "points": [{"id": 1, "text": "alpha beta"}, {"id": 2, "text": "alpha"}]}
+        assert client.post("/tools/vector", json=insert).status_code == 200
+        assert client.post("/tools/vector", json=insert).status_code == 200
+        encoder = main.sparse_encoder("docs")
+        assert encoder.documents == 2 and encoder.total_length == 3
+
+        fake.fail = True
+        update = {"operation": "update", "collection_name": "docs", "point_id": 2, "text": "gamma delta epsilon"}
+        assert client.post("/tools/vector", json=update).status_code == 500
+        assert encoder.documents == 2 and encoder.total_length == 3
+
+        fake.fail = False
+        delete = {"operation": "delete", "collection_name": "docs", "point_id": 1}
+        assert client.post("/tools/vector", json=delete).status_code == 200
+        assert encoder.documents == 1 and encoder.total_length == 1
+        assert BM25Encoder(encoder.path).documents == 1
+
+    def test_bulk_overwrite_drops_text(self, tmp_path, monkeypatch):
+        """Test that bulk-ingesting over a point removes its BM25 text from the statistics"""
+        monkeypatch.setattr(main, "SPARSE_STATS_DIR", str(tmp_path))
+        monkeypatch.setattr(main, "sparse_encoders", {})
+        main.record_sparse_documents("docs", {1: "alpha beta", 2: "alpha"})
+        monkeypatch.setattr(main, "qdrant_client", FailingQdrant(failing_id=-1))
+        response = client.post("/tools/ingest", json={"collection_name": "docs", "ids": [1, 3],
+                                                      "vectors": [[0.1, 0.2], [0.3, 0.4]]})
+        assert response.status_code == 200
+        assert BM25Encoder(str(tmp_path / "docs.json")).documents == 1
+
+    @pytest.mark.parametrize("body, message", [
+        ({"query_vector": [0.1, 0.2], "named_vectors": {"dense": [0.3, 0.4]}}, "repeats the dense query 'dense'"),
+        ({"query_vector": [0.1, 0.2], "dense_vector_name": "image", "named_vectors": {"image": [0.3, 0.4]}},
+         "repeats the dense query 'image'"),
+        ({"query_text": "alpha", "named_vectors": {"text": [0.3, 0.4]}}, "sparse_vector_name 'text'"),
+    ])
+    def test_hybrid_rejects_duplicate_query_names(self, tmp_path, monkeypatch, body, message):
+        """Test that a sub-query cannot silently replace another with the same name"""
+        monkeypatch.setattr(main, "SPARSE_STATS_DIR", str(tmp_path))
+        monkeypatch.setattr(main, "sparse_encoders", {})
+
+        async def search_batch(**kwargs):
+            raise AssertionError("Qdrant should not be queried")
+
+        monkeypatch.setattr(main, "qdrant_client", SimpleNamespace(search_batch=search_batch))
+        response = client.post("/tools/hybrid_search", json={"collection_name": "docs", **body})
+        assert response.status_code == 400
+        assert message in response.json()["detail"]
+
+    def test_hybrid_runs_each_named_query(self, tmp_path, monkeypatch):
+        """Test that distinct dense, named and sparse queries go out in one batch and are fused"""
+        monkeypatch.setattr(main, "SPARSE_STATS_DIR", str(tmp_path))
+        monkeypatch.setattr(main, "sparse_encoders", {})
+        sent = []
+
+        async def search_batch(collection_name, requests):
+            sent.extend(requests)
+            return [[SimpleNamespace(id=i, payload={})] for i in range(len(requests))]
+
+        monkeypatch.setattr(main, "qdrant_client", SimpleNamespace(search_batch=search_batch))
+        response = client.post("/tools/hybrid_search", json={
+            "collection_name": "docs", "query_text": "alpha", "query_vector": [0.1, 0.2],
+            "named_vectors": {"image": [0.3, 0.4]}
+        })
+        assert response.status_code == 200
+        assert response.json()["sub_queries"] == {"dense": 1, "image": 1, "text": 1}
+        assert len(sent) == 3
+
+    def test_rrf(self):
+        """Test that items ranked well in several lists win"""
+        hit = lambda point_id: SimpleNamespace(id=point_id)
+        fused = reciprocal_rank_fusion({"dense": [hit(1), hit(2), hit(3)], "text": [hit(3), hit(1)]}, k=60)
+        assert [entry["id"] for entry in fused] == [1, 3, 2]
+        assert fused[0]["ranks"] == {"dense": 1, "text": 2}
+        assert fused[0]["score"] == pytest.approx(1 / 61 + 1 / 62)
+
+    def test_rrf_weights(self):
+        """Test per-list weights"""
+        hit = lambda point_id: SimpleNamespace(id=point_id)
+        fused = reciprocal_rank_fusion({"dense": [hit(1)], "text": [hit(2)]}, weights={"text": 2.0})
+        assert fused[0]["id"] == 2
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
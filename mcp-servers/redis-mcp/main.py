@@ -1,18 +1,38 @@
 #!/usr/bin/env python3
-\"\"\"
+"""
 Redis MCP Service - Cache, session management, pub/sub
 Port: 8022
-\"\"\"
-from fastapi import FastAPI, HTTPException
+"""
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 import redis.asyncio as redis
+import asyncio
+import base64
+import fnmatch
 import json
+import time
 from typing import Dict, List, Optional, Any, Union
 from datetime import datetime, timedelta
 import logging
 import os
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 
+# Optional binary value codecs
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,9 +40,41 @@ logger = logging.getLogger(__name__)
 # Redis connection pool
 redis_pool = None
 
+# Upper bound on operations in one /tools/cache_batch request
+BATCH_MAX_OPERATIONS = int(os.getenv('REDIS_BATCH_MAX_OPERATIONS', '10000'))
+
+# Session keys, and the sorted set indexing session ids by last access time
+SESSION_PREFIX = "session:"
+SESSION_INDEX_KEY = "sessions:by_last_access"
+# Sessions are hashes: id/created_at/last_accessed plus one JSON field per data key
+SESSION_DATA_PREFIX = "data:"
+SESSION_SCAN_COUNT = int(os.getenv('REDIS_SESSION_SCAN_COUNT', '500'))  # SCAN COUNT hint
+
+# Value codecs: default codec, per-keyspace overrides ("pattern=codec,..." with
+# glob patterns, first match wins), and the packed size above which the
+# compressed codecs compress
+DEFAULT_CODEC = os.getenv('REDIS_DEFAULT_CODEC', 'json')
+CODEC_RULES_SPEC = os.getenv('REDIS_CODEC_RULES', '')
+COMPRESS_THRESHOLD = int(os.getenv('REDIS_COMPRESS_THRESHOLD', '1024'))
+ZSTD_LEVEL = int(os.getenv('REDIS_ZSTD_LEVEL', '3'))
+
+# Near cache: in-process copies of hot string values, invalidated through
+# CLIENT TRACKING (Redis 6+). Prefixes limit tracking to matching keys; empty
+# tracks every key. The TTL is a safety bound, invalidations are the main path.
+NEAR_CACHE_ENABLED = os.getenv('REDIS_NEAR_CACHE', 'false').lower() == 'true'
+NEAR_CACHE_MAX_ENTRIES = int(os.getenv('REDIS_NEAR_CACHE_MAX_ENTRIES', '10000'))
+NEAR_CACHE_MAX_BYTES = int(os.getenv('REDIS_NEAR_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+NEAR_CACHE_TTL = float(os.getenv('REDIS_NEAR_CACHE_TTL', '300'))
+NEAR_CACHE_PREFIXES = [p for p in os.getenv('REDIS_NEAR_CACHE_PREFIXES', '').split(',') if p]
+NEAR_CACHE_PING_INTERVAL = float(os.getenv('REDIS_NEAR_CACHE_PING_INTERVAL', '5'))
+
+# Pub/sub: keepalive interval for SSE streams, longest blocking subscribe
+PUBSUB_HEARTBEAT = float(os.getenv('REDIS_PUBSUB_HEARTBEAT', '15'))
+PUBSUB_MAX_TIMEOUT = int(os.getenv('REDIS_PUBSUB_MAX_TIMEOUT', '60'))
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    \"\"\"Application lifespan manager\"\"\"
+    """Application lifespan manager"""
     global redis_pool
     
     # Startup
@@ -41,76 +93,308 @@ async def lifespan(app: FastAPI):
         await client.ping()
         await client.aclose()
         
-        logger.info(\"Redis connection pool created successfully\")
+        logger.info("Redis connection pool created successfully")
     except Exception as e:
-        logger.error(f\"Failed to create Redis connection pool: {e}\")
+        logger.error(f"Failed to create Redis connection pool: {e}")
         redis_pool = None
     
+    if redis_pool and NEAR_CACHE_ENABLED:
+        near_cache.start(redis_url)
+    
     yield
     
     # Shutdown
+    await near_cache.stop()
     if redis_pool:
         await redis_pool.aclose()
-        logger.info(\"Redis connection pool closed\")
+        logger.info("Redis connection pool closed")
 
 app = FastAPI(
-    title=\"Redis MCP Service\",
-    description=\"Cache, session management, pub/sub, and key-value operations\",
-    version=\"1.0.0\",
+    title="Redis MCP Service",
+    description="Cache, session management, pub/sub, and key-value operations",
+    version="1.0.0",
     lifespan=lifespan
 )
 
 # Request/Response Models
 class CacheRequest(BaseModel):
-    \"\"\"Cache operations request\"\"\"
-    operation: str = Field(..., description=\"get, set, delete, exists, expire\")
-    key: str
+    """Cache operations request"""
+    operation: str = Field(..., description="get, set, delete, exists, expire, mget, mset")
+    key: Optional[str] = None  # Required except for mget/mset
     value: Optional[Any] = None
     ttl: Optional[int] = None  # Time to live in seconds
     nx: Optional[bool] = False  # Only set if key doesn't exist
     ex: Optional[bool] = False  # Only set if key exists
+    keys: Optional[List[str]] = None  # For mget
+    values: Optional[Dict[str, Any]] = None  # For mset: key -> value
+    codec: Optional[str] = None  # json, msgpack, msgpack+zstd, msgpack+lz4; default per keyspace
+
+class CacheBatchRequest(BaseModel):
+    """Pipelined cache operations request"""
+    operations: List[CacheRequest]
+    transaction: bool = False  # Wrap the pipeline in MULTI/EXEC
 
 class HashRequest(BaseModel):
-    \"\"\"Hash operations request\"\"\"
-    operation: str = Field(..., description=\"hget, hset, hgetall, hdel, hexists, hkeys\")
+    """Hash operations request"""
+    operation: str = Field(..., description="hget, hset, hgetall, hdel, hexists, hkeys, hmget, hincrby")
     key: str
     field: Optional[str] = None
     value: Optional[Any] = None
     fields: Optional[Dict[str, Any]] = None
+    field_names: Optional[List[str]] = None  # For hmget/hdel of several fields
+    amount: int = 1  # For hincrby
+    ttl: Optional[int] = None  # Expire the key after a write
+    codec: Optional[str] = None  # Encoding of written values; default per keyspace
 
 class ListRequest(BaseModel):
-    \"\"\"List operations request\"\"\"
-    operation: str = Field(..., description=\"lpush, rpush, lpop, rpop, lrange, llen\")
+    """List operations request"""
+    operation: str = Field(..., description="lpush, rpush, lpop, rpop, lrange, llen, ltrim")
     key: str
     values: Optional[List[Any]] = None
     start: Optional[int] = 0
     end: Optional[int] = -1
+    count: Optional[int] = None  # For lpop/rpop of several values
+    ttl: Optional[int] = None  # Expire the key after a write
+    codec: Optional[str] = None  # Encoding of pushed values; default per keyspace
 
 class SetRequest(BaseModel):
-    \"\"\"Set operations request\"\"\"
-    operation: str = Field(..., description=\"sadd, srem, smembers, scard, sismember\")
+    """Set operations request"""
+    operation: str = Field(..., description="sadd, srem, smembers, scard, sismember")
     key: str
     members: Optional[List[Any]] = None
     member: Optional[Any] = None
+    ttl: Optional[int] = None  # Expire the key after a write
+    codec: Optional[str] = None  # Encoding of members; must match the one they were added with
 
 class PubSubRequest(BaseModel):
-    \"\"\"Pub/Sub operations request\"\"\"
-    operation: str = Field(..., description=\"publish, subscribe, unsubscribe\")
+    """Pub/Sub operations request"""
+    operation: str = Field(..., description="publish, subscribe, unsubscribe")
     channel: str
     message: Optional[Any] = None
     timeout: Optional[int] = 10
 
+class HashBatchRequest(BaseModel):
+    """Pipelined hash operations request"""
+    operations: List[HashRequest]
+    transaction: bool = False
+
+class ListBatchRequest(BaseModel):
+    """Pipelined list operations request"""
+    operations: List[ListRequest]
+    transaction: bool = False
+
+class SetBatchRequest(BaseModel):
+    """Pipelined set operations request"""
+    operations: List[SetRequest]
+    transaction: bool = False
+
+class PubSubBatchRequest(BaseModel):
+    """Pipelined publish request"""
+    operations: List[PubSubRequest]
+
 class SessionRequest(BaseModel):
-    \"\"\"Session management request\"\"\"
-    operation: str = Field(..., description=\"create, get, update, delete, list\")
+    """Session management request"""
+    operation: str = Field(..., description="create, get, update, delete, list")
     session_id: Optional[str] = None
     session_data: Optional[Dict[str, Any]] = None
     ttl: Optional[int] = 3600  # Default 1 hour
+    # list: page size, "recent" (by last access, via the index) or "scan" order, and the next_cursor of a previous page
+    limit: int = 100
+    order: str = "recent"
+    cursor: Optional[str] = None
+
+class NearCache:
+    """Bounded in-process LRU of raw string values, kept coherent by CLIENT TRACKING
+
+    A dedicated connection turns on tracking in BCAST mode, redirected to
+    itself, and subscribes to __redis__:invalidate, so a write to a tracked
+    key by any client drops the local copy. Entries are only used while that
+    connection is up. A fetch that overlaps an invalidation of its key is not
+    stored, so a stale reply can never be cached after the invalidation.
+    """
+    INVALIDATE_CHANNEL = b"__redis__:invalidate"
+
+    def __init__(self, max_entries: int = NEAR_CACHE_MAX_ENTRIES, max_bytes: int = NEAR_CACHE_MAX_BYTES,
+                 ttl: float = NEAR_CACHE_TTL, prefixes: Optional[List[str]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.prefixes = prefixes if prefixes is not None else NEAR_CACHE_PREFIXES
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, raw)
+        self.bytes = 0
+        self.fetching: Dict[str, int] = {}  # keys with reads in flight
+        self.dirty: set = set()  # in-flight keys invalidated since their read was sent
+        self.flushes = 0
+        self.connected = False
+        self.task: Optional[asyncio.Task] = None
+        self.hits = self.misses = self.invalidations = self.evictions = 0
+
+    def tracks(self, key: str) -> bool:
+        return not self.prefixes or any(key.startswith(prefix) for prefix in self.prefixes)
+
+    def lookup(self, key: str) -> Optional[bytes]:
+        """Return the cached raw value, or None on a miss"""
+        if not self.connected or not self.tracks(key):
+            return None
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def begin(self, keys: List[str]) -> tuple:
+        """Register reads about to be sent; pass the token to finish()"""
+        keys = [key for key in keys if self.tracks(key)] if self.connected else []
+        for key in keys:
+            self.fetching[key] = self.fetching.get(key, 0) + 1
+        return keys, self.flushes
+
+    def finish(self, token: tuple, values: Dict[str, Optional[bytes]]):
+        """Store the replies of reads registered by begin(), unless invalidated meanwhile"""
+        keys, flushes = token
+        for key in keys:
+            raw = values.get(key)
+            if raw is not None and key not in self.dirty and flushes == self.flushes and self.connected:
+                self._put(key, raw)
+            self.fetching[key] -= 1
+            if not self.fetching[key]:
+                del self.fetching[key]
+                self.dirty.discard(key)
+
+    def _put(self, key: str, raw: bytes):
+        if len(raw) > self.max_bytes:
+            return
+        self._drop(key)
+        self.entries[key] = (time.monotonic() + self.ttl, raw)
+        self.bytes += len(raw)
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[1])
+
+    def invalidate(self, keys: Optional[List[Any]] = None):
+        """Drop keys (str or bytes), or everything when keys is None"""
+        if keys is None:
+            self.entries.clear()
+            self.bytes = 0
+            self.flushes += 1
+            self.invalidations += 1
+            return
+        for key in keys:
+            key = decode_name(key)
+            if key in self.entries or key in self.fetching:
+                self._drop(key)
+                if key in self.fetching:
+                    self.dirty.add(key)
+                self.invalidations += 1
+
+    def start(self, redis_url: str):
+        if self.task is None:
+            self.task = asyncio.create_task(self.listen(redis_url))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def listen(self, redis_url: str):
+        """Hold the tracking connection open and apply invalidations; reconnect on failure"""
+        # RESP2, where invalidations arrive as pub/sub messages on the redirect connection
+        pool = redis.ConnectionPool.from_url(redis_url, protocol=2, socket_timeout=5, socket_connect_timeout=5)
+        delay = 1.0
+        while True:
+            connection = pool.make_connection()
+            try:
+                await connection.connect()
+                await connection.send_command("CLIENT", "ID")
+                client_id = await connection.read_response()
+                prefix_args = [arg for prefix in self.prefixes for arg in ("PREFIX", prefix)]
+                await connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefix_args)
+                await connection.read_response()
+                await connection.send_command("SUBSCRIBE", self.INVALIDATE_CHANNEL)
+                await connection.read_response()
+                
+                self.invalidate()
+                self.connected = True
+                delay = 1.0
+                logger.info(f"Near cache tracking enabled (prefixes: {self.prefixes or 'all keys'})")
+                
+                awaiting_pong = False
+                while True:
+                    message = await connection.read_response(timeout=NEAR_CACHE_PING_INTERVAL)
+                    if message is None:
+                        if awaiting_pong:
+                            raise ConnectionError("Tracking connection stopped answering PING")
+                        await connection.send_command("PING")
+                        awaiting_pong = True
+                    elif message[0] == b"pong":
+                        awaiting_pong = False
+                    elif message[0] == b"message" and message[1] == self.INVALIDATE_CHANNEL:
+                        # A nil key list means the whole database was flushed
+                        self.invalidate(message[2])
+            except asyncio.CancelledError:
+                raise
+            except redis.ResponseError as e:
+                logger.error(f"Near cache disabled, CLIENT TRACKING unavailable: {e}")
+                await pool.aclose()
+                return
+            except Exception as e:
+                logger.warning(f"Near cache tracking connection lost: {e}")
+            finally:
+                self.connected = False
+                self.invalidate()
+                await connection.disconnect()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.task is not None,
+            "connected": self.connected,
+            "prefixes": self.prefixes,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions
+        }
+
+near_cache = NearCache()
 
-@app.get(\"/health\")
+async def cached_mget(client: redis.Redis, keys: List[str]) -> List[Optional[bytes]]:
+    """MGET through the near cache: only keys without a local copy go to Redis"""
+    values = {key: near_cache.lookup(key) for key in keys}
+    missing = list(dict.fromkeys(key for key, raw in values.items() if raw is None))
+    if missing:
+        token = near_cache.begin(missing)
+        fetched = {}
+        try:
+            fetched = dict(zip(missing, await client.mget(missing)))
+        finally:
+            near_cache.finish(token, fetched)
+        values.update(fetched)
+    return [values[key] for key in keys]
+
+@app.get("/health")
 async def health_check():
-    \"\"\"Health check endpoint\"\"\"
-    redis_status = \"healthy\" if redis_pool else \"disconnected\"
+    """Health check endpoint"""
+    redis_status = "healthy" if redis_pool else "disconnected"
     
     info = {}
     if redis_pool:
@@ -120,57 +404,62 @@ async def health_check():
             await client.aclose()
             
             info = {
-                \"version\": redis_info.get('redis_version'),
-                \"connected_clients\": redis_info.get('connected_clients'),
-                \"used_memory_human\": redis_info.get('used_memory_human'),
-                \"uptime_in_seconds\": redis_info.get('uptime_in_seconds')
+                "version": redis_info.get('redis_version'),
+                "connected_clients": redis_info.get('connected_clients'),
+                "used_memory_human": redis_info.get('used_memory_human'),
+                "uptime_in_seconds": redis_info.get('uptime_in_seconds')
             }
         except Exception as e:
-            redis_status = f\"error: {str(e)}\"
+            redis_status = f"error: {str(e)}"
     
     return {
-        \"status\": \"healthy\",
-        \"service\": \"Redis MCP\",
-        \"port\": 8022,
-        \"timestamp\": datetime.now().isoformat(),
-        \"features\": [\"cache\", \"hash\", \"list\", \"set\", \"pubsub\", \"session\"],
-        \"redis\": {
-            \"status\": redis_status,
-            \"info\": info
-        }
+        "status": "healthy",
+        "service": "Redis MCP",
+        "port": 8022,
+        "timestamp": datetime.now().isoformat(),
+        "features": ["cache", "hash", "list", "set", "pubsub", "session"],
+        "redis": {
+            "status": redis_status,
+            "info": info
+        },
+        "near_cache": near_cache.stats()
     }
 
-@app.post(\"/tools/cache\")
+@app.post("/tools/cache")
 async def cache_tool(request: CacheRequest) -> Dict[str, Any]:
-    \"\"\"
+    """
     Cache operations
     
     Tool: cache
     Description: Get, set, delete, check existence, set expiration for keys
-    \"\"\"
+    """
     if not redis_pool:
-        raise HTTPException(status_code=503, detail=\"Redis connection not available\")
+        raise HTTPException(status_code=503, detail="Redis connection not available")
+    
+    if request.operation not in ("mget", "mset") and not request.key:
+        raise HTTPException(status_code=400, detail="Key required")
     
     try:
         client = redis.Redis(connection_pool=redis_pool)
         
-        if request.operation == \"get\":
-            value = await client.get(request.key)
-            result = json.loads(value) if value else None
+        if request.operation == "get":
+            value = (await cached_mget(client, [request.key]))[0]
+            result = decode_value(value)
             
             return {
-                \"operation\": \"get\",
-                \"key\": request.key,
-                \"value\": result,
-                \"found\": value is not None,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "get",
+                "key": request.key,
+                "value": result,
+                "found": value is not None,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"set\":
+        elif request.operation == "set":
             if request.value is None:
-                raise HTTPException(status_code=400, detail=\"Value required for set operation\")
+                raise HTTPException(status_code=400, detail="Value required for set operation")
             
-            value_str = json.dumps(request.value)
+            codec = resolve_codec(request.key, request.codec)
+            value_str = encode_value(request.value, codec)
             kwargs = {}
             
             if request.ttl:
@@ -181,228 +470,1102 @@ async def cache_tool(request: CacheRequest) -> Dict[str, Any]:
                 kwargs['xx'] = True
             
             success = await client.set(request.key, value_str, **kwargs)
+            near_cache.invalidate([request.key])
             
             return {
-                \"operation\": \"set\",
-                \"key\": request.key,
-                \"value\": request.value,
-                \"success\": bool(success),
-                \"ttl\": request.ttl,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "set",
+                "key": request.key,
+                "value": request.value,
+                "success": bool(success),
+                "ttl": request.ttl,
+                "codec": codec,
+                "stored_bytes": len(value_str),
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"delete\":
+        elif request.operation == "delete":
             deleted_count = await client.delete(request.key)
+            near_cache.invalidate([request.key])
             
             return {
-                \"operation\": \"delete\",
-                \"key\": request.key,
-                \"deleted\": deleted_count > 0,
-                \"deleted_count\": deleted_count,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "delete",
+                "key": request.key,
+                "deleted": deleted_count > 0,
+                "deleted_count": deleted_count,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"exists\":
+        elif request.operation == "exists":
             exists = await client.exists(request.key)
             
             return {
-                \"operation\": \"exists\",
-                \"key\": request.key,
-                \"exists\": bool(exists),
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "exists",
+                "key": request.key,
+                "exists": bool(exists),
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"expire\":
+        elif request.operation == "expire":
             if not request.ttl:
-                raise HTTPException(status_code=400, detail=\"TTL required for expire operation\")
+                raise HTTPException(status_code=400, detail="TTL required for expire operation")
                 
             success = await client.expire(request.key, request.ttl)
+            near_cache.invalidate([request.key])
             
             return {
-                \"operation\": \"expire\",
-                \"key\": request.key,
-                \"ttl\": request.ttl,
-                \"success\": bool(success),
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "expire",
+                "key": request.key,
+                "ttl": request.ttl,
+                "success": bool(success),
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        elif request.operation == "mget":
+            if not request.keys:
+                raise HTTPException(status_code=400, detail="Keys required for mget operation")
+            
+            values = await cached_mget(client, request.keys)
+            
+            return {
+                "operation": "mget",
+                "values": {key: decode_value(value) for key, value in zip(request.keys, values)},
+                "found": sum(value is not None for value in values),
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        elif request.operation == "mset":
+            if not request.values:
+                raise HTTPException(status_code=400, detail="Values required for mset operation")
+            
+            success = await mset_values(client, request.values, request.ttl, request.codec)
+            near_cache.invalidate(list(request.values))
+            
+            return {
+                "operation": "mset",
+                "keys": list(request.values),
+                "success": success,
+                "ttl": request.ttl,
+                "timestamp": datetime.now().isoformat()
             }
         
         else:
-            raise HTTPException(status_code=400, detail=f\"Unknown operation: {request.operation}\")
+            raise HTTPException(status_code=400, detail=f"Unknown operation: {request.operation}")
         
         await client.aclose()
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f\"Cache operation failed: {str(e)}\")
-        raise HTTPException(status_code=500, detail=f\"Cache operation failed: {str(e)}\")
+        logger.error(f"Cache operation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Cache operation failed: {str(e)}")
+
+async def mset_values(client: redis.Redis, values: Dict[str, Any], ttl: Optional[int] = None,
+                      codec: Optional[str] = None) -> bool:
+    """Set many keys in one round trip: MSET, or pipelined SET EX when a TTL applies"""
+    encoded = {key: encode_value(value, resolve_codec(key, codec)) for key, value in values.items()}
+    if not ttl:
+        return bool(await client.mset(encoded))
+    async with client.pipeline(transaction=False) as pipe:
+        for key, value in encoded.items():
+            pipe.set(key, value, ex=ttl)
+        return all(await pipe.execute())
+
+# JSON values are stored as plain JSON text, readable by any client and by
+# earlier releases. Binary encodings start with a header byte no JSON text can
+# start with, so keyspaces holding a mix of encodings decode correctly.
+CODEC_HEADER_MSGPACK = b"\x01"
+CODEC_HEADER_ZSTD = b"\x02"  # zstd-compressed MessagePack
+CODEC_HEADER_LZ4 = b"\x03"  # lz4-frame-compressed MessagePack
+CODECS = ("json", "msgpack", "msgpack+zstd", "msgpack+lz4")
+CODEC_HEADERS = {CODEC_HEADER_MSGPACK: "msgpack", CODEC_HEADER_ZSTD: "msgpack+zstd", CODEC_HEADER_LZ4: "msgpack+lz4"}
+
+zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard else None
+zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
 
-@app.post(\"/tools/session\")
+def parse_codec_rules(spec: str) -> List[tuple]:
+    """Parse "pattern=codec,..." into (glob pattern, codec) pairs"""
+    rules = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        pattern, _, codec = item.partition("=")
+        if codec.strip() not in CODECS:
+            raise ValueError(f"Unknown codec in REDIS_CODEC_RULES: {item.strip()}")
+        rules.append((pattern.strip(), codec.strip()))
+    return rules
+
+CODEC_RULES = parse_codec_rules(CODEC_RULES_SPEC)
+
+def check_codec_available(codec: str):
+    missing = ("msgpack" if codec != "json" and msgpack is None else
+               "zstandard" if codec == "msgpack+zstd" and zstandard is None else
+               "lz4" if codec == "msgpack+lz4" and lz4 is None else None)
+    if missing:
+        raise ValueError(f"Codec {codec} requires the {missing} package")
+
+def resolve_codec(key: Optional[str], requested: Optional[str] = None) -> str:
+    """The codec for a write: the requested one, else the first matching keyspace rule, else the default"""
+    codec = requested
+    if not codec:
+        codec = next((rule_codec for pattern, rule_codec in CODEC_RULES
+                      if key and fnmatch.fnmatchcase(key, pattern)), DEFAULT_CODEC)
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec} (expected one of {', '.join(CODECS)})")
+    check_codec_available(codec)
+    return codec
+
+def encode_value(value: Any, codec: str = "json") -> Union[str, bytes]:
+    """Serialize a value for storage in a string, hash field, list element or set member
+
+    The compressed codecs only compress values whose packed size reaches
+    COMPRESS_THRESHOLD and shrink; other values are stored as MessagePack.
+    """
+    if codec == "json":
+        return json.dumps(value)
+    packed = msgpack.packb(value)
+    if codec != "msgpack" and len(packed) >= COMPRESS_THRESHOLD:
+        if codec == "msgpack+zstd":
+            compressed = CODEC_HEADER_ZSTD + zstd_compressor.compress(packed)
+        else:
+            compressed = CODEC_HEADER_LZ4 + lz4.frame.compress(packed)
+        if len(compressed) <= len(packed):
+            return compressed
+    return CODEC_HEADER_MSGPACK + packed
+
+def decode_value(raw: Optional[bytes]) -> Any:
+    """Deserialize a stored value of any codec; data written by other clients comes back as text"""
+    if raw is None:
+        return None
+    header = raw[:1] if isinstance(raw, bytes) else b""
+    if header in CODEC_HEADERS:
+        try:
+            check_codec_available(CODEC_HEADERS[header])
+        except ValueError as e:
+            raise RuntimeError(f"Cannot decode stored value: {str(e)}")
+    if header == CODEC_HEADER_MSGPACK:
+        return msgpack.unpackb(raw[1:])
+    if header == CODEC_HEADER_ZSTD:
+        return msgpack.unpackb(zstd_decompressor.decompress(raw[1:]))
+    if header == CODEC_HEADER_LZ4:
+        return msgpack.unpackb(lz4.frame.decompress(raw[1:]))
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+
+def decode_name(raw) -> str:
+    return raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+
+async def execute_operations(client: redis.Redis, operations: List[Any], queue, transaction: bool = False,
+                             batch: bool = True) -> List[Dict[str, Any]]:
+    """Queue every operation on one pipeline, run it, and decode per-operation results
+
+    `queue(pipe, op)` queues an operation's commands (a write may add an
+    EXPIRE) and returns a function decoding the first reply. Redis errors are
+    reported on the failing item; invalid operations raise HTTP 400.
+    """
+    async with client.pipeline(transaction=transaction) as pipe:
+        plan = []
+        for index, op in enumerate(operations):
+            start = len(pipe)
+            try:
+                decode = queue(pipe, op)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: {str(e)}" if batch else str(e))
+            plan.append((op, decode, start, len(pipe)))
+        try:
+            replies = await pipe.execute(raise_on_error=False)
+        finally:
+            # Tracking invalidations arrive asynchronously; drop local copies now for read-your-writes
+            near_cache.invalidate([op.key for op in operations
+                                   if getattr(op, "key", None) and op.operation not in READ_OPERATIONS])
+    
+    results = []
+    for op, decode, start, end in plan:
+        result = {"operation": op.operation, "key": getattr(op, "key", None) or getattr(op, "channel", None)}
+        own = replies[start:end]
+        error = next((reply for reply in own if isinstance(reply, Exception)), None)
+        if error is not None:
+            result["error"] = str(error)
+        else:
+            result.update(decode(own[0]))
+        results.append(result)
+    return results
+
+READ_OPERATIONS = {"get", "exists", "hget", "hgetall", "hmget", "hexists", "hkeys",
+                   "lrange", "llen", "smembers", "scard", "sismember"}
+
+def queue_cache_operation(pipe, op: CacheRequest):
+    """Queue one cache operation on a pipeline; return a function that turns its reply into a result"""
+    if op.operation in ("mget", "mset"):
+        raise ValueError(f"{op.operation} is not allowed inside a batch; use get/set items")
+    if not op.key:
+        raise ValueError("Key required")
+    
+    if op.operation == "get":
+        pipe.get(op.key)
+        return lambda reply: {"value": decode_value(reply), "found": reply is not None}
+    
+    if op.operation == "set":
+        if op.value is None:
+            raise ValueError("Value required for set operation")
+        value = encode_value(op.value, resolve_codec(op.key, op.codec))
+        pipe.set(op.key, value, ex=op.ttl or None, nx=bool(op.nx), xx=bool(op.ex))
+        return lambda reply: {"success": bool(reply)}
+    
+    if op.operation == "delete":
+        pipe.delete(op.key)
+        return lambda reply: {"deleted": reply > 0, "deleted_count": reply}
+    
+    if op.operation == "exists":
+        pipe.exists(op.key)
+        return lambda reply: {"exists": bool(reply)}
+    
+    if op.operation == "expire":
+        if not op.ttl:
+            raise ValueError("TTL required for expire operation")
+        pipe.expire(op.key, op.ttl)
+        return lambda reply: {"success": bool(reply)}
+    
+    raise ValueError(f"Unknown operation: {op.operation}")
+
+def batch_fast_path(operations: List[CacheRequest]) -> Optional[str]:
+    """Return "mget" or "mset" when a whole batch maps onto one multi-key command"""
+    if all(op.operation == "get" and op.key for op in operations):
+        return "mget"
+    if all(op.operation == "set" and op.key and op.value is not None and not op.nx and not op.ex
+           and not op.ttl for op in operations) and len({op.key for op in operations}) == len(operations):
+        return "mset"
+    return None
+
+@app.post("/tools/cache_batch")
+async def cache_batch_tool(request: CacheBatchRequest) -> Dict[str, Any]:
+    """
+    Pipelined cache operations
+    
+    Tool: cache_batch
+    Description: Run many get/set/delete/exists/expire operations in one
+    Redis round trip (optionally MULTI/EXEC) with per-item results
+    """
+    if not redis_pool:
+        raise HTTPException(status_code=503, detail="Redis connection not available")
+    if len(request.operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_OPERATIONS} operations per batch")
+    
+    try:
+        client = redis.Redis(connection_pool=redis_pool)
+        operations = request.operations
+        results = []
+        mode = batch_fast_path(operations) if operations else None
+        
+        if mode == "mget":
+            values = await cached_mget(client, [op.key for op in operations])
+            results = [
+                {"operation": "get", "key": op.key, "value": decode_value(value),
+                 "found": value is not None}
+                for op, value in zip(operations, values)
+            ]
+        
+        elif mode == "mset":
+            try:
+                encoded = {op.key: encode_value(op.value, resolve_codec(op.key, op.codec)) for op in operations}
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            success = await client.mset(encoded)
+            near_cache.invalidate(list(encoded))
+            results = [{"operation": "set", "key": op.key, "success": bool(success)} for op in operations]
+        
+        elif operations:
+            mode = "multi" if request.transaction else "pipeline"
+            results = await execute_operations(client, operations, queue_cache_operation, request.transaction)
+        
+        return {
+            "operation": "cache_batch",
+            "mode": mode,
+            "transaction": request.transaction,
+            "results": results,
+            "operation_count": len(results),
+            "error_count": sum("error" in result for result in results),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Cache batch failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Cache batch failed: {str(e)}")
+
+def queue_expire(pipe, key: str, ttl: Optional[int]):
+    if ttl:
+        pipe.expire(key, ttl)
+
+def queue_hash_operation(pipe, op: HashRequest):
+    """Queue one hash operation; fields are updated individually, never rewritten as a whole"""
+    names = op.field_names or ([op.field] if op.field else [])
+    
+    if op.operation == "hget":
+        if not op.field:
+            raise ValueError("Field required for hget")
+        pipe.hget(op.key, op.field)
+        return lambda reply: {"field": op.field, "value": decode_value(reply), "found": reply is not None}
+    
+    if op.operation == "hset":
+        mapping = dict(op.fields or {})
+        if op.field:
+            if op.value is None:
+                raise ValueError("Value required for hset")
+            mapping[op.field] = op.value
+        if not mapping:
+            raise ValueError("Field and value, or fields, required for hset")
+        codec = resolve_codec(op.key, op.codec)
+        pipe.hset(op.key, mapping={name: encode_value(value, codec) for name, value in mapping.items()})
+        queue_expire(pipe, op.key, op.ttl)
+        return lambda reply: {"fields_added": reply, "fields_written": len(mapping)}
+    
+    if op.operation == "hgetall":
+        pipe.hgetall(op.key)
+        return lambda reply: {"fields": {decode_name(k): decode_value(v) for k, v in reply.items()},
+                              "found": bool(reply)}
+    
+    if op.operation == "hmget":
+        if not names:
+            raise ValueError("field_names required for hmget")
+        pipe.hmget(op.key, names)
+        return lambda reply: {"fields": {name: decode_value(v) for name, v in zip(names, reply)}}
+    
+    if op.operation == "hdel":
+        if not names:
+            raise ValueError("Field or field_names required for hdel")
+        pipe.hdel(op.key, *names)
+        return lambda reply: {"deleted_count": reply}
+    
+    if op.operation == "hexists":
+        if not op.field:
+            raise ValueError("Field required for hexists")
+        pipe.hexists(op.key, op.field)
+        return lambda reply: {"field": op.field, "exists": bool(reply)}
+    
+    if op.operation == "hkeys":
+        pipe.hkeys(op.key)
+        return lambda reply: {"fields": [decode_name(name) for name in reply]}
+    
+    if op.operation == "hincrby":
+        if not op.field:
+            raise ValueError("Field required for hincrby")
+        pipe.hincrby(op.key, op.field, op.amount)
+        queue_expire(pipe, op.key, op.ttl)
+        return lambda reply: {"field": op.field, "value": reply}
+    
+    raise ValueError(f"Unknown operation: {op.operation}")
+
+def queue_list_operation(pipe, op: ListRequest):
+    """Queue one list operation"""
+    if op.operation in ("lpush", "rpush"):
+        if not op.values:
+            raise ValueError(f"Values required for {op.operation}")
+        codec = resolve_codec(op.key, op.codec)
+        getattr(pipe, op.operation)(op.key, *[encode_value(value, codec) for value in op.values])
+        queue_expire(pipe, op.key, op.ttl)
+        return lambda reply: {"length": reply}
+    
+    if op.operation in ("lpop", "rpop"):
+        getattr(pipe, op.operation)(op.key, op.count)
+        if op.count:
+            return lambda reply: {"values": [decode_value(v) for v in reply or []]}
+        return lambda reply: {"value": decode_value(reply), "found": reply is not None}
+    
+    if op.operation == "lrange":
+        pipe.lrange(op.key, op.start, op.end)
+        return lambda reply: {"values": [decode_value(v) for v in reply]}
+    
+    if op.operation == "llen":
+        pipe.llen(op.key)
+        return lambda reply: {"length": reply}
+    
+    if op.operation == "ltrim":
+        pipe.ltrim(op.key, op.start, op.end)
+        return lambda reply: {"success": bool(reply)}
+    
+    raise ValueError(f"Unknown operation: {op.operation}")
+
+def queue_set_operation(pipe, op: SetRequest):
+    """Queue one set operation"""
+    members = list(op.members or []) + ([op.member] if op.member is not None else [])
+    
+    if op.operation in ("sadd", "srem"):
+        if not members:
+            raise ValueError(f"Member or members required for {op.operation}")
+        codec = resolve_codec(op.key, op.codec)
+        getattr(pipe, op.operation)(op.key, *[encode_value(member, codec) for member in members])
+        if op.operation == "sadd":
+            queue_expire(pipe, op.key, op.ttl)
+            return lambda reply: {"added": reply}
+        return lambda reply: {"removed": reply}
+    
+    if op.operation == "smembers":
+        pipe.smembers(op.key)
+        return lambda reply: {"members": [decode_value(member) for member in reply]}
+    
+    if op.operation == "scard":
+        pipe.scard(op.key)
+        return lambda reply: {"count": reply}
+    
+    if op.operation == "sismember":
+        if op.member is None:
+            raise ValueError("Member required for sismember")
+        pipe.sismember(op.key, encode_value(op.member, resolve_codec(op.key, op.codec)))
+        return lambda reply: {"member": op.member, "is_member": bool(reply)}
+    
+    raise ValueError(f"Unknown operation: {op.operation}")
+
+def queue_publish(pipe, op: PubSubRequest):
+    if op.operation != "publish":
+        raise ValueError("Only publish operations can be batched")
+    if op.message is None:
+        raise ValueError("Message required for publish")
+    pipe.publish(op.channel, encode_value(op.message))
+    return lambda reply: {"receivers": reply}
+
+async def run_structure_tool(request, queue, label: str) -> Dict[str, Any]:
+    """Run a single hash/list/set operation as a one-command pipeline"""
+    if not redis_pool:
+        raise HTTPException(status_code=503, detail="Redis connection not available")
+    
+    try:
+        client = redis.Redis(connection_pool=redis_pool)
+        result = (await execute_operations(client, [request], queue, batch=False))[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"{label} operation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"{label} operation failed: {str(e)}")
+    
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=f"{label} operation failed: {result['error']}")
+    result["timestamp"] = datetime.now().isoformat()
+    return result
+
+async def run_structure_batch(request, queue, label: str) -> Dict[str, Any]:
+    """Run many hash/list/set/publish operations in one pipeline"""
+    if not redis_pool:
+        raise HTTPException(status_code=503, detail="Redis connection not available")
+    if len(request.operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_OPERATIONS} operations per batch")
+    
+    transaction = getattr(request, "transaction", False)
+    try:
+        client = redis.Redis(connection_pool=redis_pool)
+        results = await execute_operations(client, request.operations, queue, transaction)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"{label} batch failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"{label} batch failed: {str(e)}")
+    
+    return {
+        "operation": f"{label.lower()}_batch",
+        "transaction": transaction,
+        "results": results,
+        "operation_count": len(results),
+        "error_count": sum("error" in result for result in results),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/tools/hash")
+async def hash_tool(request: HashRequest) -> Dict[str, Any]:
+    """
+    Hash operations
+    
+    Tool: hash
+    Description: Read and write individual fields of Redis hashes
+    """
+    return await run_structure_tool(request, queue_hash_operation, "Hash")
+
+@app.post("/tools/hash_batch")
+async def hash_batch_tool(request: HashBatchRequest) -> Dict[str, Any]:
+    """
+    Pipelined hash operations
+    
+    Tool: hash_batch
+    Description: Many hash operations in one Redis round trip
+    """
+    return await run_structure_batch(request, queue_hash_operation, "Hash")
+
+@app.post("/tools/list")
+async def list_tool(request: ListRequest) -> Dict[str, Any]:
+    """
+    List operations
+    
+    Tool: list
+    Description: Push, pop, range, trim and length of Redis lists
+    """
+    return await run_structure_tool(request, queue_list_operation, "List")
+
+@app.post("/tools/list_batch")
+async def list_batch_tool(request: ListBatchRequest) -> Dict[str, Any]:
+    """
+    Pipelined list operations
+    
+    Tool: list_batch
+    Description: Many list operations in one Redis round trip
+    """
+    return await run_structure_batch(request, queue_list_operation, "List")
+
+@app.post("/tools/set")
+async def set_tool(request: SetRequest) -> Dict[str, Any]:
+    """
+    Set operations
+    
+    Tool: set
+    Description: Add, remove, list and test members of Redis sets
+    """
+    return await run_structure_tool(request, queue_set_operation, "Set")
+
+@app.post("/tools/set_batch")
+async def set_batch_tool(request: SetBatchRequest) -> Dict[str, Any]:
+    """
+    Pipelined set operations
+    
+    Tool: set_batch
+    Description: Many set operations in one Redis round trip
+    """
+    return await run_structure_batch(request, queue_set_operation, "Set")
+
+def pubsub_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "channel": decode_name(message["channel"]),
+        "pattern": decode_name(message["pattern"]) if message.get("pattern") else None,
+        "data": decode_value(message["data"])
+    }
+
+@app.post("/tools/pubsub")
+async def pubsub_tool(request: PubSubRequest) -> Dict[str, Any]:
+    """
+    Pub/Sub operations
+    
+    Tool: pubsub
+    Description: Publish a message, or subscribe and collect messages for up
+    to timeout seconds; GET /tools/pubsub streams messages as SSE
+    """
+    if not redis_pool:
+        raise HTTPException(status_code=503, detail="Redis connection not available")
+    
+    try:
+        client = redis.Redis(connection_pool=redis_pool)
+        
+        if request.operation == "publish":
+            if request.message is None:
+                raise HTTPException(status_code=400, detail="Message required for publish")
+            receivers = await client.publish(request.channel, encode_value(request.message))
+            
+            return {
+                "operation": "publish",
+                "channel": request.channel,
+                "receivers": receivers,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        elif request.operation == "subscribe":
+            timeout = max(0, min(request.timeout or 0, PUBSUB_MAX_TIMEOUT))
+            messages = []
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(request.channel)
+                while (remaining := deadline - loop.time()) > 0:
+                    message = await pubsub.get_message(timeout=remaining)
+                    if message:
+                        messages.append(pubsub_message(message))
+            
+            return {
+                "operation": "subscribe",
+                "channel": request.channel,
+                "messages": messages,
+                "message_count": len(messages),
+                "timeout": timeout,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        elif request.operation == "unsubscribe":
+            raise HTTPException(status_code=400, detail="Subscriptions end with their request; close the GET /tools/pubsub stream to unsubscribe")
+        
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown operation: {request.operation}")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Pub/sub operation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Pub/sub operation failed: {str(e)}")
+
+@app.get("/tools/pubsub")
+async def pubsub_stream(request: Request, channels: Optional[str] = None, patterns: Optional[str] = None):
+    """Stream messages from comma-separated channels and/or glob patterns as Server-Sent Events
+
+    Each message is a 'message' event whose data holds channel, pattern and
+    the decoded payload; comments are sent as keepalives while idle.
+    """
+    if not redis_pool:
+        raise HTTPException(status_code=503, detail="Redis connection not available")
+    channel_list = [c for c in (channels or "").split(",") if c]
+    pattern_list = [p for p in (patterns or "").split(",") if p]
+    if not channel_list and not pattern_list:
+        raise HTTPException(status_code=400, detail="channels or patterns required")
+    
+    client = redis.Redis(connection_pool=redis_pool)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        if channel_list:
+            await pubsub.subscribe(*channel_list)
+        if pattern_list:
+            await pubsub.psubscribe(*pattern_list)
+    except Exception as e:
+        await pubsub.aclose()
+        raise HTTPException(status_code=500, detail=f"Subscribe failed: {str(e)}")
+    
+    async def events():
+        try:
+            yield f"event: subscribed\ndata: {json.dumps({'channels': channel_list, 'patterns': pattern_list})}\n\n"
+            idle = 0.0
+            while not await request.is_disconnected():
+                message = await pubsub.get_message(timeout=1.0)
+                if message:
+                    idle = 0.0
+                    yield f"event: message\ndata: {json.dumps(pubsub_message(message))}\n\n"
+                else:
+                    idle += 1.0
+                    if idle >= PUBSUB_HEARTBEAT:
+                        idle = 0.0
+                        yield ": keepalive\n\n"
+        finally:
+            await pubsub.aclose()
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/tools/pubsub_batch")
+async def pubsub_batch_tool(request: PubSubBatchRequest) -> Dict[str, Any]:
+    """
+    Pipelined publish
+    
+    Tool: pubsub_batch
+    Description: Publish many messages in one Redis round trip
+    """
+    return await run_structure_batch(request, queue_publish, "Pubsub")
+
+def encode_page_token(token: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Opaque, URL-safe pagination cursor; None once the listing is complete"""
+    if token is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(token).encode("utf-8")).decode("ascii")
+
+def decode_page_token(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not cursor:
+        return None
+    try:
+        token = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception as e:
+        raise ValueError(str(e))
+    if not isinstance(token, dict):
+        raise ValueError("Cursor is not an object")
+    return token
+
+# Merge fields into a session and bump its access time, TTL and index entry in one
+# atomic step. KEYS: session key, index key. ARGV: ttl, ISO time, score, session id,
+# then field/value pairs. Returns the full hash, nil if the session is gone, or
+# 'legacy' for a session still stored as a JSON string by an older release.
+SESSION_TOUCH_SCRIPT = """
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind == 'none' then
+    return false
+end
+if kind == 'string' then
+    return 'legacy'
+end
+if #ARGV > 4 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 5))
+end
+redis.call('HSET', KEYS[1], 'last_accessed', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+def session_fields(data: Dict[str, Any]) -> Dict[str, str]:
+    """Hash fields holding session data, one JSON value per top-level key"""
+    return {f"{SESSION_DATA_PREFIX}{name}": encode_value(value) for name, value in data.items()}
+
+def session_from_hash(fields) -> Dict[str, Any]:
+    """Rebuild the session_info document from a session hash (a dict or flat HGETALL list)"""
+    if isinstance(fields, list):
+        fields = dict(zip(fields[::2], fields[1::2]))
+    session_info = {"id": None, "data": {}, "created_at": None, "last_accessed": None}
+    for name, value in fields.items():
+        name = decode_name(name)
+        if name.startswith(SESSION_DATA_PREFIX):
+            session_info["data"][name[len(SESSION_DATA_PREFIX):]] = decode_value(value)
+        elif name in session_info:
+            session_info[name] = decode_name(value)
+    return session_info
+
+def legacy_session_fields(raw: Union[str, bytes], session_id: str) -> Dict[str, str]:
+    """Hash fields for a session stored as one JSON document by older releases
+
+    Parsed in Python rather than Lua, whose cjson turns large integers into
+    floats and empty arrays into objects; each data value is re-encoded the
+    way the old document encoded it.
+    """
+    info = json.loads(raw)
+    fields = {"id": info.get("id") or session_id, "created_at": info.get("created_at") or datetime.now().isoformat()}
+    if info.get("last_accessed"):
+        fields["last_accessed"] = info["last_accessed"]
+    if isinstance(info.get("data"), dict):
+        fields.update(session_fields(info["data"]))
+    return fields
+
+async def convert_legacy_session(client: redis.Redis, session_id: str):
+    """Rewrite a JSON string session as a hash, keeping its TTL
+
+    WATCH makes this a no-op if the key changes meanwhile; the caller's next
+    touch then sees whatever replaced it.
+    """
+    key = f"{SESSION_PREFIX}{session_id}"
+    async with client.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(key)
+            if decode_name(await pipe.type(key)) != "string":
+                return
+            fields = legacy_session_fields(await pipe.get(key), session_id)
+            ttl = await pipe.pttl(key)
+            pipe.multi()
+            pipe.delete(key)
+            pipe.hset(key, mapping=fields)
+            if ttl > 0:
+                pipe.pexpire(key, ttl)
+            await pipe.execute()
+        except redis.WatchError:
+            pass
+
+async def touch_session(client: redis.Redis, session_id: str, ttl: int,
+                        data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Atomically merge data into a session and refresh its access time; None if it does not exist"""
+    args = [ttl, datetime.now().isoformat(), time.time(), session_id]
+    for name, value in session_fields(data or {}).items():
+        args += [name, value]
+    script = client.register_script(SESSION_TOUCH_SCRIPT)
+    for _ in range(3):
+        fields = await script(keys=[f"{SESSION_PREFIX}{session_id}", SESSION_INDEX_KEY], args=args)
+        if decode_name(fields) != "legacy":
+            return session_from_hash(fields) if fields else None
+        await convert_legacy_session(client, session_id)
+    raise RuntimeError(f"Session {session_id} keeps being rewritten in the legacy format")
+
+async def fetch_session_summaries(client: redis.Redis, session_ids: List[str]) -> tuple:
+    """Summaries of the sessions that still exist, plus the ids whose keys have expired
+
+    Only the metadata fields are read, with one HMGET per session in a single
+    pipeline. Sessions still stored as JSON strings are skipped until their
+    next touch converts them.
+    """
+    if not session_ids:
+        return [], []
+    async with client.pipeline(transaction=False) as pipe:
+        for session_id in session_ids:
+            pipe.hmget(f"{SESSION_PREFIX}{session_id}", ["id", "created_at", "last_accessed"])
+        replies = await pipe.execute(raise_on_error=False)
+    
+    sessions, missing = [], []
+    for session_id, reply in zip(session_ids, replies):
+        if isinstance(reply, Exception):
+            continue
+        if all(value is None for value in reply):
+            missing.append(session_id)
+            continue
+        sid, created_at, last_accessed = (decode_name(value) if value is not None else None for value in reply)
+        sessions.append({
+            "session_id": sid or session_id,
+            "created_at": created_at,
+            "last_accessed": last_accessed
+        })
+    return sessions, missing
+
+async def list_recent_sessions(client: redis.Redis, limit: int, token: Optional[Dict[str, Any]]) -> tuple:
+    """Page through the last-access index, newest first, in O(log N + limit)
+
+    The cursor holds the last score returned and how many members with that
+    score were already returned, so pages resume exactly without rank offsets.
+    """
+    max_score = token["score"] if token else "+inf"
+    skip = token["skip"] if token else 0
+    entries = await client.zrevrangebyscore(SESSION_INDEX_KEY, max_score, "-inf", start=skip, num=limit,
+                                            withscores=True)
+    session_ids = [member.decode() if isinstance(member, bytes) else member for member, _ in entries]
+    sessions, missing = await fetch_session_summaries(client, session_ids)
+    if missing:
+        # Sessions expire by TTL; drop their index entries lazily
+        await client.zrem(SESSION_INDEX_KEY, *missing)
+    
+    next_token = None
+    if len(entries) == limit:
+        # Pruned entries have left the index, so they must not count towards the skip
+        pruned = set(missing)
+        last_score = entries[-1][1]
+        same_score = sum(1 for session_id, (_, score) in zip(session_ids, entries)
+                         if score == last_score and session_id not in pruned)
+        next_token = {"score": last_score, "skip": same_score + (skip if last_score == max_score else 0)}
+    return sessions, next_token
+
+async def scan_sessions(client: redis.Redis, limit: int, token: Optional[Dict[str, Any]]) -> tuple:
+    """Walk session keys with SCAN MATCH/COUNT and fetch their metadata in one pipeline
+
+    A page may hold slightly more than limit sessions, since a SCAN reply is
+    never split across pages.
+    """
+    cursor = token["scan"] if token else 0
+    keys: List[bytes] = []
+    while True:
+        cursor, batch = await client.scan(cursor=cursor, match=f"{SESSION_PREFIX}*", count=SESSION_SCAN_COUNT)
+        keys += batch
+        if cursor == 0 or len(keys) >= limit:
+            break
+    session_ids = [decode_name(key)[len(SESSION_PREFIX):] for key in keys]
+    sessions, _ = await fetch_session_summaries(client, session_ids)
+    return sessions, ({"scan": cursor} if cursor != 0 else None)
+
+@app.post("/tools/session")
 async def session_tool(request: SessionRequest) -> Dict[str, Any]:
-    \"\"\"
+    """
     Session management
     
     Tool: session
     Description: Create, get, update, delete user sessions with TTL
-    \"\"\"
+
+    Sessions are hashes with one field per data key; get and update are a
+    single atomic script call, so concurrent updates to different keys merge.
+    """
     if not redis_pool:
-        raise HTTPException(status_code=503, detail=\"Redis connection not available\")
+        raise HTTPException(status_code=503, detail="Redis connection not available")
     
     try:
         client = redis.Redis(connection_pool=redis_pool)
-        session_prefix = \"session:\"
+        session_prefix = SESSION_PREFIX
         
-        if request.operation == \"create\":
+        if request.operation == "create":
             if not request.session_data:
-                raise HTTPException(status_code=400, detail=\"Session data required\")
+                raise HTTPException(status_code=400, detail="Session data required")
             
-            session_id = request.session_id or f\"sess_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}\"
-            session_key = f\"{session_prefix}{session_id}\"
+            session_id = request.session_id or f"sess_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+            session_key = f"{session_prefix}{session_id}"
             
-            session_info = {
-                \"id\": session_id,
-                \"data\": request.session_data,
-                \"created_at\": datetime.now().isoformat(),
-                \"last_accessed\": datetime.now().isoformat()
-            }
+            now = datetime.now().isoformat()
+            fields = {"id": session_id, "created_at": now, "last_accessed": now}
+            fields.update(session_fields(request.session_data))
             
-            await client.setex(session_key, request.ttl, json.dumps(session_info))
+            # Replaces any existing session with the same id
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(session_key)
+                pipe.hset(session_key, mapping=fields)
+                pipe.expire(session_key, request.ttl)
+                pipe.zadd(SESSION_INDEX_KEY, {session_id: time.time()})
+                await pipe.execute()
             
             return {
-                \"operation\": \"create\",
-                \"session_id\": session_id,
-                \"session_data\": request.session_data,
-                \"ttl\": request.ttl,
-                \"expires_at\": (datetime.now() + timedelta(seconds=request.ttl)).isoformat(),
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "create",
+                "session_id": session_id,
+                "session_data": request.session_data,
+                "ttl": request.ttl,
+                "expires_at": (datetime.now() + timedelta(seconds=request.ttl)).isoformat(),
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"get\":
+        elif request.operation == "get":
             if not request.session_id:
-                raise HTTPException(status_code=400, detail=\"Session ID required\")
+                raise HTTPException(status_code=400, detail="Session ID required")
             
-            session_key = f\"{session_prefix}{request.session_id}\"
-            session_data = await client.get(session_key)
+            session_info = await touch_session(client, request.session_id, request.ttl)
             
-            if not session_data:
+            if session_info is None:
                 return {
-                    \"operation\": \"get\",
-                    \"session_id\": request.session_id,
-                    \"found\": False,
-                    \"timestamp\": datetime.now().isoformat()
+                    "operation": "get",
+                    "session_id": request.session_id,
+                    "found": False,
+                    "timestamp": datetime.now().isoformat()
                 }
             
-            session_info = json.loads(session_data)
-            # Update last_accessed
-            session_info[\"last_accessed\"] = datetime.now().isoformat()
-            await client.setex(session_key, request.ttl, json.dumps(session_info))
-            
             return {
-                \"operation\": \"get\",
-                \"session_id\": request.session_id,
-                \"session_info\": session_info,
-                \"found\": True,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "get",
+                "session_id": request.session_id,
+                "session_info": session_info,
+                "found": True,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"update\":
+        elif request.operation == "update":
             if not request.session_id or not request.session_data:
-                raise HTTPException(status_code=400, detail=\"Session ID and data required\")
-            
-            session_key = f\"{session_prefix}{request.session_id}\"
-            existing_data = await client.get(session_key)
-            
-            if not existing_data:
-                raise HTTPException(status_code=404, detail=\"Session not found\")
+                raise HTTPException(status_code=400, detail="Session ID and data required")
             
-            session_info = json.loads(existing_data)
-            session_info[\"data\"].update(request.session_data)\n            session_info[\"last_accessed\"] = datetime.now().isoformat()
+            session_info = await touch_session(client, request.session_id, request.ttl, request.session_data)
             
-            await client.setex(session_key, request.ttl, json.dumps(session_info))
+            if session_info is None:
+                raise HTTPException(status_code=404, detail="Session not found")
             
             return {
-                \"operation\": \"update\",
-                \"session_id\": request.session_id,
-                \"updated_data\": request.session_data,
-                \"session_info\": session_info,
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "update",
+                "session_id": request.session_id,
+                "updated_data": request.session_data,
+                "session_info": session_info,
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"delete\":
+        elif request.operation == "delete":
             if not request.session_id:
-                raise HTTPException(status_code=400, detail=\"Session ID required\")
+                raise HTTPException(status_code=400, detail="Session ID required")
             
-            session_key = f\"{session_prefix}{request.session_id}\"
-            deleted = await client.delete(session_key)
+            session_key = f"{session_prefix}{request.session_id}"
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.delete(session_key)
+                pipe.zrem(SESSION_INDEX_KEY, request.session_id)
+                deleted, _ = await pipe.execute()
             
             return {
-                \"operation\": \"delete\",
-                \"session_id\": request.session_id,
-                \"deleted\": bool(deleted),
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "delete",
+                "session_id": request.session_id,
+                "deleted": bool(deleted),
+                "timestamp": datetime.now().isoformat()
             }
             
-        elif request.operation == \"list\":
-            # List all sessions (be careful with large datasets)
-            pattern = f\"{session_prefix}*\"
-            keys = await client.keys(pattern)
-            
-            sessions = []
-            for key in keys[:100]:  # Limit to first 100
-                session_data = await client.get(key)
-                if session_data:
-                    session_info = json.loads(session_data)
-                    sessions.append({
-                        \"session_id\": session_info.get(\"id\"),
-                        \"created_at\": session_info.get(\"created_at\"),
-                        \"last_accessed\": session_info.get(\"last_accessed\")
-                    })
+        elif request.operation == "list":
+            if request.order not in ("recent", "scan"):
+                raise HTTPException(status_code=400, detail="order must be recent or scan")
+            try:
+                token = decode_page_token(request.cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            limit = max(1, min(request.limit, 1000))
+            
+            if request.order == "recent":
+                sessions, next_token = await list_recent_sessions(client, limit, token)
+            else:
+                sessions, next_token = await scan_sessions(client, limit, token)
             
             return {
-                \"operation\": \"list\",
-                \"sessions\": sessions,
-                \"session_count\": len(sessions),
-                \"total_keys\": len(keys),
-                \"timestamp\": datetime.now().isoformat()
+                "operation": "list",
+                "order": request.order,
+                "sessions": sessions,
+                "session_count": len(sessions),
+                "total_indexed": await client.zcard(SESSION_INDEX_KEY),
+                "next_cursor": encode_page_token(next_token),
+                "timestamp": datetime.now().isoformat()
             }
         
         else:
-            raise HTTPException(status_code=400, detail=f\"Unknown operation: {request.operation}\")
+            raise HTTPException(status_code=400, detail=f"Unknown operation: {request.operation}")
         
         await client.aclose()
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f\"Session operation failed: {str(e)}\")
-        raise HTTPException(status_code=500, detail=f\"Session operation failed: {str(e)}\")
+        logger.error(f"Session operation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Session operation failed: {str(e)}")
 
-@app.get(\"/tools/list\")
+@app.get("/tools/list")
 async def list_tools():
-    \"\"\"List all available MCP tools\"\"\"
+    """List all available MCP tools"""
     return {
-        \"tools\": [
+        "tools": [
+            {
+                "name": "cache",
+                "description": "Key-value cache operations with TTL support",
+                "parameters": {
+                    "operation": "string (required: get|set|delete|exists|expire|mget|mset)",
+                    "key": "string (required except for mget/mset, cache key)",
+                    "value": "any (optional, value to store)",
+                    "ttl": "integer (optional, time to live in seconds)",
+                    "nx": "boolean (optional, only set if key doesn't exist)",
+                    "ex": "boolean (optional, only set if key exists)",
+                    "keys": "array (optional, keys for mget)",
+                    "values": "object (optional, key to value mapping for mset)",
+                    "codec": "string (optional: json|msgpack|msgpack+zstd|msgpack+lz4; default per keyspace)"
+                }
+            },
+            {
+                "name": "cache_batch",
+                "description": "Many cache operations in one pipelined Redis round trip, with per-item results",
+                "parameters": {
+                    "operations": "array (required, cache operations: get|set|delete|exists|expire items)",
+                    "transaction": "boolean (optional, execute atomically in MULTI/EXEC, default false)"
+                }
+            },
+            {
+                "name": "hash",
+                "description": "Redis hash field operations (POST /tools/hash; /tools/hash_batch takes {operations, transaction})",
+                "parameters": {
+                    "operation": "string (required: hget|hset|hgetall|hmget|hdel|hexists|hkeys|hincrby)",
+                    "key": "string (required, hash key)",
+                    "field": "string (optional, field name)",
+                    "value": "any (optional, field value for hset)",
+                    "fields": "object (optional, field to value mapping for hset)",
+                    "field_names": "array (optional, fields for hmget/hdel)",
+                    "amount": "integer (optional, hincrby increment, default 1)",
+                    "ttl": "integer (optional, expire the key after a write)",
+                    "codec": "string (optional: json|msgpack|msgpack+zstd|msgpack+lz4; default per keyspace)"
+                }
+            },
+            {
+                "name": "list",
+                "description": "Redis list operations (POST /tools/list; /tools/list_batch takes {operations, transaction})",
+                "parameters": {
+                    "operation": "string (required: lpush|rpush|lpop|rpop|lrange|llen|ltrim)",
+                    "key": "string (required, list key)",
+                    "values": "array (optional, values to push)",
+                    "start": "integer (optional, range/trim start, default 0)",
+                    "end": "integer (optional, range/trim end, default -1)",
+                    "count": "integer (optional, values to pop)",
+                    "ttl": "integer (optional, expire the key after a write)",
+                    "codec": "string (optional: json|msgpack|msgpack+zstd|msgpack+lz4; default per keyspace)"
+                }
+            },
+            {
+                "name": "set",
+                "description": "Redis set operations (POST /tools/set; /tools/set_batch takes {operations, transaction})",
+                "parameters": {
+                    "operation": "string (required: sadd|srem|smembers|scard|sismember)",
+                    "key": "string (required, set key)",
+                    "members": "array (optional, members to add/remove)",
+                    "member": "any (optional, single member)",
+                    "ttl": "integer (optional, expire the key after a write)",
+                    "codec": "string (optional: json|msgpack|msgpack+zstd|msgpack+lz4; default per keyspace)"
+                }
+            },
             {
-                \"name\": \"cache\",
-                \"description\": \"Key-value cache operations with TTL support\",
-                \"parameters\": {
-                    \"operation\": \"string (required: get|set|delete|exists|expire)\",
-                    \"key\": \"string (required, cache key)\",
-                    \"value\": \"any (optional, value to store)\",
-                    \"ttl\": \"integer (optional, time to live in seconds)\",
-                    \"nx\": \"boolean (optional, only set if key doesn't exist)\",
-                    \"ex\": \"boolean (optional, only set if key exists)\"
+                "name": "pubsub",
+                "description": "Publish, or subscribe for a bounded time (POST /tools/pubsub); stream as SSE with GET /tools/pubsub?channels=&patterns=; /tools/pubsub_batch publishes many",
+                "parameters": {
+                    "operation": "string (required: publish|subscribe)",
+                    "channel": "string (required, channel name)",
+                    "message": "any (optional, message to publish)",
+                    "timeout": f"integer (optional, seconds to collect messages for subscribe, max {PUBSUB_MAX_TIMEOUT})"
                 }
             },
             {
-                \"name\": \"session\",
-                \"description\": \"User session management with automatic TTL\",
-                \"parameters\": {
-                    \"operation\": \"string (required: create|get|update|delete|list)\",
-                    \"session_id\": \"string (optional, session identifier)\",
-                    \"session_data\": \"object (optional, session data)\",
-                    \"ttl\": \"integer (optional, session timeout in seconds, default 3600)\"
+                "name": "session",
+                "description": "User session management with automatic TTL; update merges top-level data keys atomically",
+                "parameters": {
+                    "operation": "string (required: create|get|update|delete|list)",
+                    "session_id": "string (optional, session identifier)",
+                    "session_data": "object (optional, session data; for update, the keys to merge)",
+                    "ttl": "integer (optional, session timeout in seconds, default 3600)",
+                    "limit": "integer (optional, sessions per list page, default 100, max 1000)",
+                    "order": "string (optional for list: recent|scan, default recent)",
+                    "cursor": "string (optional, next_cursor from the previous list page)"
                 }
             }
         ]
     }
 
-if __name__ == \"__main__\":
+if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=\"0.0.0.0\", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
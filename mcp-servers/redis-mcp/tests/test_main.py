@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Redis MCP Service Tests
+"""
+import asyncio
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+# Import the main app
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+from main import (
+    app, CacheRequest, HashRequest, ListRequest, SetRequest, batch_fast_path, decode_page_token,
+    encode_page_token, queue_hash_operation, queue_list_operation, queue_set_operation,
+    session_fields, session_from_hash, decode_value, encode_value, parse_codec_rules, resolve_codec,
+    NearCache, SESSION_INDEX_KEY, legacy_session_fields, list_recent_sessions, pubsub_message
+)
+
+client = TestClient(app)
+
+class TestRedisMCPHealth:
+    """Test health and basic functionality"""
+
+    def test_tools_list_endpoint(self):
+        """Test tools listing"""
+        response = client.get("/tools/list")
+        assert response.status_code == 200
+
+        tool_names = [tool["name"] for tool in response.json()["tools"]]
+        for tool in ["cache", "cache_batch", "hash", "list", "set", "pubsub", "session"]:
+            assert tool in tool_names
+
+class TestCacheBatch:
+    """Test batch planning"""
+
+    def test_all_gets_use_mget(self):
+        """Test that a batch of plain gets becomes one MGET"""
+        operations = [CacheRequest(operation="get", key=f"k{i}") for i in range(3)]
+        assert batch_fast_path(operations) == "mget"
+
+    def test_plain_sets_use_mset(self):
+        """Test that a batch of unconditional sets without TTL becomes one MSET"""
+        operations = [CacheRequest(operation="set", key=f"k{i}", value=i) for i in range(3)]
+        assert batch_fast_path(operations) == "mset"
+
+    def test_conditional_or_mixed_batches_pipeline(self):
+        """Test that TTLs, NX, duplicates and mixed operations take the pipeline"""
+        assert batch_fast_path([CacheRequest(operation="set", key="a", value=1, ttl=10)]) is None
+        assert batch_fast_path([CacheRequest(operation="set", key="a", value=1, nx=True)]) is None
+        assert batch_fast_path([CacheRequest(operation="set", key="a", value=1),
+                                CacheRequest(operation="set", key="a", value=2)]) is None
+        assert batch_fast_path([CacheRequest(operation="get", key="a"),
+                                CacheRequest(operation="delete", key="a")]) is None
+
+class TestSessionPagination:
+    """Test session list cursors"""
+
+    def test_cursor_round_trip(self):
+        """Test that a page token survives encoding"""
+        token = {"score": 1723800000.123456, "skip": 3}
+        assert decode_page_token(encode_page_token(token)) == token
+
+    def test_end_of_listing(self):
+        """Test that a finished listing has no cursor"""
+        assert encode_page_token(None) is None
+        assert decode_page_token(None) is None
+
+    def test_invalid_cursor(self):
+        """Test that garbage cursors are rejected"""
+        with pytest.raises(ValueError):
+            decode_page_token("not-a-cursor")
+
+class FakeSessionIndex:
+    """Sorted-set index and session hashes, enough for list_recent_sessions"""
+
+    def __init__(self, index, live):
+        self.index = dict(index)
+        self.live = set(live)
+
+    async def zrevrangebyscore(self, key, max_score, min_score, start, num, withscores):
+        ceiling = float("inf") if max_score == "+inf" else max_score
+        ranked = sorted(((member, score) for member, score in self.index.items() if score <= ceiling),
+                        key=lambda entry: (entry[1], entry[0]), reverse=True)
+        return [(member.encode(), score) for member, score in ranked[start:start + num]]
+
+    async def zrem(self, key, *members):
+        for member in members:
+            self.index.pop(member, None)
+
+    def pipeline(self, transaction=False):
+        index = self
+
+        class Pipeline:
+            def __init__(self):
+                self.keys = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def hmget(self, key, fields):
+                self.keys.append(key)
+
+            async def execute(self, raise_on_error=True):
+                session_ids = [key.split(":", 1)[1] for key in self.keys]
+                return [[session_id.encode(), b"t0", b"t1"] if session_id in index.live else [None] * 3
+                        for session_id in session_ids]
+
+        return Pipeline()
+
+class TestRecentSessions:
+    """Test paging the last-access index"""
+
+    def list_all(self, fake, limit):
+        async def run():
+            seen, token = [], None
+            while True:
+                sessions, token = await list_recent_sessions(fake, limit, token)
+                seen += [session["session_id"] for session in sessions]
+                if token is None:
+                    return seen
+        return asyncio.run(run())
+
+    def test_pages_cover_tied_scores(self):
+        """Test that members sharing a score are paged without gaps or repeats"""
+        live = [f"s{i}" for i in range(5)] + ["t"]
+        fake = FakeSessionIndex({**{f"s{i}": 100.0 for i in range(5)}, "t": 90.0}, live=live)
+        assert self.list_all(fake, 2) == ["s4", "s3", "s2", "s1", "s0", "t"]
+
+    def test_pruned_entries_do_not_shift_the_cursor(self):
+        """Test that expired sessions removed from a page are not counted in the next page's skip"""
+        live = [f"s{i}" for i in range(5)]
+        fake = FakeSessionIndex({name: 100.0 for name in live + ["zz1", "zz2"]}, live=live)
+        assert sorted(self.list_all(fake, 2)) == live
+        assert set(fake.index) == set(live)
+
+class TestSessionHashes:
+    """Test the session hash layout"""
+
+    def test_data_keys_are_separate_fields(self):
+        """Test that each top-level data key is its own JSON field"""
+        assert session_fields({"a": 1, "b": {"c": [2]}}) == {"data:a": "1", "data:b": '{"c": [2]}'}
+
+    def test_legacy_session_conversion(self):
+        """Test that a JSON string session converts without changing any data value"""
+        data = {"big": 12345678901234567890, "empty": [], "obj": {}, "f": 0.1, "s": "x"}
+        raw = json.dumps({"id": "s1", "created_at": "t0", "last_accessed": "t1", "data": data}).encode()
+        fields = legacy_session_fields(raw, "s1")
+        assert fields == {"id": "s1", "created_at": "t0", "last_accessed": "t1", "data:big": "12345678901234567890",
+                          "data:empty": "[]", "data:obj": "{}", "data:f": "0.1", "data:s": '"x"'}
+        assert session_from_hash({name.encode(): value.encode() for name, value in fields.items()})["data"] == data
+
+    def test_legacy_session_without_metadata(self):
+        """Test that a legacy document missing its id falls back to the key's session id"""
+        fields = legacy_session_fields('{"data": {"a": 1}}', "s2")
+        assert fields["id"] == "s2" and fields["data:a"] == "1" and "last_accessed" not in fields
+
+    def test_round_trip_from_hgetall(self):
+        """Test rebuilding a session from a flat script reply"""
+        reply = [b"id", b"s1", b"created_at", b"t0", b"last_accessed", b"t1", b"data:a", b"1", b"data:b", b'"x"']
+        assert session_from_hash(reply) == {
+            "id": "s1", "data": {"a": 1, "b": "x"}, "created_at": "t0", "last_accessed": "t1"
+        }
+
+class TestValueCodecs:
+    """Test self-describing value encodings"""
+
+    def test_json_is_stored_without_header(self):
+        """Test that JSON values stay plain JSON for other clients"""
+        assert encode_value({"a": 1}) == '{"a": 1}'
+        assert decode_value(b'{"a": 1}') == {"a": 1}
+
+    @pytest.mark.parametrize("codec", ["msgpack", "msgpack+zstd", "msgpack+lz4"])
+    def test_binary_round_trip(self, codec):
+        """Test that every codec decodes without being told which codec wrote the value"""
+        pytest.importorskip("msgpack")
+        if codec == "msgpack+zstd":
+            pytest.importorskip("zstandard")
+        if codec == "msgpack+lz4":
+            pytest.importorskip("lz4")
+        for value in [{"small": True}, {"rows": [{"id": i, "name": "item"} for i in range(500)]}]:
+            encoded = encode_value(value, codec)
+            assert encoded[:1] in (b"\x01", b"\x02", b"\x03")
+            assert decode_value(encoded) == value
+
+    def test_codec_rules(self):
+        """Test keyspace rules and that an explicit codec wins"""
+        rules = parse_codec_rules("blob:*=msgpack+zstd, cache:*=json")
+        assert rules == [("blob:*", "msgpack+zstd"), ("cache:*", "json")]
+        assert resolve_codec("anything", "json") == "json"
+        with pytest.raises(ValueError):
+            resolve_codec("anything", "xml")
+        with pytest.raises(ValueError):
+            parse_codec_rules("blob:*=gzip")
+
+class TestNearCache:
+    """Test the tracking-invalidated in-process cache"""
+
+    def make_cache(self, **kwargs):
+        cache = NearCache(**{"max_entries": 10, "max_bytes": 1024, "ttl": 60, "prefixes": [], **kwargs})
+        cache.connected = True
+        return cache
+
+    def fill(self, cache, key, raw):
+        cache.finish(cache.begin([key]), {key: raw})
+
+    def test_hit_after_fetch(self):
+        """Test that a fetched value is served locally until invalidated"""
+        cache = self.make_cache()
+        assert cache.lookup("a") is None
+        self.fill(cache, "a", b"1")
+        assert cache.lookup("a") == b"1"
+        cache.invalidate([b"a"])
+        assert cache.lookup("a") is None
+        assert cache.stats()["hits"] == 1
+
+    def test_read_overlapping_invalidation_is_not_stored(self):
+        """Test that a reply which may predate a write is dropped"""
+        cache = self.make_cache()
+        token = cache.begin(["a"])
+        cache.invalidate(["a"])
+        cache.finish(token, {"a": b"old"})
+        assert cache.lookup("a") is None
+        self.fill(cache, "a", b"new")
+        assert cache.lookup("a") == b"new"
+
+    def test_flush_drops_everything(self):
+        """Test that a nil invalidation (FLUSHALL) clears the cache and in-flight reads"""
+        cache = self.make_cache()
+        self.fill(cache, "a", b"1")
+        token = cache.begin(["b"])
+        cache.invalidate(None)
+        cache.finish(token, {"b": b"2"})
+        assert cache.lookup("a") is None and cache.lookup("b") is None
+
+    def test_size_bounds(self):
+        """Test LRU eviction by entry count and by bytes"""
+        cache = self.make_cache(max_entries=2, max_bytes=10)
+        self.fill(cache, "a", b"1")
+        self.fill(cache, "b", b"2")
+        cache.lookup("a")
+        self.fill(cache, "c", b"3")
+        assert cache.lookup("b") is None and cache.lookup("a") == b"1"
+        self.fill(cache, "d", b"x" * 10)
+        assert cache.stats()["bytes"] <= 10
+        assert cache.stats()["evictions"] >= 2
+
+    def test_untracked_or_disconnected_keys_bypass(self):
+        """Test that keys outside the tracked prefixes, or any key while disconnected, are never cached"""
+        cache = self.make_cache(prefixes=["hot:"])
+        self.fill(cache, "cold:a", b"1")
+        assert cache.lookup("cold:a") is None
+        self.fill(cache, "hot:a", b"1")
+        cache.connected = False
+        assert cache.lookup("hot:a") is None
+
+class RecordingPipeline:
+    """Records queued commands instead of sending them"""
+
+    def __init__(self):
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+class TestDataStructures:
+    """Test hash, list and set command planning"""
+
+    def test_hset_writes_only_given_fields(self):
+        """Test that a field update is a single HSET plus optional EXPIRE"""
+        pipe = RecordingPipeline()
+        decode = queue_hash_operation(pipe, HashRequest(operation="hset", key="h", field="a", value={"x": 1}, ttl=60))
+        assert pipe.commands == [("hset", ("h",), {"mapping": {"a": '{"x": 1}'}}), ("expire", ("h", 60), {})]
+        assert decode(1) == {"fields_added": 1, "fields_written": 1}
+
+    def test_hgetall_decodes_values(self):
+        """Test that hash fields are decoded from JSON"""
+        decode = queue_hash_operation(RecordingPipeline(), HashRequest(operation="hgetall", key="h"))
+        assert decode({b"a": b"1", b"b": b"plain"}) == {"fields": {"a": 1, "b": "plain"}, "found": True}
+
+    def test_list_pop_with_count(self):
+        """Test that popping several values returns a list"""
+        decode = queue_list_operation(RecordingPipeline(), ListRequest(operation="lpop", key="l", count=2))
+        assert decode([b'"a"', b"2"]) == {"values": ["a", 2]}
+        assert decode(None) == {"values": []}
+
+    def test_set_members_are_encoded(self):
+        """Test that members are stored in the same encoding they are tested with"""
+        pipe = RecordingPipeline()
+        queue_set_operation(pipe, SetRequest(operation="sismember", key="s", member="a"))
+        assert pipe.commands == [("sismember", ("s", '"a"'), {})]
+
+    def test_invalid_operations(self):
+        """Test that missing arguments and unknown operations are rejected"""
+        with pytest.raises(ValueError):
+            queue_hash_operation(RecordingPipeline(), HashRequest(operation="hget", key="h"))
+        with pytest.raises(ValueError):
+            queue_list_operation(RecordingPipeline(), ListRequest(operation="lpush", key="l"))
+        with pytest.raises(ValueError):
+            queue_set_operation(RecordingPipeline(), SetRequest(operation="spop", key="s"))
+
+    def test_decode_value(self):
+        """Test decoding of missing, JSON and foreign values"""
+        assert decode_value(None) is None
+        assert decode_value(b'{"a": 1}') == {"a": 1}
+        assert decode_value(b"not json") == "not json"
+
+class FakePubSub:
+    """Replays queued messages to get_message, then reports no message after waiting out the timeout"""
+
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+        self.subscribed = []
+        self.psubscribed = []
+        self.timeouts = []
+        self.closed = False
+
+    async def subscribe(self, *channels):
+        self.subscribed += channels
+
+    async def psubscribe(self, *patterns):
+        self.psubscribed += patterns
+
+    async def get_message(self, timeout=None):
+        self.timeouts.append(timeout)
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(min(timeout, 0.05))
+        return None
+
+    async def aclose(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+class TestPubSub:
+    """Test subscribe collection and the SSE stream against a fake pubsub"""
+
+    MESSAGE = {"type": "message", "pattern": None, "channel": b"news", "data": b'{"n": 1}'}
+
+    @pytest.fixture
+    def pubsub(self, monkeypatch):
+        fake = FakePubSub()
+        monkeypatch.setattr(main, "redis_pool", object())
+        monkeypatch.setattr(main.redis, "Redis",
+                            lambda connection_pool: type("FakeClient", (), {"pubsub": lambda self, **kwargs: fake})())
+        return fake
+
+    def test_pubsub_message(self):
+        """Test that channel, pattern and payload are decoded"""
+        assert pubsub_message(self.MESSAGE) == {"channel": "news", "pattern": None, "data": {"n": 1}}
+        patterned = {**self.MESSAGE, "type": "pmessage", "pattern": b"n*", "data": b"plain text"}
+        assert pubsub_message(patterned) == {"channel": "news", "pattern": "n*", "data": "plain text"}
+
+    def test_subscribe_is_bounded_by_the_deadline(self, pubsub, monkeypatch):
+        """Test that subscribe collects until a deadline capped at PUBSUB_MAX_TIMEOUT, and no later"""
+        monkeypatch.setattr(main, "PUBSUB_MAX_TIMEOUT", 1)
+        pubsub.messages = [self.MESSAGE]
+        started = time.monotonic()
+        response = client.post("/tools/pubsub", json={"operation": "subscribe", "channel": "news", "timeout": 30})
+        elapsed = time.monotonic() - started
+        assert response.status_code == 200
+        assert response.json()["timeout"] == 1
+        assert response.json()["messages"] == [{"channel": "news", "pattern": None, "data": {"n": 1}}]
+        assert 1 <= elapsed < 5
+        # Each wait asks only for what is left before the deadline
+        assert all(0 < timeout <= 1 for timeout in pubsub.timeouts)
+        assert pubsub.timeouts == sorted(pubsub.timeouts, reverse=True)
+        assert pubsub.subscribed == ["news"] and pubsub.closed
+
+    def test_subscribe_without_timeout_returns_at_once(self, pubsub):
+        """Test that a zero timeout never waits for messages"""
+        response = client.post("/tools/pubsub", json={"operation": "subscribe", "channel": "news", "timeout": 0})
+        assert response.status_code == 200
+        assert response.json()["message_count"] == 0
+        assert pubsub.timeouts == [] and pubsub.closed
+
+    def stream(self, disconnect_after, channels="news", patterns=None):
+        """Drive the SSE generator until the client reports a disconnect after disconnect_after checks"""
+        checks = []
+
+        class FakeRequest:
+            async def is_disconnected(self):
+                checks.append(True)
+                return len(checks) > disconnect_after
+
+        async def collect():
+            response = await main.pubsub_stream(FakeRequest(), channels=channels, patterns=patterns)
+            return [frame async for frame in response.body_iterator]
+
+        return asyncio.run(asyncio.wait_for(collect(), timeout=10))
+
+    def test_stream_frames(self, pubsub, monkeypatch):
+        """Test the subscribed event, message framing, keepalives and closing on disconnect"""
+        monkeypatch.setattr(main, "PUBSUB_HEARTBEAT", 2)
+        pubsub.messages = [self.MESSAGE]
+        frames = self.stream(disconnect_after=3, patterns="n*,m*")
+
+        assert frames[0] == 'event: subscribed\ndata: {"channels": ["news"], "patterns": ["n*", "m*"]}\n\n'
+        assert frames[1] == 'event: message\ndata: {"channel": "news", "pattern": null, "data": {"n": 1}}\n\n'
+        assert frames[2:] == [": keepalive\n\n"]
+        assert pubsub.subscribed == ["news"] and pubsub.psubscribed == ["n*", "m*"]
+        assert pubsub.closed
+
+    def test_stream_closes_when_disconnected_at_once(self, pubsub):
+        """Test that a client gone before any message still releases the subscription"""
+        assert self.stream(disconnect_after=0) == [
+            'event: subscribed\ndata: {"channels": ["news"], "patterns": []}\n\n'
+        ]
+        assert pubsub.timeouts == [] and pubsub.closed
+
+    def test_stream_requires_channels(self, pubsub):
+        """Test that a stream with neither channels nor patterns is a 400"""
+        response = client.get("/tools/pubsub")
+        assert response.status_code == 400
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Qdrant MCP Benchmarks
+Target: a running qdrant-mcp service (QDRANT_MCP_URL, default http://localhost:8023)
+
+Usage:
+    python qdrant_benchmark.py ingest [--sizes 10000,100000,1000000] [--dim 384]
+    python qdrant_benchmark.py filter [--points 1000000] [--dim 128]
+    python qdrant_benchmark.py quantization [--points 200000] [--dim 384]
+    python qdrant_benchmark.py backend [--points 100000] [--dim 384]   (in-process, local index vs QDRANT_URL)
+    python qdrant_benchmark.py transport [--dims 384,768,1536]   (offline, needs numpy + pydantic)
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import struct
+import sys
+import time
+import urllib.request
+
+QDRANT_MCP_URL = os.getenv("QDRANT_MCP_URL", "http://localhost:8023")
+
+def call(path, payload=None, data=None, content_type="application/json", method="POST"):
+    """POST to the service and return the decoded JSON response"""
+    body = data if data is not None else json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(f"{QDRANT_MCP_URL}{path}", data=body, method=method,
+                                 headers={"Content-Type": content_type})
+    with urllib.request.urlopen(req, timeout=3600) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+def random_vector(dim):
+    return [random.random() for _ in range(dim)]
+
+def recreate_collection(name, dim):
+    try:
+        call("/tools/collection", {"operation": "delete", "collection_name": name})
+    except Exception:
+        pass
+    call("/tools/collection", {"operation": "create", "collection_name": name, "vector_size": dim})
+
+def bench_ingest(args):
+    """Single-request insert versus chunked parallel NDJSON ingest"""
+    print("📥 BULK INGEST BENCHMARK")
+    print(f"{'points':>10} {'mode':<28} {'seconds':>9} {'points/s':>11}")
+    for size in args.sizes:
+        collection = f"bench_ingest_{size}"
+
+        # Baseline: one /tools/vector insert carrying every point; skipped
+        # above --baseline-limit because it is expected to time out
+        if size <= args.baseline_limit:
+            recreate_collection(collection, args.dim)
+            points = [{"id": i, "vector": random_vector(args.dim), "payload": {"n": i}} for i in range(size)]
+            start = time.perf_counter()
+            call("/tools/vector", {"operation": "insert", "collection_name": collection, "points": points})
+            elapsed = time.perf_counter() - start
+            print(f"{size:>10} {'vector insert (1 request)':<28} {elapsed:>9.2f} {size / elapsed:>11.0f}")
+            del points
+        else:
+            print(f"{size:>10} {'vector insert (1 request)':<28} {'skipped':>9}")
+
+        recreate_collection(collection, args.dim)
+
+        def lines():
+            for i in range(size):
+                yield (json.dumps({"id": i, "vector": random_vector(args.dim), "payload": {"n": i}}) + "\n").encode()
+
+        start = time.perf_counter()
+        result = call(f"/tools/ingest/ndjson?collection_name={collection}"
+                      f"&batch_size={args.batch_size}&parallel={args.parallel}",
+                      data=lines(), content_type="application/x-ndjson")
+        elapsed = time.perf_counter() - start
+        mode = f"ndjson b={args.batch_size} p={args.parallel}"
+        print(f"{size:>10} {mode:<28} {elapsed:>9.2f} {size / elapsed:>11.0f}"
+              f"   (server: {result['points_per_second']} points/s)")
+
+        call("/tools/collection", {"operation": "delete", "collection_name": collection})
+
+def bench_filter(args):
+    """Filtered search latency before and after creating payload indexes"""
+    import numpy as np
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "mcp-servers", "qdrant-mcp"))
+    from main import encode_frame
+
+    categories = [f"cat_{i}" for i in range(args.categories)]
+    collection = "bench_filter"
+    recreate_collection(collection, args.dim)
+
+    def frames():
+        for start in range(0, args.points, 10000):
+            count = min(10000, args.points - start)
+            ids = list(range(start, start + count))
+            payloads = [{"category": random.choice(categories), "price": round(random.uniform(0, 1000), 2)}
+                        for _ in ids]
+            yield encode_frame(np.random.rand(count, args.dim), ids=ids, payloads=payloads)
+
+    print("🔎 FILTERED SEARCH BENCHMARK")
+    start = time.perf_counter()
+    call(f"/tools/ingest/binary?collection_name={collection}&wait=true",
+         data=frames(), content_type="application/octet-stream")
+    print(f"ingested {args.points} points in {time.perf_counter() - start:.1f}s")
+
+    filters = {
+        "keyword": {"category": categories[0]},
+        "keyword any-of": {"category": categories[:3]},
+        "float range": {"price": {"gte": 100, "lt": 110}},
+        "combined": {"category": categories[:5], "price": {"lt": 50}, "must_not": {"category": categories[1]}},
+    }
+
+    def run_queries(label):
+        for name, spec in filters.items():
+            timings = []
+            for _ in range(args.queries):
+                start = time.perf_counter()
+                call("/tools/search", {"collection_name": collection, "query_vector": random_vector(args.dim),
+                                       "limit": 10, "filter": spec})
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(f"{label:<10} {name:<16} p50 {timings[len(timings) // 2]:>8.1f} ms"
+                  f"   p95 {timings[int(len(timings) * 0.95)]:>8.1f} ms")
+
+    run_queries("no index")
+    call("/tools/collection", {"operation": "create_index", "collection_name": collection,
+                               "field_name": "category", "field_type": "keyword"})
+    call("/tools/collection", {"operation": "create_index", "collection_name": collection,
+                               "field_name": "price", "field_type": "float"})
+    run_queries("indexed")
+
+    call("/tools/collection", {"operation": "delete", "collection_name": collection})
+
+QUANTIZATION_CONFIGS = {
+    "float32 in RAM": {},
+    "float32 on disk": {"on_disk": True},
+    "scalar int8": {"quantization": "scalar", "on_disk": True},
+    "product x16": {"quantization": "product", "product_compression": "x16", "on_disk": True},
+    "binary": {"quantization": "binary", "on_disk": True},
+}
+
+def resident_bytes(qdrant_url):
+    """Resident memory of the Qdrant process from its Prometheus metrics"""
+    if not qdrant_url:
+        return None
+    try:
+        with urllib.request.urlopen(f"{qdrant_url}/metrics", timeout=10) as response:
+            for line in response.read().decode("utf-8").splitlines():
+                if line.startswith("memory_resident_bytes"):
+                    return int(float(line.split()[-1]))
+    except Exception:
+        pass
+    return None
+
+def estimated_vector_ram(points, dim, config):
+    """Approximate RAM held by vectors for a collection config"""
+    original = 0 if config.get("on_disk") else points * dim * 4
+    quantized = {
+        "scalar": points * dim,
+        "product": points * dim * 4 // 16,
+        "binary": points * dim // 8,
+    }.get(config.get("quantization"), 0)
+    return original + quantized
+
+def bench_quantization(args):
+    """Recall@k, latency and memory across storage/quantization configs"""
+    import numpy as np
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "mcp-servers", "qdrant-mcp"))
+    from main import encode_frame
+
+    rng = np.random.default_rng(42)
+    dataset = rng.standard_normal((args.points, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print("🗜️  QUANTIZATION BENCHMARK")
+    print(f"{'config':<18} {'search':<16} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8}"
+          f" {'est. MB':>8} {'rss MB':>8}")
+    for name, config in QUANTIZATION_CONFIGS.items():
+        collection = "bench_quantization"
+        try:
+            call("/tools/collection", {"operation": "delete", "collection_name": collection})
+        except Exception:
+            pass
+        call("/tools/collection", {"operation": "create", "collection_name": collection,
+                                   "vector_size": args.dim, **config})
+
+        def frames():
+            for start in range(0, args.points, 10000):
+                chunk = dataset[start:start + 10000]
+                yield encode_frame(chunk, ids=list(range(start, start + len(chunk))))
+
+        call(f"/tools/ingest/binary?collection_name={collection}&wait=true",
+             data=frames(), content_type="application/octet-stream")
+
+        # Exact search gives the ground truth for recall
+        truth = [set(hit["id"] for hit in call("/tools/search", {
+            "collection_name": collection, "query_vector": query.tolist(), "limit": args.k,
+            "with_payload": False, "exact": True})["results"]) for query in queries]
+
+        rss = resident_bytes(args.qdrant_url)
+        variants = {"default": {}, f"ef={args.ef}": {"hnsw_ef": args.ef}}
+        if config.get("quantization"):
+            variants["rescore x2"] = {"hnsw_ef": args.ef, "rescore": True, "oversampling": 2.0}
+        for variant, knobs in variants.items():
+            timings, found = [], 0
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                hits = call("/tools/search", {"collection_name": collection, "query_vector": query.tolist(),
+                                              "limit": args.k, "with_payload": False, **knobs})["results"]
+                timings.append((time.perf_counter() - start) * 1000)
+                found += len(expected & set(hit["id"] for hit in hits))
+            timings.sort()
+            print(f"{name:<18} {variant:<16} {found / (args.k * len(queries)):>9.3f}"
+                  f" {timings[len(timings) // 2]:>8.1f} {timings[int(len(timings) * 0.95)]:>8.1f}"
+                  f" {estimated_vector_ram(args.points, args.dim, config) / 2 ** 20:>8.0f}"
+                  f" {rss / 2 ** 20 if rss else float('nan'):>8.0f}")
+
+        call("/tools/collection", {"operation": "delete", "collection_name": collection})
+
+def bench_backend(args):
+    """Local NumPy index versus Qdrant: upsert throughput, search latency and recall"""
+    import asyncio
+    import shutil
+    import tempfile
+    import numpy as np
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "mcp-servers", "qdrant-mcp"))
+    from main import LocalVectorStore
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.models import Batch, Distance, VectorParams
+
+    rng = np.random.default_rng(7)
+    dataset = rng.standard_normal((args.points, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    collection = "bench_backend"
+
+    async def run(name, client):
+        if await client.collection_exists(collection):
+            await client.delete_collection(collection)
+        await client.create_collection(collection, vectors_config=VectorParams(size=args.dim, distance=Distance.COSINE))
+
+        start = time.perf_counter()
+        for offset in range(0, args.points, 1000):
+            chunk = dataset[offset:offset + 1000]
+            await client.upsert(collection, points=Batch(ids=list(range(offset, offset + len(chunk))),
+                                                         vectors=chunk.tolist()), wait=True)
+        ingest = time.perf_counter() - start
+
+        results, timings = [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = await client.search(collection, query_vector=query.tolist(), limit=args.k, with_payload=False)
+            timings.append((time.perf_counter() - start) * 1000)
+            results.append({hit.id for hit in hits})
+        timings.sort()
+        await client.delete_collection(collection)
+        await client.close()
+        return name, ingest, timings, results
+
+    async def main():
+        local_dir = tempfile.mkdtemp(prefix="bench-local-index-")
+        runs = [await run("local numpy", LocalVectorStore(local_dir))]
+        shutil.rmtree(local_dir, ignore_errors=True)
+        try:
+            runs.append(await run("qdrant", AsyncQdrantClient(url=args.qdrant_url, timeout=600)))
+        except Exception as e:
+            print(f"qdrant backend skipped: {e}")
+        return runs
+
+    runs = asyncio.run(main())
+    truth = runs[0][3]  # the local index is exact
+    print("🧮 VECTOR BACKEND BENCHMARK")
+    print(f"{'backend':<12} {'ingest/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>9}")
+    for name, ingest, timings, results in runs:
+        recall = sum(len(a & b) for a, b in zip(truth, results)) / (args.k * len(truth))
+        print(f"{name:<12} {args.points / ingest:>10.0f} {timings[len(timings) // 2]:>8.2f}"
+              f" {timings[int(len(timings) * 0.95)]:>8.2f} {recall:>9.3f}")
+
+def bench_transport(args):
+    """Bytes on the wire and parse time: JSON List[float] vs float32 encodings"""
+    import numpy as np
+    from pydantic import BaseModel
+    from typing import List
+
+    class JsonVector(BaseModel):
+        query_vector: List[float]
+
+    class Base64Vector(BaseModel):
+        query_vector_b64: str
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        return (time.perf_counter() - start) / args.repeat * 1e6
+
+    print("📦 VECTOR TRANSPORT BENCHMARK")
+    print(f"{'dim':>6} {'encoding':<14} {'bytes':>8} {'parse µs':>10}")
+    for dim in args.dims:
+        vector = np.random.rand(dim).astype("<f4")
+
+        as_json = json.dumps({"query_vector": vector.tolist()})
+        as_b64 = json.dumps({"query_vector_b64": base64.b64encode(vector.tobytes()).decode()})
+        as_frame = struct.pack("<4sIII", b"QVF1", 1, dim, 0) + vector.tobytes()
+
+        rows = [
+            ("json", len(as_json), timed(lambda: JsonVector.model_validate_json(as_json).query_vector)),
+            ("float32_b64", len(as_b64), timed(lambda: np.frombuffer(
+                base64.b64decode(Base64Vector.model_validate_json(as_b64).query_vector_b64), dtype="<f4"))),
+            ("octet-stream", len(as_frame), timed(lambda: np.frombuffer(
+                as_frame, dtype="<f4", count=dim, offset=16))),
+        ]
+        for name, size, micros in rows:
+            print(f"{dim:>6} {name:<14} {size:>8} {micros:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    ingest = sub.add_parser("ingest", help="bulk ingest throughput")
+    ingest.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[10000, 100000, 1000000])
+    ingest.add_argument("--dim", type=int, default=384)
+    ingest.add_argument("--batch-size", type=int, default=256)
+    ingest.add_argument("--parallel", type=int, default=4)
+    ingest.add_argument("--baseline-limit", type=int, default=100000)
+    ingest.set_defaults(run=bench_ingest)
+
+    filtered = sub.add_parser("filter", help="filtered search with and without payload indexes")
+    filtered.add_argument("--points", type=int, default=1000000)
+    filtered.add_argument("--dim", type=int, default=128)
+    filtered.add_argument("--categories", type=int, default=100)
+    filtered.add_argument("--queries", type=int, default=100)
+    filtered.set_defaults(run=bench_filter)
+
+    quantization = sub.add_parser("quantization", help="recall, latency and memory per storage config")
+    quantization.add_argument("--points", type=int, default=200000)
+    quantization.add_argument("--dim", type=int, default=384)
+    quantization.add_argument("--queries", type=int, default=100)
+    quantization.add_argument("--k", type=int, default=10)
+    quantization.add_argument("--ef", type=int, default=128)
+    quantization.add_argument("--qdrant-url", default=os.getenv("QDRANT_URL"),
+                              help="Qdrant base URL for resident memory from /metrics")
+    quantization.set_defaults(run=bench_quantization)
+
+    backend = sub.add_parser("backend", help="local NumPy index versus Qdrant (in-process)")
+    backend.add_argument("--points", type=int, default=100000)
+    backend.add_argument("--dim", type=int, default=384)
+    backend.add_argument("--queries", type=int, default=200)
+    backend.add_argument("--k", type=int, default=10)
+    backend.add_argument("--qdrant-url", default=os.getenv("QDRANT_URL", "http://localhost:6333"))
+    backend.set_defaults(run=bench_backend)
+
+    transport = sub.add_parser("transport", help="vector encoding size and parse time (offline)")
+    transport.add_argument("--dims", type=lambda v: [int(x) for x in v.split(",")], default=[384, 768, 1536])
+    transport.add_argument("--repeat", type=int, default=2000)
+    transport.set_defaults(run=bench_transport)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
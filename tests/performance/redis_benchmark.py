@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Redis MCP Benchmarks
+Target: a running redis-mcp service (REDIS_MCP_URL, default http://localhost:8022)
+
+Usage:
+    python redis_benchmark.py batch [--keys 1000] [--batch-sizes 10,100,1000]
+    python redis_benchmark.py codec [--rows 10,100,1000] [--redis-url redis://localhost:6379]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "mcp-servers", "redis-mcp"))
+
+REDIS_MCP_URL = os.getenv("REDIS_MCP_URL", "http://localhost:8022")
+
+def call(path, payload=None, method="POST"):
+    """POST to the service and return the decoded JSON response"""
+    body = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(f"{REDIS_MCP_URL}{path}", data=body, method=method,
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=600) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def bench_batch(args):
+    """Warm and read N keys: one /tools/cache call per key versus /tools/cache_batch"""
+    keys = [f"bench:batch:{i}" for i in range(args.keys)]
+    value = {"payload": "x" * args.value_size}
+
+    print("📦 CACHE BATCH BENCHMARK")
+    print(f"{'mode':<30} {'seconds':>9} {'ops/s':>10}")
+
+    def report(mode, elapsed):
+        print(f"{mode:<30} {elapsed:>9.3f} {args.keys / elapsed:>10.0f}")
+
+    report("cache set (1 per request)", timed(lambda: [
+        call("/tools/cache", {"operation": "set", "key": key, "value": value}) for key in keys]))
+    report("cache get (1 per request)", timed(lambda: [
+        call("/tools/cache", {"operation": "get", "key": key}) for key in keys]))
+
+    for size in args.batch_sizes:
+        chunks = [keys[i:i + size] for i in range(0, len(keys), size)]
+        report(f"batch set mset b={size}", timed(lambda: [call("/tools/cache_batch", {
+            "operations": [{"operation": "set", "key": key, "value": value} for key in chunk]}) for chunk in chunks]))
+        report(f"batch set+ttl pipeline b={size}", timed(lambda: [call("/tools/cache_batch", {
+            "operations": [{"operation": "set", "key": key, "value": value, "ttl": 300} for key in chunk]})
+            for chunk in chunks]))
+        report(f"batch set+ttl multi b={size}", timed(lambda: [call("/tools/cache_batch", {
+            "operations": [{"operation": "set", "key": key, "value": value, "ttl": 300} for key in chunk],
+            "transaction": True}) for chunk in chunks]))
+        report(f"batch get mget b={size}", timed(lambda: [call("/tools/cache_batch", {
+            "operations": [{"operation": "get", "key": key} for key in chunk]}) for chunk in chunks]))
+
+    for i in range(0, len(keys), 1000):
+        call("/tools/cache_batch", {"operations": [{"operation": "delete", "key": key} for key in keys[i:i + 1000]]})
+
+def structured_value(rows):
+    """A typical tool result: a list of records with mixed field types"""
+    rng = random.Random(rows)
+    return {
+        "query": "recent deployments",
+        "generated_at": "2024-01-01T00:00:00",
+        "rows": [{
+            "id": i,
+            "service": rng.choice(["redis-mcp", "qdrant-mcp", "memory-mcp", "network-mcp"]),
+            "status": rng.choice(["healthy", "degraded", "failed"]),
+            "latency_ms": round(rng.uniform(0.5, 250.0), 3),
+            "tags": rng.sample(["prod", "canary", "gpu", "edge", "batch", "eu", "us"], 3),
+            "message": " ".join(rng.choice(["deploy", "rolled", "back", "ok", "timeout", "retry"]) for _ in range(8))
+        } for i in range(rows)]
+    }
+
+def bench_codec(args):
+    """Stored size and encode/decode time of each value codec, optionally with Redis MEMORY USAGE"""
+    from main import CODECS, check_codec_available, decode_value, encode_value
+
+    client = None
+    if args.redis_url:
+        import redis
+        client = redis.Redis.from_url(args.redis_url)
+
+    print("🗜️ VALUE CODEC BENCHMARK")
+    print(f"{'rows':>6} {'codec':<14} {'bytes':>10} {'ratio':>7} {'encode us':>10} {'decode us':>10} {'redis mem':>10}")
+
+    for rows in args.rows:
+        value = structured_value(rows)
+        json_size = len(encode_value(value, "json"))
+        for codec in CODECS:
+            try:
+                check_codec_available(codec)
+            except ValueError as e:
+                print(f"{rows:>6} {codec:<14} skipped: {e}")
+                continue
+            encoded = encode_value(value, codec)
+            raw = encoded.encode("utf-8") if isinstance(encoded, str) else encoded
+            assert decode_value(raw) == value
+            encode_us = timed(lambda: [encode_value(value, codec) for _ in range(args.iterations)]) / args.iterations * 1e6
+            decode_us = timed(lambda: [decode_value(raw) for _ in range(args.iterations)]) / args.iterations * 1e6
+
+            memory = ""
+            if client is not None:
+                key = f"bench:codec:{codec}:{rows}"
+                client.set(key, raw)
+                memory = client.memory_usage(key, samples=0)
+                client.delete(key)
+            print(f"{rows:>6} {codec:<14} {len(raw):>10} {json_size / len(raw):>6.2f}x "
+                  f"{encode_us:>10.1f} {decode_us:>10.1f} {memory:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    batch = sub.add_parser("batch", help="per-request versus pipelined cache throughput")
+    batch.add_argument("--keys", type=int, default=1000)
+    batch.add_argument("--batch-sizes", type=lambda v: [int(x) for x in v.split(",")], default=[10, 100, 1000])
+    batch.add_argument("--value-size", type=int, default=100)
+    batch.set_defaults(run=bench_batch)
+
+    codec = sub.add_parser("codec", help="value codec size and encode/decode time")
+    codec.add_argument("--rows", type=lambda v: [int(x) for x in v.split(",")], default=[10, 100, 1000])
+    codec.add_argument("--iterations", type=int, default=200)
+    codec.add_argument("--redis-url", default=None, help="also report MEMORY USAGE from this Redis")
+    codec.set_defaults(run=bench_codec)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()